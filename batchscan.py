@@ -0,0 +1,214 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from llmatch import LicenseMatcherConfig, LicenseMatcher, ExactMatchIndex, \
+        matchResultToDict
+from lltokenize import TextPreprocessorConfig, EQUIVALENTWORDS_PATH, \
+        preprocess
+from parsexml import XMLParserConfig, XMLParser
+from scancache import makeScanKey, ScanCache, PersistentScanCache
+
+# changed whenever scan results would differ for the same inputs and
+# configuration, so that older cached results are not reused
+SCAN_VERSION = 1
+
+class BatchScanConfig:
+    def __init__(self):
+        super(BatchScanConfig, self).__init__()
+
+        # path to directory containing License List XML files
+        self.xmldirpath = ""
+
+        # should every license occurrence in each file be found (True),
+        # or each file be matched as a whole against each license (False)?
+        self.findAll = False
+
+        # path to SQLite file for keeping results between runs, or "" to
+        # only keep results in memory for this run
+        self.cachePath = ""
+
+        # maximum total size of results kept in the cache file, in bytes
+        self.maxCacheBytes = 64 * 1024 * 1024
+
+# Scans many files for licenses. Files are identified by a hash of their
+# contents, so that byte-identical files (e.g. the same LICENSE file
+# vendored many times) are only preprocessed and matched once; see
+# scancache.py.
+class BatchScanner:
+    def __init__(self, cfg):
+        super(BatchScanner, self).__init__()
+
+        # batch scan configuration object
+        self.cfg = cfg
+
+        # XML parser, which records the state of the loaded files
+        self.parser = XMLParser(XMLParserConfig())
+
+        # dict of license ID => datatypes.License
+        self.lics = {}
+
+        # text preprocessor configuration, license matcher and exact
+        # match index
+        self.tpcfg = TextPreprocessorConfig()
+        self.matcher = LicenseMatcher(LicenseMatcherConfig(), self.tpcfg)
+        self.exactIndex = ExactMatchIndex(self.tpcfg)
+
+        # cache of results by content hash and configuration fingerprint
+        if cfg.cachePath != "":
+            self.cache = PersistentScanCache(cfg.cachePath, cfg.maxCacheBytes)
+        else:
+            self.cache = ScanCache()
+
+        # fingerprint of configuration and licenses, set by load()
+        self.fingerprint = b""
+
+        # number of files scanned, how many of those used cached results,
+        # and how many files or directories could not be read
+        self.scanned = 0
+        self.cached = 0
+        self.errors = 0
+
+    # Loads, flattens and indexes all licenses. A file which cannot be
+    # loaded, or a license which cannot be flattened, is reported rather
+    # than stopping the others.
+    # returns: dict of path => error message
+    def load(self):
+        self.lics = {}
+        errors = {}
+        for _, _, lic, error in self.parser.iterLoadAll(self.cfg.xmldirpath):
+            if error is not None:
+                errors[error[0]] = error[1]
+            else:
+                self.lics[lic.id] = lic
+        errors.update(self.parser.flattenEach(self.lics))
+        self.exactIndex.build(self.lics)
+        self.fingerprint = self.makeFingerprint()
+        return errors
+
+    # Computes a fingerprint of everything besides a file's contents that
+    # affects its results: configuration, equivalent words and license
+    # XML files.
+    # returns: fingerprint, as bytes
+    def makeFingerprint(self):
+        h = hashlib.sha256()
+        h.update(json.dumps([
+            SCAN_VERSION,
+            self.cfg.findAll,
+            self.tpcfg.combineHyphens,
+            sorted(vars(self.matcher.cfg).items()),
+            sorted(vars(self.parser.cfg).items()),
+        ], default=str).encode("utf-8"))
+        with open(EQUIVALENTWORDS_PATH, "rb") as f:
+            h.update(f.read())
+        for xmlpath, state in sorted(self.parser.fileState.items()):
+            h.update(os.path.basename(xmlpath).encode("utf-8"))
+            h.update(state[2].encode("ascii"))
+        return h.digest()
+
+    # Scans one file, using cached results if its contents have been
+    # scanned before.
+    # given:   path: path to file
+    # returns: list of match dicts; see llmatch.matchResultToDict()
+    # raises:  OSError if the file cannot be read
+    def scanFile(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        self.scanned += 1
+        key = makeScanKey(data, self.fingerprint)
+        results = self.cache.get(key)
+        if results is not None:
+            self.cached += 1
+            return results
+
+        res = preprocess(data.decode("utf-8", errors="replace"), self.tpcfg)
+        mrs = self.exactIndex.match(res)
+        if len(mrs) == 0:
+            if self.cfg.findAll:
+                mrs = self.matcher.findAll(self.lics, res)
+            else:
+                mrs = self.matcher.matchAll(self.lics, res)
+        results = [matchResultToDict(mr) for mr in mrs]
+        self.cache.put(key, results)
+        return results
+
+    # Generator for scan results for files and directories (recursively).
+    # A file or directory which cannot be read is reported with an error,
+    # and the scan carries on with the rest.
+    # given:   paths: list of file or directory paths
+    # yields:  (path, list of match dicts, error message or None) tuples
+    def scanPaths(self, paths):
+        for path in paths:
+            if os.path.isdir(path):
+                walkErrors = []
+                for dirpath, dirnames, filenames in os.walk(
+                        path, onerror=walkErrors.append):
+                    yield from self._walkErrorResults(walkErrors)
+                    dirnames.sort()
+                    for filename in sorted(filenames):
+                        yield self._scanPath(os.path.join(dirpath, filename))
+                yield from self._walkErrorResults(walkErrors)
+            else:
+                yield self._scanPath(path)
+
+    # Saves and closes the cache.
+    def close(self):
+        self.cache.close()
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to scan one file for scanPaths()
+    def _scanPath(self, path):
+        try:
+            return path, self.scanFile(path), None
+        except OSError as e:
+            self.errors += 1
+            return path, [], f"could not read: {e.strerror or e}"
+
+    # Helper function to report, and then forget, directories which
+    # os.walk() could not list
+    def _walkErrorResults(self, walkErrors):
+        for e in walkErrors:
+            self.errors += 1
+            yield e.filename, [], f"could not read: {e.strerror or e}"
+        walkErrors.clear()
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Scan files for licenses, printing one JSON line per file")
+    argparser.add_argument("xmldirpath",
+        help="path to directory containing License List XML files")
+    argparser.add_argument("paths", nargs="+",
+        help="files or directories to scan")
+    argparser.add_argument("--find-all", action="store_true",
+        help="find every license occurrence within each file")
+    argparser.add_argument("--cache", default="",
+        help="path to SQLite file for keeping results between runs")
+    argparser.add_argument("--max-cache-mb", type=int, default=64,
+        help="maximum size of results kept in the cache file")
+    args = argparser.parse_args()
+
+    cfg = BatchScanConfig()
+    cfg.xmldirpath = args.xmldirpath
+    cfg.findAll = args.find_all
+    cfg.cachePath = args.cache
+    cfg.maxCacheBytes = args.max_cache_mb * 1024 * 1024
+
+    scanner = BatchScanner(cfg)
+    for path, msg in sorted(scanner.load().items()):
+        print(f"Error loading {path}: {msg}", file=sys.stderr)
+    try:
+        for path, results, error in scanner.scanPaths(args.paths):
+            row = {"path": path, "matches": results}
+            if error is not None:
+                row["error"] = error
+            print(json.dumps(row))
+    finally:
+        scanner.close()
+    print(f"Scanned {scanner.scanned} files, {scanner.cached} from cache, "
+          f"{scanner.errors} could not be read", file=sys.stderr)
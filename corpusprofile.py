@@ -0,0 +1,293 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import argparse
+import csv
+import gc
+import glob
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+from datatypes import FlatType
+from llmatch import LicenseMatcherConfig, LicenseMatcher
+from lltokenize import TextPreprocessorConfig, preprocess, compileAltRegex
+from parsexml import XMLParserConfig, XMLParser
+
+# columns in CSV output, in order
+PROFILE_COLUMNS = ["licenseId", "cost", "parseSeconds", "flattenSeconds",
+                   "compileSeconds", "altSeconds", "nodeCount", "flatCount",
+                   "maxOptionalDepth", "regexCount", "textLength", "worstAlts",
+                   "error"]
+
+# parser settings compared by measureMemory(), as (name, internText,
+# shareFlats) tuples
+MEMORY_CONFIGS = [
+    ("baseline", False, False),
+    ("intern", True, False),
+    ("intern+share", True, True),
+]
+
+# Statistics for one license, as gathered by CorpusProfiler.
+class LicenseProfile:
+    def __init__(self):
+        super(LicenseProfile, self).__init__()
+
+        # license ID, or file path if the file could not be parsed
+        self.licenseId = ""
+
+        # seconds taken to parse the XML file, flatten the license, and
+        # compile its regex for matching
+        self.parseSeconds = 0.0
+        self.flattenSeconds = 0.0
+        self.compileSeconds = 0.0
+
+        # seconds taken to search the license's own default text with each
+        # of its REGEX parts' regexes, in total. this is an approximation
+        # of what the parts cost when matching: each regex is searched for
+        # on its own throughout the text, whereas the matcher only tries it
+        # where it is reached within the license's whole regex.
+        self.altSeconds = 0.0
+
+        # number of LicenseNodes and LicenseFlats (including those within
+        # OPTIONAL flats)
+        self.nodeCount = 0
+        self.flatCount = 0
+
+        # deepest nesting of OPTIONAL flats, with 0 meaning none
+        self.maxOptionalDepth = 0
+
+        # number of REGEX flats
+        self.regexCount = 0
+
+        # length of the license's default text, in characters
+        self.textLength = 0
+
+        # slowest REGEX parts, as (seconds, regex) tuples, slowest first
+        self.worstAlts = []
+
+        # error message if the license could not be fully profiled
+        self.error = ""
+
+    # Total seconds, used for sorting licenses by how expensive they are.
+    @property
+    def cost(self):
+        return (self.parseSeconds + self.flattenSeconds +
+                self.compileSeconds + self.altSeconds)
+
+    # Returns the profile as a dict, with the columns in PROFILE_COLUMNS.
+    def toDict(self):
+        d = {col: getattr(self, col) for col in PROFILE_COLUMNS}
+        d["worstAlts"] = [{"seconds": s, "regex": r} for s, r in self.worstAlts]
+        return d
+
+# Loads licenses one at a time and measures how large and how slow to
+# process each one is, to find the licenses most worth tuning for.
+class CorpusProfiler:
+    # given: worstAlts: number of slowest REGEX parts to report per license
+    def __init__(self, worstAlts=3):
+        super(CorpusProfiler, self).__init__()
+
+        # number of slowest REGEX parts to report per license
+        self.worstAlts = worstAlts
+
+        # XML parser, text preprocessor config and license matcher
+        self.parser = XMLParser(XMLParserConfig())
+        self.tpcfg = TextPreprocessorConfig()
+        self.matcher = LicenseMatcher(LicenseMatcherConfig(), self.tpcfg)
+
+    # Profiles one License List XML file.
+    # given:   xmlpath: path to XML file
+    # returns: LicenseProfile
+    def profileFile(self, xmlpath):
+        p = LicenseProfile()
+        p.licenseId = xmlpath
+
+        start = time.perf_counter()
+        try:
+            lic = self.parser.load(xmlpath)
+        except Exception as e:
+            p.error = f"could not parse: {e}"
+            return p
+        p.parseSeconds = time.perf_counter() - start
+        p.licenseId = lic.id
+        p.nodeCount = countNodes(lic.textNode)
+
+        start = time.perf_counter()
+        try:
+            self.parser.flatten(lic)
+        except Exception as e:
+            p.error = f"could not flatten: {e}"
+            return p
+        p.flattenSeconds = time.perf_counter() - start
+        p.flatCount, p.maxOptionalDepth, p.regexCount = flatStats(lic.textFlat)
+        text = flatsText(lic.textFlat)
+        p.textLength = len(text)
+
+        start = time.perf_counter()
+        self.matcher.compile(lic)
+        p.compileSeconds = time.perf_counter() - start
+        if lic.id in self.matcher.errors:
+            p.error = f"could not compile: {self.matcher.errors[lic.id]}"
+
+        self._profileAlts(p, lic.textFlat, preprocess(text, self.tpcfg).proc)
+        return p
+
+    # Profiles every License List XML file in a directory.
+    # given:   dirpath: path to directory containing License List XML files
+    # returns: list of LicenseProfiles, most expensive first
+    def profileDir(self, dirpath):
+        xmlpaths = sorted(glob.glob(os.path.join(dirpath, "*.xml")))
+        profiles = [self.profileFile(xmlpath) for xmlpath in xmlpaths]
+        profiles.sort(key=lambda p: (-p.cost, p.licenseId))
+        return profiles
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to time each REGEX part's regex, rewritten for
+    # preprocessed text as the matcher uses it, searching through the
+    # license's own preprocessed text; see LicenseProfile.altSeconds
+    def _profileAlts(self, p, flats, proc):
+        alts = []
+        for regex in iterRegexes(flats):
+            try:
+                pattern = compileAltRegex(regex, self.tpcfg)
+            except re.error:
+                continue
+            start = time.perf_counter()
+            for _ in pattern.finditer(proc):
+                pass
+            alts.append((time.perf_counter() - start, regex))
+        p.altSeconds = sum(s for s, _ in alts)
+        alts.sort(key=lambda a: -a[0])
+        p.worstAlts = alts[:self.worstAlts]
+
+# Counts a LicenseNode and all of its descendants.
+def countNodes(node):
+    if node is None:
+        return 0
+    return 1 + sum(countNodes(c) for c in node.children)
+
+# Gathers statistics for a list of LicenseFlats.
+# returns: (flat count, max OPTIONAL depth, REGEX count) tuple, including
+#          flats within OPTIONAL flats
+def flatStats(flats, depth=0):
+    count = 0
+    maxDepth = depth
+    regexCount = 0
+    for lf in flats:
+        count += 1
+        if lf.type == FlatType.REGEX:
+            regexCount += 1
+        elif lf.type == FlatType.OPTIONAL:
+            c, d, r = flatStats(lf.children, depth + 1)
+            count += c
+            maxDepth = max(maxDepth, d)
+            regexCount += r
+    return count, maxDepth, regexCount
+
+# Generator for the regex of each REGEX flat, including those within
+# OPTIONAL flats.
+def iterRegexes(flats):
+    for lf in flats:
+        if lf.type == FlatType.REGEX:
+            yield lf.regex
+        elif lf.type == FlatType.OPTIONAL:
+            yield from iterRegexes(lf.children)
+
+# Returns a license's default text from its flats, with optional parts
+# included and whitespace flats as single spaces.
+def flatsText(flats):
+    parts = []
+    for lf in flats:
+        match lf.type:
+            case FlatType.TEXT | FlatType.REGEX:
+                parts.append(lf.text)
+            case FlatType.WHITESPACE:
+                parts.append(" ")
+            case FlatType.OPTIONAL:
+                parts.append(flatsText(lf.children))
+    return "".join(parts)
+
+# Measures the memory used by a whole corpus once loaded and flattened,
+# using tracemalloc.
+# given:   dirpath: path to directory containing License List XML files
+#          internText, shareFlats: XMLParserConfig settings to use
+# returns: (current bytes, peak bytes) tuple, with current bytes being
+#          what is still held by the licenses (and parser) after loading
+def measureMemory(dirpath, internText, shareFlats):
+    cfg = XMLParserConfig()
+    cfg.internText = internText
+    cfg.shareFlats = shareFlats
+    parser = XMLParser(cfg)
+    lics = {}
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _, _, lic, error in parser.iterLoadAll(dirpath):
+            if error is not None:
+                continue
+            try:
+                parser.flatten(lic)
+            except Exception:
+                pass
+            lics[lic.id] = lic
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, peak
+
+# Writes profiles as CSV, with worst ALT patterns in one column.
+def writeCSV(profiles, f):
+    writer = csv.writer(f)
+    writer.writerow(PROFILE_COLUMNS)
+    for p in profiles:
+        d = p.toDict()
+        d["worstAlts"] = "; ".join(f"{a['seconds']*1000:.3f}ms {a['regex']}"
+                                   for a in d["worstAlts"])
+        writer.writerow([d[col] for col in PROFILE_COLUMNS])
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Profile each license in a License List XML directory, most expensive first")
+    argparser.add_argument("xmldirpath",
+        help="path to directory containing License List XML files")
+    argparser.add_argument("--json", action="store_true",
+        help="output JSON rather than CSV")
+    argparser.add_argument("--top", type=int, default=0,
+        help="only output the N most expensive licenses")
+    argparser.add_argument("--worst-alts", type=int, default=3,
+        help="number of slowest <alt> regexes to report per license (each timed on its own, as an approximation)")
+    argparser.add_argument("--memory", action="store_true",
+        help="instead, compare memory used by the whole corpus with and without interning and sharing")
+    args = argparser.parse_args()
+
+    if args.memory:
+        rows = []
+        for name, internText, shareFlats in MEMORY_CONFIGS:
+            current, peak = measureMemory(args.xmldirpath, internText, shareFlats)
+            rows.append({"config": name, "currentBytes": current,
+                         "peakBytes": peak})
+        if args.json:
+            json.dump(rows, sys.stdout, indent=2)
+            print()
+        else:
+            writer = csv.DictWriter(sys.stdout, ["config", "currentBytes", "peakBytes"])
+            writer.writeheader()
+            writer.writerows(rows)
+        sys.exit(0)
+
+    profiler = CorpusProfiler(args.worst_alts)
+    profiles = profiler.profileDir(args.xmldirpath)
+    if args.top > 0:
+        profiles = profiles[:args.top]
+
+    if args.json:
+        json.dump([p.toDict() for p in profiles], sys.stdout, indent=2)
+        print()
+    else:
+        writeCSV(profiles, sys.stdout)
@@ -1,6 +1,8 @@
 # SPDX-License-Identifier: MIT
 # Copyright 2024-2025 Steve Winslow
 
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from enum import Enum
 
 # Represents a parsed SPDX License List XML file.
@@ -30,7 +32,12 @@ class License:
         # content of any notes
         self.notes = ""
 
-        # original unparsed XML text for full license
+        # path to the XML file this license was loaded from
+        self.xmlPath = ""
+
+        # original unparsed XML text for full license; only filled in if
+        # XMLParserConfig.keepOrigXML is set, otherwise it is read from
+        # xmlPath when needed via OrigXMLCache
         self.origXML = ""
 
         # top-level processed <text> node - LicenseNode
@@ -133,7 +140,8 @@ class LicenseFlat:
         # FIXME lxml doesn't currently appear to provide column numbers
         # self.column = 0
 
-        # text content (for TEXT only)
+        # text content (for TEXT), or the default text from the license
+        # XML which the regex stands in for (for REGEX)
         self.text = ""
 
         # children (for OPTIONAL only)
@@ -154,6 +162,108 @@ class TargetText:
         # TextPreprocessor with results from pre-processing target string
         self.tp = None
 
+# Reads licenses' original XML text from their files on demand, keeping a
+# bounded number of recently read texts.
+class OrigXMLCache:
+    # given: maxEntries: maximum number of XML texts to keep
+    def __init__(self, maxEntries=16):
+        super(OrigXMLCache, self).__init__()
+
+        # maximum number of XML texts to keep
+        self.maxEntries = maxEntries
+
+        # ordered dict of XML file path => XML text, least recently
+        # used first
+        self.entries = OrderedDict()
+
+    # Returns the original XML text for a License.
+    # given:   lic: datatypes.License
+    # returns: XML text, or "" if it is not available, e.g. if its file
+    #          has since been removed or cannot be read
+    def get(self, lic):
+        if lic.origXML != "":
+            return lic.origXML
+        if lic.xmlPath == "":
+            return ""
+        if lic.xmlPath in self.entries:
+            self.entries.move_to_end(lic.xmlPath)
+            return self.entries[lic.xmlPath]
+
+        try:
+            with open(lic.xmlPath, 'r') as f:
+                xml = f.read()
+        except (OSError, UnicodeDecodeError):
+            return ""
+        self.entries[lic.xmlPath] = xml
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+        return xml
+
+    # Drops all kept XML texts, e.g. after licenses are reloaded.
+    def clear(self):
+        self.entries.clear()
+
+    # Drops the kept XML text for a License, if any, e.g. after it is
+    # reloaded or removed.
+    def discard(self, lic):
+        self.entries.pop(lic.xmlPath, None)
+
+# Sorted list of license IDs, with an index for searching them. It is
+# rebuilt only when licenses change, rather than sorting on every use.
+class LicenseIDIndex:
+    def __init__(self):
+        super(LicenseIDIndex, self).__init__()
+
+        # license IDs, sorted case-insensitively
+        self.ids = []
+
+        # casefolded license IDs, in the same order
+        self.folded = []
+
+        # all casefolded IDs joined by newlines, for substring search,
+        # and the index in it where each ID starts
+        self.joined = ""
+        self.starts = []
+
+    # Rebuilds the index from a dict of license ID => datatypes.License.
+    def rebuild(self, lics):
+        self.ids = sorted(lics.keys(), key=str.casefold)
+        self.folded = [licId.casefold() for licId in self.ids]
+        self.joined = "\n".join(self.folded)
+        self.starts = []
+        pos = 0
+        for f in self.folded:
+            self.starts.append(pos)
+            pos += len(f) + 1
+
+    # Finds license IDs matching a search string, case-insensitively.
+    # given:   query: text to search for
+    #          prefixOnly: True to only find IDs starting with query
+    # returns: list of matching IDs, in sorted order
+    def search(self, query, prefixOnly=False):
+        query = query.casefold()
+        if query == "":
+            return list(self.ids)
+        if prefixOnly:
+            lo = bisect_left(self.folded, query)
+            hi = lo
+            while hi < len(self.folded) and self.folded[hi].startswith(query):
+                hi += 1
+            return self.ids[lo:hi]
+        if "\n" in query:
+            return []
+
+        matches = []
+        pos = self.joined.find(query)
+        while pos != -1:
+            i = bisect_right(self.starts, pos) - 1
+            matches.append(self.ids[i])
+            # skip to the next ID, so that each is only listed once
+            if i + 1 >= len(self.starts):
+                break
+            pos = self.joined.find(query, self.starts[i + 1])
+        return matches
+
 # Represents the collection of data used by the application.
 class AppData:
     def __init__(self):
@@ -167,7 +277,42 @@ class AppData:
         # user interface
         self.ui = None
 
+        # functions to call when licenses change, e.g. to update caches.
+        # each is called as fn(changedIds, removedIds), with both set to
+        # None if the whole dict of licenses was replaced.
+        self.licenseListeners = []
+
+        # recently viewed licenses' original XML text
+        self.origXMLCache = OrigXMLCache()
+
+        # sorted license IDs and search index
+        self.licIndex = LicenseIDIndex()
+
     def setLicenses(self, lics):
         self.lics = lics
+        self.origXMLCache.clear()
+        self.licIndex.rebuild(self.lics)
         if self.ui is not None:
             self.ui.updateLics()
+        for fn in self.licenseListeners:
+            fn(None, None)
+
+    # Updates licenses in place, e.g. after XMLParser.reloadAll().
+    # given:   changed: dict of license ID => datatypes.License for new or
+    #                   changed licenses
+    #          removed: list of license IDs to remove
+    def updateLicenses(self, changed, removed):
+        for licId in removed:
+            lic = self.lics.pop(licId, None)
+            if lic is not None:
+                self.origXMLCache.discard(lic)
+        for licId, lic in changed.items():
+            if licId in self.lics:
+                self.origXMLCache.discard(self.lics[licId])
+            self.origXMLCache.discard(lic)
+        self.lics.update(changed)
+        self.licIndex.rebuild(self.lics)
+        if self.ui is not None:
+            self.ui.updateLics(list(changed.keys()), list(removed))
+        for fn in self.licenseListeners:
+            fn(list(changed.keys()), list(removed))
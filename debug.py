@@ -5,10 +5,20 @@ from tkinter import *
 from tkinter import ttk
 
 from datatypes import FlatType
-from lltokenize import TextPreprocessorConfig, TextPreprocessor
+from lltokenize import TextPreprocessorConfig, TextPreprocessor, \
+        IncrementalTextPreprocessor
 
 PADDING_COORDS = "5 5 12 0"
 
+# milliseconds to wait after the last edit before live conversion
+LIVE_DEBOUNCE_MS = 150
+
+# number of flattened nodes to insert into the tree view at a time
+FLAT_TREE_BATCH = 200
+
+# background color for highlighting corresponding orig and proc text
+PROCMAP_HIGHLIGHT = "#f6d32d"
+
 class DebugUI:
     def __init__(self):
         super(DebugUI, self).__init__()
@@ -44,12 +54,29 @@ class DebugUI:
         # clear orig and proc button
         self.clearbtn = None
 
+        # checkbox and BooleanVar for live conversion while editing
+        self.livebtn = None
+        self.liveVar = None
+
         ##### TEXT PROCESSING DATA #####
 
         # text preprocessor config and system
         self.tpcfg = TextPreprocessorConfig()
         self.tp = TextPreprocessor(self.tpcfg)
 
+        # incremental preprocessor for live conversion, and ID of pending
+        # after() call to convert, if any
+        self.itp = IncrementalTextPreprocessor(self.tpcfg)
+        self.liveId = None
+
+        # preprocessor (self.tp or self.itp) whose orig, origrc, proc and
+        # procmap match the texts shown, or None if orig has been edited
+        # since it was last converted
+        self.procSource = None
+
+        # index in proc of the character under the mouse, if highlighted
+        self.procPointedIdx = None
+
         ##### LICENSE TOKENIZING WIDGETS #####
 
         # primary frame for license tokens debug view
@@ -83,9 +110,28 @@ class DebugUI:
 
         ##### LICENSE TOKENIZING DATA #####
 
+        # dict of tree view item ID => LicenseFlat, for OPTIONAL items
+        # whose children have not been inserted yet
+        self.tokenFlatPending = {}
+
+        # list of (itemId, LicenseFlat) still to be inserted at the top
+        # level of the tree view, and ID of after() call to insert the
+        # next batch, if any
+        self.tokenFlatQueue = []
+        self.tokenFlatAfterId = None
+
+        # datatypes.OrigXMLCache for reading licenses' original XML
+        self.origXMLCache = None
+
+        # datatypes.LicenseIDIndex with sorted IDs of self.tokenLics
+        self.tokenLicIndex = None
+
     ##### MAIN UI SETUP #####
 
-    def setup(self, root, lics):
+    def setup(self, root, lics, origXMLCache, licIndex):
+        self.origXMLCache = origXMLCache
+        self.tokenLicIndex = licIndex
+
         # set up debug Toplevel (not root) window, using root reference
         self.window = Toplevel(root)
         self.window.title("Debug window")
@@ -144,6 +190,23 @@ class DebugUI:
                                      command=self._textProcClear)
         self.clearbtn.grid(column=2, row=2, sticky=(E,W))
 
+        # set up live conversion checkbox
+        self.liveVar = BooleanVar(value=False)
+        self.livebtn = ttk.Checkbutton(self.cDebugTP, text="Live",
+                                       variable=self.liveVar,
+                                       command=self._textProcLiveToggled)
+        self.livebtn.grid(column=2, row=0, sticky=(E,W))
+        self.origtext.bind("<<Modified>>", self._textProcModified)
+
+        # set up highlighting of the orig text for the proc text under the
+        # mouse pointer
+        self.origtext.tag_configure("procmap", background=PROCMAP_HIGHLIGHT)
+        self.proctext.tag_configure("procmap", background=PROCMAP_HIGHLIGHT)
+        self.proctext.bind("<Motion>", self._procTextPointed)
+        self.proctext.bind("<Button-1>",
+                           lambda e: self._procTextPointed(e, True))
+        self.proctext.bind("<Leave>", self._procTextUnpointed)
+
         # configure weights for grid resizing
         self.cDebugTP.columnconfigure(0, weight=1)
         self.cDebugTP.rowconfigure(1, weight=1)
@@ -156,12 +219,108 @@ class DebugUI:
         self.proctext.delete("1.0", "end")
         self.proctext.insert("1.0", self.tp.proc)
         self.proctext["state"] = "disabled"
+        self._procTextUnpointed()
+        self.procSource = self.tp
 
     def _textProcClear(self, *args):
         self.origtext.delete("1.0", "end")
         self.proctext["state"] = "normal"
         self.proctext.delete("1.0", "end")
         self.proctext["state"] = "disabled"
+        self.itp.clear()
+        self._procTextUnpointed()
+        self.procSource = None
+
+    # Callback: Live conversion turned on or off
+    def _textProcLiveToggled(self, *args):
+        if self.liveVar.get():
+            # start from a full conversion of the current text
+            self.itp.clear()
+            self.proctext["state"] = "normal"
+            self.proctext.delete("1.0", "end")
+            self.proctext["state"] = "disabled"
+            self._textProcLive()
+
+    # Callback: orig text changed; schedule live conversion if enabled
+    def _textProcModified(self, *args):
+        # reset flag so that the next change triggers this event again
+        self.origtext.edit_modified(False)
+        self._procTextUnpointed()
+        if not self.liveVar.get():
+            self.procSource = None
+            return
+        if self.liveId is not None:
+            self.window.after_cancel(self.liveId)
+        self.liveId = self.window.after(LIVE_DEBOUNCE_MS, self._textProcLive)
+
+    # Reprocess only the changed part of orig, and replace just the
+    # corresponding part of proc text view
+    def _textProcLive(self):
+        self.liveId = None
+        procStart, oldProcEnd, newProcEnd = self.itp.update(
+            self.origtext.get("1.0", "end"))
+        self.proctext["state"] = "normal"
+        self.proctext.delete(f"1.0 + {procStart} chars",
+                             f"1.0 + {oldProcEnd} chars")
+        self.proctext.insert(f"1.0 + {procStart} chars",
+                             self.itp.proc[procStart:newProcEnd])
+        self.proctext["state"] = "disabled"
+        self._procTextUnpointed()
+        self.procSource = self.itp
+
+    # Callback: Mouse moved over or clicked in proc text view. Highlights
+    # the processed word under the mouse, and the original text it came
+    # from. Only the pointed-at word is looked up in procmap and origrc,
+    # so this takes the same time however long the texts are.
+    # given: see: True to also scroll orig text view to the highlight
+    def _procTextPointed(self, event, see=False):
+        src = self.procSource
+        if src is None:
+            return
+        pointed = f"@{event.x},{event.y}"
+        count = self.proctext.count("1.0", pointed, "chars")
+        if isinstance(count, tuple):
+            count = count[0]
+        idx = count or 0
+        if idx >= len(src.proc):
+            self._procTextUnpointed()
+            return
+        if idx == self.procPointedIdx and not see:
+            return
+
+        # find the word, or single space, under the mouse
+        start = idx
+        end = idx + 1
+        if src.proc[idx] != " ":
+            start = src.proc.rfind(" ", 0, idx) + 1
+            end = src.proc.find(" ", idx)
+            if end == -1:
+                end = len(src.proc)
+
+        origStart, origEnd = src.procmap.spanRange(start, end)
+        if origStart >= origEnd or origEnd > len(src.origrc):
+            self._procTextUnpointed()
+            return
+        startRow, startCol = src.origrc[origStart]
+        endRow, endCol = src.origrc[origEnd - 1]
+
+        self._procTextUnpointed()
+        self.procPointedIdx = idx
+        pointed = self.proctext.index(pointed)
+        self.proctext.tag_add("procmap", f"{pointed} - {idx - start} chars",
+                              f"{pointed} + {end - idx} chars")
+        self.origtext.tag_add("procmap", f"{startRow}.{startCol - 1}",
+                              f"{endRow}.{endCol}")
+        if see:
+            self.origtext.see(f"{startRow}.{startCol - 1}")
+
+    # Callback: Mouse left proc text view, or texts changed; removes any
+    # highlight
+    def _procTextUnpointed(self, *args):
+        if self.procPointedIdx is not None:
+            self.proctext.tag_remove("procmap", "1.0", "end")
+            self.origtext.tag_remove("procmap", "1.0", "end")
+        self.procPointedIdx = None
 
     ##### LICENSE TOKENIZING UI SETUP #####
 
@@ -239,17 +398,12 @@ class DebugUI:
         # FIXME note that the rest should maybe be pulled into separate function
 
         self._updateTokenLics()
-
-        # set up alternating listbox colors
-        alternate = False
-        for i in range(len(self.tokenLics)):
-            if alternate:
-                self.tokenLicIDs.itemconfigure(i, background="#f0f0ff")
-            alternate = not alternate
+        self._colorTokenLicIDs()
 
         # set up selection bindings
         self.tokenLicIDs.bind("<<ListboxSelect>>",
             lambda e: self._selectTokenLicId(self.tokenLicIDs.curselection()))
+        self.tokenLicFlat.bind("<<TreeviewOpen>>", self._openFlatTreeViewNode)
 
     ##### LICENSE TOKENIZING FUNCTIONS #####
 
@@ -263,10 +417,47 @@ class DebugUI:
         if self.tokenLicenseIDVar is None and self.window is not None:
             self.tokenLicenseIDVar = StringVar()
         if self.tokenLicenseIDVar is not None:
-            self.tokenLicenseIDVar.set(
-                sorted(self.tokenLics.keys(), key=str.casefold))
+            self.tokenLicenseIDVar.set(self.tokenLicIndex.ids)
         # FIXME probably also change tokenLicSelectedIDVar
 
+    # Refresh license list and views after self.tokenLics has been changed
+    # in place, e.g. by a LicenseDirWatcher reload
+    # given: changedIds, removedIds: as passed to AppData.licenseListeners;
+    #        the selected license is only redisplayed if it is in one of
+    #        them, or if both are None
+    def refreshTokenLics(self, changedIds=None, removedIds=None):
+        if self.tokenLicIDs is None:
+            return
+        self._updateTokenLics()
+        self._colorTokenLicIDs()
+
+        licid = self.tokenLicSelectedIDVar.get()
+        if licid == "":
+            return
+        if (changedIds is not None and licid not in changedIds and
+            licid not in removedIds):
+            return
+        self.tokenLicXML["state"] = "normal"
+        self.tokenLicXML.delete('1.0', 'end')
+        if licid in self.tokenLics:
+            self.tokenLicXML.insert('1.0',
+                self.origXMLCache.get(self.tokenLics[licid]))
+            self._fillFlatTreeView(licid)
+        else:
+            self.tokenLicSelectedIDVar.set("")
+            self.tokenLicFlat.delete(*self.tokenLicFlat.get_children())
+        self.tokenLicXML["state"] = "disabled"
+
+    # Helper function to set up alternating listbox colors
+    def _colorTokenLicIDs(self):
+        alternate = False
+        for i in range(len(self.tokenLics)):
+            if alternate:
+                self.tokenLicIDs.itemconfigure(i, background="#f0f0ff")
+            else:
+                self.tokenLicIDs.itemconfigure(i, background="")
+            alternate = not alternate
+
     # Callback: Selected license ID from self.tokenLicIDs listbox
     def _selectTokenLicId(self, selection):
         self.tokenLicXML["state"] = "normal"
@@ -279,24 +470,54 @@ class DebugUI:
             self.tokenLicXML.delete('1.0', 'end')
 
             # set selection
-            licid = sorted(self.tokenLics.keys(), key=str.casefold)[i]
+            licid = self.tokenLicIndex.ids[i]
             self.tokenLicSelectedIDVar.set(licid)
-            self.tokenLicXML.insert('1.0', self.tokenLics[licid].origXML)
+            self.tokenLicXML.insert('1.0',
+                self.origXMLCache.get(self.tokenLics[licid]))
             self._fillFlatTreeView(licid)
 
         self.tokenLicXML["state"] = "disabled"
 
-    # Called from _selectTokenLicId: Fill flat tree view for selected ID
+    # Called from _selectTokenLicId: Fill flat tree view for selected ID.
+    # Top-level nodes are inserted in batches via after(), and children of
+    # OPTIONAL nodes only when the node is opened, so that large licenses
+    # don't block the UI.
     def _fillFlatTreeView(self, licid):
-        # clear all existing tree nodes
+        # clear all existing tree nodes, and any still to be inserted
         self.tokenLicFlat.delete(*self.tokenLicFlat.get_children())
-
-        # add a node recursively for each flattened element
-        itemId = 0
-        for n in self.tokenLics[licid].textFlat:
-            itemId += 1
+        self.tokenFlatPending = {}
+        if self.tokenFlatAfterId is not None:
+            self.window.after_cancel(self.tokenFlatAfterId)
+            self.tokenFlatAfterId = None
+
+        self.tokenFlatQueue = [(str(i + 1), n) for i, n in
+                               enumerate(self.tokenLics[licid].textFlat)]
+        self.tokenFlatQueue.reverse()
+        self._insertFlatTreeViewBatch()
+        if len(self.tokenLicFlat.get_children()) > 0:
+            self.tokenLicFlat.see("1")
+
+    # Inserts the next batch of top-level nodes into the tree view
+    def _insertFlatTreeViewBatch(self):
+        self.tokenFlatAfterId = None
+        for _ in range(min(FLAT_TREE_BATCH, len(self.tokenFlatQueue))):
+            itemId, n = self.tokenFlatQueue.pop()
             self._insertFlatTreeViewNode("", n, itemId)
-        self.tokenLicFlat.see("1")
+        if len(self.tokenFlatQueue) > 0:
+            self.tokenFlatAfterId = self.window.after(
+                1, self._insertFlatTreeViewBatch)
+
+    # Callback: tree view node opened; insert its children if not yet done
+    def _openFlatTreeViewNode(self, *args):
+        itemId = self.tokenLicFlat.focus()
+        n = self.tokenFlatPending.pop(itemId, None)
+        if n is None:
+            return
+        self.tokenLicFlat.delete(*self.tokenLicFlat.get_children(itemId))
+        subItemId = 0
+        for subN in n.children:
+            subItemId += 1
+            self._insertFlatTreeViewNode(itemId, subN, f"{itemId}.{subItemId}")
 
     # Called from _fillFlatTreeView: Helper for inserting flattened token nodes
     def _insertFlatTreeViewNode(self, curnode, n, itemId):
@@ -305,22 +526,22 @@ class DebugUI:
         match n.type:
             case FlatType.WHITESPACE:
                 self.tokenLicFlat.insert(curnode, "end", itemId,
-                    text="SPACE", open=True, values=(n.lineno, ""))
+                    text="SPACE", values=(n.lineno, ""))
             case FlatType.TEXT:
                 self.tokenLicFlat.insert(curnode, "end", itemId,
-                    text="TEXT", open=True, values=(n.lineno, n.text.strip()))
+                    text="TEXT", values=(n.lineno, n.text.strip()))
             case FlatType.OPTIONAL:
                 self.tokenLicFlat.insert(curnode, "end", itemId,
-                    text="OPTIONAL", open=True, values=(n.lineno, ""))
-                # insert each child item
-                subItemId = 0
-                for subN in n.children:
-                    subItemId += 1
-                    self._insertFlatTreeViewNode(itemId, subN,
-                        f"{itemId}.{subItemId}")
+                    text="OPTIONAL", open=False, values=(n.lineno, ""))
+                # insert a placeholder child so that the item can be opened;
+                # its real children are inserted by _openFlatTreeViewNode
+                if len(n.children) > 0:
+                    self.tokenLicFlat.insert(itemId, "end", f"{itemId}.0",
+                        text="...")
+                    self.tokenFlatPending[itemId] = n
             case FlatType.REGEX:
                 self.tokenLicFlat.insert(curnode, "end", itemId,
-                    text="REGEX", open=True, values=(n.lineno, n.regex))
+                    text="REGEX", values=(n.lineno, n.regex))
 
     # Called from _insertFlatTreeViewNode for OPTIONAL / REGEX:
     # Get character to display spacing type
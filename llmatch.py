@@ -0,0 +1,618 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import hashlib
+import re
+import weakref
+
+from datatypes import FlatType
+from lltokenize import preprocess, rewriteAltRegex
+
+##### LICENSE MATCHING #####
+
+class LicenseMatcherConfig:
+    def __init__(self):
+        super(LicenseMatcherConfig, self).__init__()
+
+        # must the whole target text match the license (True), or can
+        # the license be found anywhere within the target text (False)?
+        self.fullMatch = True
+
+        # for finding multiple licenses in one text (see findAll()):
+        # number of consecutive words from the start of each license's
+        # required text to use as a seed for locating it
+        self.seedWords = 3
+
+        # how many characters before a seed a match can start, to allow
+        # for optional or regex parts before the seed words
+        self.seedLookback = 500
+
+        # assumed maximum length of text matched by a regex part, when
+        # bounding how far after a seed a match can extend
+        self.regexAllowance = 200
+
+# Represents a license that was found in a preprocessed target text.
+class MatchResult:
+    def __init__(self):
+        super(MatchResult, self).__init__()
+
+        # ID of matching license
+        self.licenseId = ""
+
+        # start and end (exclusive) indices of match within proc
+        self.procStart = 0
+        self.procEnd = 0
+
+        # start and end (exclusive) indices of match within orig
+        self.origStart = 0
+        self.origEnd = 0
+
+        # (row, col) tuples for first and last characters of match in orig
+        self.startRC = (0, 0)
+        self.endRC = (0, 0)
+
+# Creates a MatchResult for a matched portion of a preprocessed text.
+# given:   licId: ID of matching license
+#          res: PreprocessResult for target text
+#          procStart, procEnd: range of match within res.proc
+# returns: MatchResult
+def makeMatchResult(licId, res, procStart, procEnd):
+    mr = MatchResult()
+    mr.licenseId = licId
+    mr.procStart = procStart
+    mr.procEnd = procEnd
+    mr.origStart, mr.origEnd = res.procmap.spanRange(procStart, procEnd)
+    mr.startRC = res.origrc[mr.origStart]
+    mr.endRC = res.origrc[mr.origEnd - 1]
+    return mr
+
+# Converts a MatchResult into a dict, e.g. for a JSON response.
+def matchResultToDict(mr):
+    return {
+        "licenseId": mr.licenseId,
+        "proc": [mr.procStart, mr.procEnd],
+        "orig": [mr.origStart, mr.origEnd],
+        "start": {"row": mr.startRC[0], "col": mr.startRC[1]},
+        "end": {"row": mr.endRC[0], "col": mr.endRC[1]},
+    }
+
+# Gets the range of a proc string without its leading and trailing space
+# (if any).
+# returns: (startIdx, endIdx) tuple
+def _trimmedRange(proc):
+    startIdx = 0
+    endIdx = len(proc)
+    if proc.startswith(" "):
+        startIdx = 1
+    if endIdx > startIdx and proc.endswith(" "):
+        endIdx -= 1
+    return startIdx, endIdx
+
+# Hashes of each license's canonical text after preprocessing, so that a
+# target text which is a verbatim copy of a license can be identified in
+# O(n) time without running the matcher. Each license is indexed twice:
+# with all of its optional parts included, and with all of them omitted.
+# Regex parts (<alt>, bullets, copyright notices) use their default text
+# from the license XML, so a copy with a different copyright notice, for
+# instance, will not be found here.
+class ExactMatchIndex:
+    def __init__(self, tpcfg):
+        super(ExactMatchIndex, self).__init__()
+
+        # text preprocessor configuration, for converting license text
+        # into the same form as preprocessed target text
+        self.tpcfg = tpcfg
+
+        # dict of hash digest => list of license IDs with that text
+        self.licIdsByHash = {}
+
+        # dict of license ID => list of its hash digests, for removal
+        self.hashesByLicId = {}
+
+    # Indexes every license in a dict, replacing any existing entries.
+    # given:   lics: dict of license ID => datatypes.License, flattened
+    def build(self, lics):
+        self.licIdsByHash = {}
+        self.hashesByLicId = {}
+        for lic in lics.values():
+            self.add(lic)
+
+    # Indexes one license, replacing any existing entries for it.
+    # given:   lic: datatypes.License, already flattened
+    def add(self, lic):
+        self.remove(lic.id)
+        digests = []
+        for withOptional in (True, False):
+            text = self._canonicalText(lic.textFlat, withOptional)
+            digest = self._hashProc(preprocess(text, self.tpcfg).proc)
+            if digest in digests:
+                continue
+            digests.append(digest)
+            self.licIdsByHash.setdefault(digest, []).append(lic.id)
+        self.hashesByLicId[lic.id] = digests
+
+    # Returns a copy of the index, which can be updated without affecting
+    # this one, e.g. while this one is still in use by other threads.
+    def copy(self):
+        index = ExactMatchIndex(self.tpcfg)
+        index.licIdsByHash = {digest: list(licIds)
+                              for digest, licIds in self.licIdsByHash.items()}
+        index.hashesByLicId = {licId: list(digests)
+                               for licId, digests in self.hashesByLicId.items()}
+        return index
+
+    # Drops a license's entries, if any.
+    def remove(self, licId):
+        for digest in self.hashesByLicId.pop(licId, []):
+            licIds = self.licIdsByHash[digest]
+            licIds.remove(licId)
+            if len(licIds) == 0:
+                del self.licIdsByHash[digest]
+
+    # Updates entries after licenses change; see AppData.licenseListeners.
+    # given:   lics: dict of license ID => datatypes.License after changes
+    #          changedIds, removedIds: as passed to license listeners
+    def update(self, lics, changedIds, removedIds):
+        if changedIds is None:
+            self.build(lics)
+            return
+        for licId in removedIds:
+            self.remove(licId)
+        for licId in changedIds:
+            self.add(lics[licId])
+
+    # Finds licenses whose canonical text exactly matches a target text.
+    # given:   res: lltokenize.PreprocessResult for target text
+    # returns: list of MatchResults covering the whole text, in order of
+    #          license ID
+    def match(self, res):
+        startIdx, endIdx = _trimmedRange(res.proc)
+        if startIdx >= endIdx:
+            return []
+        licIds = self.licIdsByHash.get(
+            self._hashProc(res.proc[startIdx:endIdx]), [])
+        return [makeMatchResult(licId, res, startIdx, endIdx)
+                for licId in sorted(licIds, key=str.casefold)]
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to build a license's text from its LicenseFlats
+    def _canonicalText(self, flats, withOptional):
+        parts = []
+        for ft in flats:
+            match ft.type:
+                case FlatType.WHITESPACE:
+                    parts.append(" ")
+                case FlatType.TEXT | FlatType.REGEX:
+                    parts.append(ft.text)
+                case FlatType.OPTIONAL:
+                    if withOptional:
+                        parts.append(self._canonicalText(ft.children, True))
+        return "".join(parts)
+
+    # Helper function to hash preprocessed text, without leading or
+    # trailing space
+    def _hashProc(self, proc):
+        proc = proc.strip(" ")
+        return hashlib.sha256(proc.encode("utf-8", "surrogatepass")).digest()
+
+class LicenseMatcher:
+    def __init__(self, cfg, tpcfg):
+        super(LicenseMatcher, self).__init__()
+
+        # matcher configuration object
+        self.cfg = cfg
+
+        # text preprocessor configuration, for converting license text
+        # into the same form as preprocessed target text
+        self.tpcfg = tpcfg
+
+        # dict of license ID => compiled regex for matching preprocessed
+        # text, or None if the license's regex could not be compiled
+        self.patterns = {}
+
+        # dict of license ID => error message, for licenses whose regex
+        # could not be compiled
+        self.errors = {}
+
+        # dict of license ID => datatypes.License that its cached regex
+        # was compiled from, so that a regex compiled from an earlier
+        # version of a license (e.g. by a job still running when it was
+        # reloaded) is not used for the new version. Held weakly, so that
+        # licenses only needed for compiling can still be freed.
+        self.compiledLics = weakref.WeakValueDictionary()
+
+        # dict of license ID => (seed words tuple, maximum match length),
+        # for findAll(); seed words tuple is empty if no seed was found
+        self.seeds = {}
+
+        # dict of license ID => (compiled regex for the license from its
+        # seed's text part onwards, number of words in that part before
+        # the seed, number of parts before that part), for anchoring
+        # where a match starts; see _anchoredMatch(). Not present if the
+        # license has no seed.
+        self.anchors = {}
+
+    # Compiles a regex for matching a flattened License against
+    # preprocessed text, and caches it for later matches.
+    # given:   lic: datatypes.License, already flattened
+    # returns: compiled regex, or None if it could not be compiled
+    def compile(self, lic):
+        self.anchors.pop(lic.id, None)
+        try:
+            pattern = re.compile(self._flatsToRegex(lic.textFlat))
+            self.errors.pop(lic.id, None)
+        except re.error as e:
+            pattern = None
+            self.errors[lic.id] = str(e)
+        self.patterns[lic.id] = pattern
+        self.compiledLics[lic.id] = lic
+
+        seedIdx, skip = self._seedPosition(lic.textFlat)
+        if pattern is not None and seedIdx >= 0:
+            leadCount = sum(1 for ft in lic.textFlat[:seedIdx]
+                            if ft.type != FlatType.WHITESPACE)
+            try:
+                corePattern = re.compile(self._flatsToRegex(lic.textFlat[seedIdx:]))
+                self.anchors[lic.id] = (corePattern, skip, leadCount)
+            except re.error:
+                pass
+        return pattern
+
+    # Compiles and caches regexes for every license in a dict.
+    # given:   lics: dict of license ID => datatypes.License
+    def compileAll(self, lics):
+        for lic in lics.values():
+            self.compile(lic)
+
+    # Drops cached regexes, e.g. after licenses are reloaded.
+    # given:   licIds: list of license IDs to drop, or None for all
+    def invalidate(self, licIds=None):
+        if licIds is None:
+            self.patterns = {}
+            self.errors = {}
+            self.compiledLics = weakref.WeakValueDictionary()
+            self.seeds = {}
+            self.anchors = {}
+            return
+        for licId in licIds:
+            self.patterns.pop(licId, None)
+            self.errors.pop(licId, None)
+            self.compiledLics.pop(licId, None)
+            self.seeds.pop(licId, None)
+            self.anchors.pop(licId, None)
+
+    # Drops cached regexes for changed licenses; suitable for adding to
+    # AppData.licenseListeners.
+    def licensesChanged(self, changedIds, removedIds):
+        if changedIds is None:
+            self.invalidate()
+        else:
+            self.invalidate(changedIds + removedIds)
+
+    # Returns the compiled regex for a license, compiling it if needed
+    # or if the cached one was compiled from a different License.
+    def getPattern(self, lic):
+        if lic.id in self.patterns and self.compiledLics.get(lic.id) is lic:
+            return self.patterns[lic.id]
+        return self.compile(lic)
+
+    # Checks whether a license matches a preprocessed target text.
+    # given:   lic: datatypes.License, already flattened
+    #          res: lltokenize.PreprocessResult for target text
+    #          fullMatch: True / False to override cfg.fullMatch
+    # returns: MatchResult, or None if no match
+    def match(self, lic, res, fullMatch=None):
+        return self.matchPattern(lic.id, self.getPattern(lic), res, fullMatch)
+
+    # Checks whether an already-compiled license regex matches a
+    # preprocessed target text; see match() above. When searching, the
+    # match is anchored at the license's first required text if the
+    # license was compiled by this matcher, so that optional or regex
+    # parts at its start (e.g. a copyright notice matching ".*") do not
+    # take in the text before it.
+    # given:   licId: license ID for results
+    #          pattern: compiled regex for license, or None
+    #          res: lltokenize.PreprocessResult for target text
+    #          fullMatch: True / False to override cfg.fullMatch
+    # returns: MatchResult, or None if no match
+    def matchPattern(self, licId, pattern, res, fullMatch=None):
+        if pattern is None:
+            return None
+        if fullMatch is None:
+            fullMatch = self.cfg.fullMatch
+
+        startIdx, endIdx = _trimmedRange(res.proc)
+        if fullMatch:
+            m = pattern.fullmatch(res.proc, startIdx, endIdx)
+        elif self.patterns.get(licId) is pattern and licId in self.anchors:
+            return self._searchAnchored(licId, pattern, res, startIdx, endIdx)
+        else:
+            m = pattern.search(res.proc, startIdx, endIdx)
+        if m is None:
+            return None
+        return self._matchToResult(licId, res, m)
+
+    # Checks every license against a preprocessed target text.
+    # given:   lics: dict of license ID => datatypes.License
+    #          res: lltokenize.PreprocessResult for target text
+    #          fullMatch: True / False to override cfg.fullMatch
+    # returns: list of MatchResults, in order of license ID
+    def matchAll(self, lics, res, fullMatch=None):
+        results = []
+        for licId in sorted(lics.keys(), key=str.casefold):
+            # license may have been removed since starting
+            lic = lics.get(licId)
+            if lic is None:
+                continue
+            mr = self.match(lic, res, fullMatch)
+            if mr is not None:
+                results.append(mr)
+        return results
+
+    # Finds every occurrence of any license within a preprocessed target
+    # text, e.g. a NOTICE file which concatenates many licenses.
+    #
+    # Rather than searching the whole text for every license, the first few
+    # required words of each license are used as seeds: the text's words
+    # are scanned once for seeds, and each license is only searched for in
+    # a bounded window around where its seed occurs. Matches are taken
+    # from the start of the text onwards, and cannot overlap; where more
+    # than one license matches at the same seed, the one starting first
+    # (and then the longest) is used.
+    # given:   lics: dict of license ID => datatypes.License
+    #          res: lltokenize.PreprocessResult for target text
+    # returns: list of MatchResults, in order of position in the text
+    def findAll(self, lics, res):
+        seedIndex, seedLengths = self._buildSeedIndex(lics)
+
+        # scan words in proc for seeds
+        proc = res.proc
+        wordStarts = []
+        words = []
+        for m in re.finditer(r"[^ ]+", proc):
+            wordStarts.append(m.start())
+            words.append(m.group())
+
+        results = []
+        lastEnd = 0
+        for i, seedPos in enumerate(wordStarts):
+            if seedPos < lastEnd:
+                continue
+            best = None
+            for n in seedLengths:
+                for licId in seedIndex.get(tuple(words[i:i+n]), []):
+                    lic = lics.get(licId)
+                    if lic is None:
+                        continue
+                    mr = self._matchAtSeed(lic, res, seedPos, lastEnd)
+                    if mr is not None and (best is None or
+                        (mr.procStart, -mr.procEnd) < (best.procStart, -best.procEnd)):
+                        best = mr
+            if best is not None:
+                results.append(best)
+                lastEnd = best.procEnd
+        return results
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to convert a regex match in proc into a MatchResult,
+    # without including spacing around the match, e.g. from an absent
+    # optional part at the start or end
+    def _matchToResult(self, licId, res, m):
+        procStart, procEnd = m.span()
+        while procStart < procEnd and res.proc[procStart] == " ":
+            procStart += 1
+        while procEnd > procStart and res.proc[procEnd - 1] == " ":
+            procEnd -= 1
+        if procStart == procEnd:
+            return None
+        return makeMatchResult(licId, res, procStart, procEnd)
+
+    # Helper function to build a dict of seed words tuple => list of
+    # license IDs, and the list of distinct seed lengths (longest first)
+    def _buildSeedIndex(self, lics):
+        seedIndex = {}
+        for licId in sorted(lics.keys(), key=str.casefold):
+            seed, _ = self._getSeed(lics[licId])
+            if len(seed) > 0:
+                seedIndex.setdefault(seed, []).append(licId)
+        seedLengths = sorted({len(seed) for seed in seedIndex}, reverse=True)
+        return seedIndex, seedLengths
+
+    # Helper function to get the seed words and maximum match length for
+    # a license, computing them if needed
+    def _getSeed(self, lic):
+        if lic.id not in self.seeds:
+            self.seeds[lic.id] = (self._seedWords(lic.textFlat),
+                                  self._maxLength(lic.textFlat))
+        return self.seeds[lic.id]
+
+    # Helper function to search for a license in the window around a seed
+    # found at seedPos in proc, not starting before minStart
+    def _matchAtSeed(self, lic, res, seedPos, minStart):
+        pattern = self.getPattern(lic)
+        if pattern is None or lic.id not in self.anchors:
+            return None
+        corePattern, skip, _ = self.anchors[lic.id]
+        _, maxLength = self._getSeed(lic)
+        proc = res.proc
+
+        # the seed's text part starts skip words before the seed
+        coreStart = seedPos
+        for _ in range(skip):
+            coreStart = proc.rfind(" ", 0, coreStart - 1) + 1
+        if coreStart < minStart:
+            return None
+        winEnd = min(len(proc), seedPos + maxLength)
+        m = corePattern.match(proc, coreStart, winEnd)
+        if m is None or m.end() <= seedPos:
+            return None
+        # only accept matches of whole words
+        if m.end() < len(proc) and proc[m.end()] != " " and proc[m.end() - 1] != " ":
+            return None
+        return self._anchoredMatch(lic.id, pattern, res, coreStart, m.end(),
+                                   minStart)
+
+    # Helper function to search for the first match of a license from
+    # its anchors, for matchPattern()
+    def _searchAnchored(self, licId, pattern, res, startIdx, endIdx):
+        corePattern, _, _ = self.anchors[licId]
+        pos = startIdx
+        while pos < endIdx:
+            m = corePattern.search(res.proc, pos, endIdx)
+            if m is None:
+                return None
+            mr = self._anchoredMatch(licId, pattern, res, m.start(), m.end(),
+                                     startIdx)
+            if mr is not None:
+                return mr
+            pos = m.start() + 1
+        return None
+
+    # Helper function to find where a license match starts, given where
+    # the text from its seed's part onwards was matched in proc, as
+    # [coreStart, coreEnd). The parts before that (e.g. a title and a
+    # copyright notice) are only allowed to take in whole lines of orig,
+    # at most one line per part, going back from the line containing
+    # coreStart, and no further back than cfg.seedLookback or minStart.
+    # Otherwise a part matching ".*" would take in all of the text
+    # before the license.
+    # returns: MatchResult, or None if the parts before coreStart could
+    #          not be matched
+    def _anchoredMatch(self, licId, pattern, res, coreStart, coreEnd, minStart):
+        _, _, leadCount = self.anchors[licId]
+        minStart = max(minStart, coreStart - self.cfg.seedLookback)
+        m = pattern.fullmatch(res.proc, coreStart, coreEnd)
+        if leadCount > 0:
+            for lineStart in self._lineStartsBefore(res, coreStart, minStart):
+                lm = pattern.fullmatch(res.proc, lineStart, coreEnd)
+                if lm is not None:
+                    m = lm
+                elif m is not None:
+                    break
+                leadCount -= 1
+                if leadCount == 0:
+                    break
+        if m is None:
+            return None
+        return self._matchToResult(licId, res, m)
+
+    # Helper generator for the start in proc of each line in orig before
+    # procIdx, nearest first, starting with the line containing procIdx
+    # (if procIdx is partway through it) and skipping lines with no text
+    # in proc. Stops before any line starting before minStart.
+    def _lineStartsBefore(self, res, procIdx, minStart):
+        if procIdx >= len(res.proc):
+            return
+        origIdx = res.procmap.span(procIdx)[0]
+        while True:
+            _, col = res.origrc[origIdx]
+            lineStart = origIdx - col + 1
+            idx = res.procmap.procIndex(lineStart)
+            if idx < len(res.proc) and res.proc[idx] == " ":
+                idx += 1
+            if idx < minStart:
+                break
+            if idx < procIdx:
+                yield idx
+                procIdx = idx
+            if lineStart == 0:
+                break
+            origIdx = lineStart - 1
+
+    # Helper function to get the first words of a license's required text
+    # (up to cfg.seedWords of them) as they would appear in proc; see
+    # _seedPosition().
+    def _seedWords(self, flats):
+        idx, first = self._seedPosition(flats)
+        if idx < 0:
+            return ()
+        words = self._textWords(flats[idx])
+        last = len(words)
+        if any(f.type != FlatType.WHITESPACE for f in flats[idx+1:]):
+            last -= 1
+        return tuple(words[first:min(last, first + self.cfg.seedWords)])
+
+    # Helper function to find which of a license's text parts its seed
+    # words come from. Since spacing between parts is optional, a word is
+    # only used if it is joined by a space to another word in the same
+    # text part, or is at the very start or end of the license, so that
+    # it cannot run into neighbouring text.
+    # returns: (index of text part in flats, number of words in that part
+    #          before the seed) tuple, or (-1, 0) if there is no seed
+    def _seedPosition(self, flats):
+        for idx, ft in enumerate(flats):
+            if ft.type != FlatType.TEXT:
+                continue
+            words = self._textWords(ft)
+            if len(words) == 0:
+                continue
+            atStart = all(f.type == FlatType.WHITESPACE for f in flats[:idx])
+            atEnd = all(f.type == FlatType.WHITESPACE for f in flats[idx+1:])
+            first = 0 if atStart else 1
+            last = len(words) if atEnd else len(words) - 1
+            if first < last:
+                return idx, first
+        return -1, 0
+
+    # Helper function to get the words of a text part as in proc
+    def _textWords(self, ft):
+        return [w for w in preprocess(ft.text, self.tpcfg).proc.split(" ")
+                if w != ""]
+
+    # Helper function to get an upper bound on the length of proc text
+    # that a list of LicenseFlats can match
+    def _maxLength(self, flats):
+        total = 0
+        for ft in flats:
+            match ft.type:
+                case FlatType.WHITESPACE:
+                    total += 1
+                case FlatType.TEXT:
+                    total += len(preprocess(ft.text, self.tpcfg).proc) + 1
+                case FlatType.OPTIONAL:
+                    total += self._maxLength(ft.children) + 1
+                case FlatType.REGEX:
+                    total += self.cfg.regexAllowance + 1
+        return total
+
+    # Helper function to build a regex string from a list of LicenseFlats.
+    # Whitespace between parts is optional, since preprocessed text only
+    # contains single spaces and optional parts may or may not be present.
+    def _flatsToRegex(self, flats):
+        parts = []
+        pendingSpace = False
+        for ft in flats:
+            match ft.type:
+                case FlatType.WHITESPACE:
+                    pendingSpace = True
+                    continue
+                case FlatType.TEXT:
+                    proc = preprocess(ft.text, self.tpcfg).proc
+                    if proc.startswith(" "):
+                        pendingSpace = True
+                    words = proc.split(" ")
+                    part = " ".join(re.escape(w) for w in words if w != "")
+                    if part == "":
+                        continue
+                    trailingSpace = proc.endswith(" ")
+                case FlatType.OPTIONAL:
+                    sub = self._flatsToRegex(ft.children)
+                    if sub == "":
+                        continue
+                    part = f"(?:{sub})?"
+                    trailingSpace = False
+                case FlatType.REGEX:
+                    # <alt> regexes are written against the original text,
+                    # so use them rewritten for preprocessed text
+                    part = f"(?:{rewriteAltRegex(ft.regex, self.tpcfg)})"
+                    trailingSpace = False
+                case _:
+                    raise ValueError(f"Invalid flattened node {ft}")
+
+            if len(parts) > 0 and pendingSpace:
+                parts.append(" ?")
+            parts.append(part)
+            pendingSpace = trailingSpace
+        return "".join(parts)
@@ -1,9 +1,12 @@
 # SPDX-License-Identifier: MIT
 # Copyright 2025 Steve Winslow
 
+import os
 import re
+import unicodedata
 
 from datatypes import License, LicenseFlat, FlatType, TargetText
+from textmap import ProcMap, RowColIndex
 
 ##### LICENSE XML TEXT TOKENIZING #####
 
@@ -89,7 +92,26 @@ class LicenseTokenizer:
 
 ##### REGEXES FOR MATCHING GUIDELINES PROCESSING #####
 
-EQUIVALENTWORDS_PATH = "resources/equivalentwords.txt"
+# relative to this module, so that tools can be run from any directory
+EQUIVALENTWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "resources", "equivalentwords.txt")
+
+# Translate table for lowercasing one character at a time with str.translate.
+# Entries are filled in the first time each character is seen. Also tracks
+# the (rare) characters that get longer when lowercased, e.g. "İ".
+class LowercaseTable(dict):
+    def __init__(self):
+        super(LowercaseTable, self).__init__()
+
+        # set of characters whose lowercase form is >1 character long
+        self.expanding = set()
+
+    def __missing__(self, key):
+        lo = chr(key).lower()
+        if len(lo) > 1:
+            self.expanding.add(chr(key))
+        self[key] = lo
+        return lo
 
 class TextPreprocessorRegexes:
     def __init__(self, equivalentsPath):
@@ -103,6 +125,10 @@ class TextPreprocessorRegexes:
         # because we don't want the matching for spacing to capture the line break
         self._step2Regex = re.compile(r"(^|\n)([ \t\r\f\v]*)([/*#;%]+)([ \t\r\f\v]*)")
 
+        # Step 3: Convert to lowercase
+        # (not a regex, but a translate table for non-ASCII text)
+        self._step3Table = LowercaseTable()
+
         # Step 4(a): Remove separators on own lines with optional whitespace
         #_step4aRegex = re.compile(r"(^|\n)([ \t\r\f\v]*)[^a-zA-Z0-9\s]\1{2,}([ \t\r\f\v]*)")
         self._step4aRegex = re.compile(r"(^|\n)([ \t\r\f\v]*)([^a-zA-Z0-9\s])\3{2,}([ \t\r\f\v]*)")
@@ -124,6 +150,17 @@ class TextPreprocessorRegexes:
         # Step 5(b): Convert http protocol
         self._step5bRegex = re.compile(r"http\:\/\/")
 
+        # Steps 4(b) through 5(b) combined, for a single pass over the text.
+        # Single chars that would just be replaced by themselves (a space,
+        # hyphen-minus or straight single quote) are not matched.
+        self._step4bTo5bRegex = re.compile(
+            r"(?P<whitespace>\s{2,}|[^\S ])|"
+            r"(?P<hyphens>[-‐‑‒–—―]{2,}|[‐‑‒–—―])|"
+            r"(?P<quotes>['\"«»‘’‚‛“”„‟‹›`]{2,}|[\"«»‘’‚‛“”„‟‹›`])|"
+            r"(?P<copyright>©)|"
+            r"(?P<http>http\:\/\/)"
+        )
+
         # Step 5(c): Convert equivalent words
         # list of tuples in form [(to, from, regexFrom), ...]
         self._equivalents = []
@@ -137,6 +174,12 @@ class TextPreprocessorRegexes:
                 re.compile(r"(^|[^a-zA-Z])(" + res[1] + r")($|[^a-zA-Z])")
             ))
 
+        # <alt> regexes rewritten for preprocessed text, as dicts of
+        # original regex => rewritten regex string, and => compiled regex;
+        # see rewriteAltRegex()
+        self._altRegexes = {}
+        self._altPatterns = {}
+
 ##### TEXT PREPROCESSING #####
 
 class TextPreprocessorConfig:
@@ -150,6 +193,42 @@ class TextPreprocessorConfig:
         # regexes for preprocessor
         self.regexes = TextPreprocessorRegexes(EQUIVALENTWORDS_PATH)
 
+# Represents the results from preprocessing a text string. See
+# TextPreprocessor.clear() for descriptions of each attribute.
+# Attributes cannot be reassigned, and origrc and procmap are frozen (see
+# RowColIndex.freeze() and ProcMap.freeze()), so that a result can be
+# shared freely, e.g. between threads.
+class PreprocessResult:
+    __slots__ = ("orig", "origrc", "proc", "procmap")
+
+    def __init__(self, orig, origrc, proc, procmap):
+        super(PreprocessResult, self).__init__()
+        object.__setattr__(self, "orig", orig)
+        object.__setattr__(self, "origrc", origrc)
+        object.__setattr__(self, "proc", proc)
+        object.__setattr__(self, "procmap", procmap)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PreprocessResult is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("PreprocessResult is read-only")
+
+# Converts a text string into a list of transformed and cleaned
+# characters, implementing portions of the SPDX Matching Guidelines,
+# with mappings to original string's corresponding characters.
+# No state is kept between calls, so this can be called concurrently
+# from multiple threads sharing the same cfg.
+# given:   target: text string to process
+#          cfg: TextPreprocessorConfig
+# returns: PreprocessResult
+def preprocess(target, cfg):
+    tp = TextPreprocessor(cfg)
+    tp._runSteps(target)
+    tp.origrc.freeze()
+    tp.procmap.freeze()
+    return PreprocessResult(tp.orig, tp.origrc, tp.proc, tp.procmap)
+
 class TextPreprocessor:
     def __init__(self, cfg):
         super(TextPreprocessor, self).__init__()
@@ -168,78 +247,83 @@ class TextPreprocessor:
         self.orig = ""
 
         # mapping from original string to row/col values
-        # list of tuples [(r1, c1), (r2, c2), ...] corresponding to
-        # row/col values of each character in self.orig
-        self.origrc = []
+        # RowColIndex where origrc[i] gives the (row, col) tuple for
+        # the i'th character in self.orig
+        self.origrc = RowColIndex()
 
         # processed and converted string, ready for matching
         self.proc = ""
 
         # mapping from proc string to orig string
-        # list of indices corresponding to iself.orig index of each
-        # character in self.proc
-        self.procmap = []
+        # ProcMap with the span of self.orig characters corresponding to
+        # each character in self.proc; procmap[i] gives the start index
+        self.procmap = ProcMap()
+
+        # PreprocessResult from most recent call to process()
+        self.result = None
 
     # Converts a text string into a list of transformed and cleaned
-    # characters, implementing portions of the SPDX Matching Guidelines,
-    # with mappings to original string's corresponding characters.
+    # characters; see preprocess() above.
     # given:  target: text string to process
     # result: Preprocessor is completed and values filled in
     def process(self, target):
+        self.clear()
+        self.result = preprocess(target, self.cfg)
+        self.orig = self.result.orig
+        self.origrc = self.result.origrc
+        self.proc = self.result.proc
+        self.procmap = self.result.procmap
+
+    # Runs each processing step in turn, storing results in this object.
+    # Called from preprocess().
+    def _runSteps(self, target):
         self.clear()
         self.orig = target
         self._step1()
         self._step2()
         self._step3()
         self._step4a()
-        self._step4b()
-        self._step4c()
-        self._step4d()
-        self._step5a()
-        self._step5b()
+        self._step4bTo5b()
         self._step5c()
 
     ##### PROCESSING STEP FUNCTIONS #####
 
     # Step 1: prepare row and col values
     def _step1(self):
-        self.origrc = []
-        r = 1
-        c = 0
-        for i in self.orig:
-            c += 1
-            self.origrc.append((r, c))
-            if i == "\n":
-                r += 1
-                c = 0
+        self.origrc = RowColIndex(self.orig)
 
     # Step 2: replace leading comment characters with spaces
     def _step2(self):
         self.proc = re.sub(self.cfg.regexes._step2Regex,
             lambda m: m.group(1) + m.group(2) + " "*len(m.group(3)) + m.group(4),
             self.orig)
-        self.procmap = list(range(len(self.proc)))
+        self.procmap = ProcMap(len(self.proc))
 
     # Step 3: convert to lowercase, adjusting character locations as needed
     def _step3(self):
-        newProcList = []
-        newProcMap = []
-        origIdx = 0
+        # fast path: lowercasing ASCII text never changes its length
+        if self.proc.isascii():
+            self.proc = self.proc.lower()
+            return
 
-        for c in list(self.proc):
-            lo = c.lower()
-            newProcList.append(lo)
+        # otherwise, lowercase character by character via the translate
+        # table. note that str.lower() on the whole string is not the same
+        # as for each separate character, e.g. for a final capital sigma.
+        table = self.cfg.regexes._step3Table
+        lowered = self.proc.translate(table)
+        if len(lowered) == len(self.proc):
+            self.proc = lowered
+            return
 
-            # if result is 1 character, just add current origIdx to procmap.
-            # if result is >1, need to adjust origIdx accordingly.
-            # note that this assumes that Step 3 is the first step to change
-            # procmap from anything other than a 1:1 mapping.
-            for _ in range(len(lo)):
-                newProcMap.append(origIdx)
-            origIdx += 1
+        # if any characters became longer, only adjust procmap around those,
+        # adding repeats of each one's span for the added characters.
+        edits = []
+        expandRegex = "[" + re.escape("".join(sorted(table.expanding))) + "]"
+        for m in re.finditer(expandRegex, self.proc):
+            edits.append((m.start(), 1, len(table[ord(m.group(0))])))
 
-        self.proc = "".join(newProcList)
-        self.procmap = newProcMap
+        self.proc = lowered
+        self.procmap = self.procmap.applyEdits(edits)
 
     # Step 4(a): remove separators (>3 adjacent non-alphanumeric characters)
     def _step4a(self):
@@ -271,6 +355,23 @@ class TextPreprocessor:
     def _step5b(self):
         self._helperReplaceAll(self.cfg.regexes._step5bRegex, lambda _: "https://")
 
+    # Steps 4(b) through 5(b), combined into a single pass. The results are
+    # the same as calling each of those steps in order, since each one
+    # matches different characters than the others and none of their
+    # replacements can create a new match for a later step.
+    def _step4bTo5b(self):
+        replacements = {
+            "whitespace": lambda m: " ",
+            "hyphens": lambda m: "-" if self.cfg.combineHyphens else "-"*(len(m.group(0))),
+            "quotes": lambda m: "'",
+            "copyright": lambda m: "(c)",
+            "http": lambda m: "https://",
+        }
+        self._helperReplaceEach(
+            self.cfg.regexes._step4bTo5bRegex,
+            lambda m: replacements[m.lastgroup](m)
+        )
+
     # Step 5(c): convert equivalent words
     def _step5c(self):
         for equivTuple in self.cfg.regexes._equivalents:
@@ -292,21 +393,10 @@ class TextPreprocessor:
         # replace characters in self.proc
         self.proc = self.proc[:startIdx] + newText + self.proc[startIdx+numReplace:]
 
-        # determine what we're doing to self.procmap based on difference
-        # in length of old vs. replacement characters
+        # adjust self.procmap for the difference in length of old vs.
+        # replacement characters; see ProcMap.applyEdits()
         lt = len(newText)
-        diff = lt - numReplace
-        if diff < 0:
-            # shorter string => remove excess characters
-            repStart = startIdx + lt
-            repEnd = repStart - diff
-            self.procmap[repStart:repEnd] = []
-        elif diff > 0:
-            # longer string => add repeats of last extended value
-            ext = startIdx + numReplace
-            rep = [self.procmap[ext - 1]] * diff
-            self.procmap = self.procmap[:ext] + rep + self.procmap[ext:]
-        # no change to procmap if diff == 0
+        self.procmap.replace(startIdx, numReplace, lt)
 
         # return index of next unreplaced character
         return startIdx + lt
@@ -325,3 +415,590 @@ class TextPreprocessor:
             if m is None:
                 break
             idx = self._helperReplace(m.start() + idx, m.end()-m.start(), l(m))
+
+    # Helper function to replace all portions of a string matching a regex in
+    # a single left-to-right pass, and adjust procmap. Procmap is adjusted
+    # the same way as for _helperReplace.
+    # Unlike _helperReplaceAll, the search does not restart after each
+    # replacement, so "^" in r will not match following a replaced portion.
+    # given:  - r: compiled regex to match against
+    #         - l: function taking an re.Match object and returning string
+    #              to replace matched portion
+    # result: all instances of matching strings are replaced with corresponding
+    #         calls to l(m); self.procmap is updated
+    def _helperReplaceEach(self, r, l):
+        newProcList = []
+        edits = []
+        prevIdx = 0
+
+        for m in r.finditer(self.proc):
+            newText = l(m)
+            if newText == m.group(0):
+                continue
+            startIdx, endIdx = m.span()
+
+            # copy unchanged characters preceding this match, then add
+            # replacement
+            newProcList.append(self.proc[prevIdx:startIdx])
+            newProcList.append(newText)
+            edits.append((startIdx, endIdx - startIdx, len(newText)))
+            prevIdx = endIdx
+
+        if len(edits) == 0:
+            return
+        newProcList.append(self.proc[prevIdx:])
+        self.proc = "".join(newProcList)
+        self.procmap = self.procmap.applyEdits(edits)
+
+##### STREAMING TEXT PREPROCESSING #####
+
+class StreamingTextPreprocessor:
+    def __init__(self, cfg, segmentSize=65536, maxBuffer=1048576):
+        super(StreamingTextPreprocessor, self).__init__()
+
+        # preprocessor configuration object
+        self.cfg = cfg
+
+        # minimum number of buffered characters before looking for a
+        # place to cut off the next segment
+        self.segmentSize = segmentSize
+
+        # number of buffered characters after which a segment will be
+        # cut off, even if no safe cut point has been found
+        self.maxBuffer = maxBuffer
+
+        # candidate cut points: a whitespace character followed by an
+        # ASCII letter or digit. see _isSafeCut() for why these are safe.
+        self._cutRegex = re.compile(r"\s[a-zA-Z0-9]")
+
+        # words which begin a multi-word equivalent (e.g. "per" for
+        # "per cent"); a cut following one of these could split a match
+        self._joinWords = set()
+        for equivTuple in self.cfg.regexes._equivalents:
+            self._joinWords.update(equivTuple[1].split(" ")[:-1])
+
+        # see clear() below for default attribute settings
+        self.clear()
+
+    # Clears any pre-existing values for the stream.
+    def clear(self):
+        # text received but not yet processed
+        self.pending = ""
+
+        # index within the overall input of the first char in self.pending
+        self.origOffset = 0
+
+        # index within self.pending from which to resume looking for a cut
+        self._scanIdx = 0
+
+    # Adds the next chunk of input text to the stream, and processes any
+    # segments of the buffered text that can now be completed.
+    # given:   chunk: next portion of the input text
+    # returns: list of (proc, procmap) tuples for each completed segment,
+    #          where procmap is a ProcMap with indices relative to the
+    #          start of the overall input
+    def feed(self, chunk):
+        self.pending += chunk
+        results = []
+        while len(self.pending) >= self.segmentSize:
+            cut = self._findCut()
+            if cut is None:
+                break
+            results.append(self._processSegment(cut))
+        return results
+
+    # Processes whatever remains buffered at the end of the input.
+    # returns: list of (proc, procmap) tuples, as for feed()
+    def finish(self):
+        results = []
+        if self.pending != "":
+            results.append(self._processSegment(len(self.pending)))
+        self.clear()
+        return results
+
+    # Processes an iterable of input chunks.
+    # given:   chunks: iterable of text strings, e.g. a file object
+    # returns: generator of (proc, procmap) tuples, as for feed()
+    def processStream(self, chunks):
+        self.clear()
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        yield from self.finish()
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to find where the next segment should end.
+    # returns: index in self.pending at which to cut, or None if more
+    #          input is needed first
+    def _findCut(self):
+        start = max(self._scanIdx, self.segmentSize)
+        for m in self._cutRegex.finditer(self.pending, start):
+            if self._isSafeCut(self.pending, m.start() + 1):
+                return m.start() + 1
+        self._scanIdx = max(start, len(self.pending) - 1)
+
+        if len(self.pending) < self.maxBuffer:
+            return None
+
+        # no safe cut point found in a very long stretch of text. cut after
+        # the last whitespace so that memory use stays bounded.
+        # FIXME output for a forced cut may differ slightly from processing
+        # FIXME the whole text at once, e.g. if it splits a whitespace run
+        ws = max(self.pending.rfind(" ", 0, self.maxBuffer),
+                 self.pending.rfind("\n", 0, self.maxBuffer))
+        if ws <= 0:
+            return self.maxBuffer
+        return ws + 1
+
+    # Helper function to determine whether the text can be split at idx
+    # without changing the results of any preprocessing step. Every step
+    # is a local rewrite, and none of them can match across a whitespace
+    # character followed by an ASCII letter or digit:
+    #   - steps 2 and 4(a) need a comment or separator char, not alphanumeric,
+    #     after any leading whitespace on a line;
+    #   - step 4(b) whitespace runs end before the alphanumeric char;
+    #   - steps 4(c)-5(b) never match whitespace;
+    # except for step 5(c) equivalents containing a space, such as
+    # "per cent", which are checked separately here.
+    # given:   text: text to cut, e.g. self.pending
+    #          idx: index in text of an alphanumeric char that follows a
+    #               whitespace char
+    # returns: True if safe to cut immediately before idx
+    def _isSafeCut(self, text, idx):
+        # find the last word preceding idx. skip over any punctuation as
+        # well as whitespace, since comment chars and separators may end
+        # up being removed by steps 2 and 4(a).
+        wordEnd = idx - 1
+        while wordEnd > 0 and not self._isWordChar(text[wordEnd - 1]):
+            wordEnd -= 1
+        wordStart = wordEnd
+        while wordStart > 0 and self._isLetter(text[wordStart - 1]):
+            wordStart -= 1
+        word = text[wordStart:wordEnd].lower()
+        return word not in self._joinWords
+
+    # Helper function to check for a char that is an ASCII letter after
+    # lowercasing (e.g. including the Kelvin sign)
+    def _isLetter(self, c):
+        lo = c.lower()
+        return lo.isascii() and lo.isalpha()
+
+    # Helper function to check for a char that is an ASCII letter or digit
+    # after lowercasing
+    def _isWordChar(self, c):
+        lo = c.lower()
+        return lo.isascii() and lo.isalnum()
+
+    # Helper function to process the first cut characters in self.pending
+    # and remove them from the buffer.
+    # returns: (proc, procmap) tuple for the processed segment
+    def _processSegment(self, cut):
+        res = preprocess(self.pending[:cut], self.cfg)
+        proc = res.proc
+        procmap = ProcMap()
+        procmap.extendFrom(res.procmap, origOffset=self.origOffset)
+
+        self.pending = self.pending[cut:]
+        self.origOffset += cut
+        self._scanIdx = 0
+        return (proc, procmap)
+
+# Keeps a preprocessed text up to date as the original text is edited,
+# reprocessing only the part that changed. The changed part is widened by
+# a few lines of context, and then out to safe cut points (as used by
+# StreamingTextPreprocessor) in both the old and new text, so that the
+# reprocessed part can be spliced between the unchanged parts of proc and
+# procmap with the same results as processing the whole text again.
+class IncrementalTextPreprocessor:
+    # given: cfg: TextPreprocessorConfig
+    #        contextLines: number of extra lines to reprocess on each side
+    #                      of the changed part
+    def __init__(self, cfg, contextLines=2):
+        super(IncrementalTextPreprocessor, self).__init__()
+
+        # preprocessor configuration object
+        self.cfg = cfg
+
+        # number of extra lines to reprocess on each side of a change
+        self.contextLines = contextLines
+
+        # streaming preprocessor, used for its safe cut checks
+        self._cutter = StreamingTextPreprocessor(cfg)
+
+        # see clear() below for default attribute settings
+        self.clear()
+
+    # Clears any pre-existing values for preprocessor.
+    def clear(self):
+        # current original text, row/col index, processed text and
+        # procmap; see TextPreprocessor.clear()
+        self.orig = ""
+        self.origrc = RowColIndex()
+        self.proc = ""
+        self.procmap = ProcMap()
+
+    # Updates the processed text for a new version of the original text.
+    # given:   target: new original text
+    # returns: (procStart, oldProcEnd, newProcEnd) tuple, where
+    #          proc[procStart:oldProcEnd] before the update was replaced by
+    #          proc[procStart:newProcEnd] after it
+    def update(self, target):
+        old = self.orig
+        if target == old:
+            return (0, 0, 0)
+
+        # find the changed part of the text
+        limit = min(len(old), len(target))
+        prefix = self._commonLength(old, target, limit, False)
+        suffix = self._commonLength(old, target, limit - prefix, True)
+        delta = len(target) - len(old)
+
+        # widen it by whole lines of context, then to safe cuts
+        cutStart = prefix
+        for _ in range(self.contextLines + 1):
+            cutStart = target.rfind("\n", 0, max(0, cutStart - 1)) + 1
+        while cutStart > 0 and not (self._isCut(target, cutStart) and
+                                    self._isCut(old, cutStart)):
+            cutStart -= 1
+        cutEnd = len(target) - suffix
+        for _ in range(self.contextLines + 1):
+            nl = target.find("\n", cutEnd)
+            cutEnd = len(target) if nl == -1 else nl + 1
+        while cutEnd < len(target) and not (self._isCut(target, cutEnd) and
+                                            self._isCut(old, cutEnd - delta)):
+            cutEnd += 1
+
+        # reprocess the widened part, and splice it in
+        res = preprocess(target[cutStart:cutEnd], self.cfg)
+        procStart = self.procmap.procIndex(cutStart)
+        procEnd = self.procmap.procIndex(cutEnd - delta)
+        if cutStart == 0:
+            procStart = 0
+        if cutEnd == len(target):
+            procEnd = len(self.proc)
+
+        procmap = ProcMap()
+        procmap.extendFrom(self.procmap, 0, procStart)
+        procmap.extendFrom(res.procmap, origOffset=cutStart)
+        procmap.extendFrom(self.procmap, procEnd, origOffset=delta)
+
+        self.orig = target
+        self.origrc = RowColIndex(target)
+        self.proc = self.proc[:procStart] + res.proc + self.proc[procEnd:]
+        self.procmap = procmap
+        return (procStart, procEnd, procStart + len(res.proc))
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to find the length of the common prefix (or suffix)
+    # of two strings, up to limit, by binary search over slice comparisons
+    # rather than comparing each character in Python
+    def _commonLength(self, a, b, limit, fromEnd):
+        lo, hi = 0, limit
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if fromEnd:
+                same = a[len(a)-mid:] == b[len(b)-mid:]
+            else:
+                same = a[:mid] == b[:mid]
+            if same:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    # Helper function to check whether text can be cut immediately before
+    # idx; see StreamingTextPreprocessor._isSafeCut()
+    def _isCut(self, text, idx):
+        if idx <= 0 or idx >= len(text):
+            return False
+        if self._cutter._cutRegex.match(text, idx - 1) is None:
+            return False
+        return self._cutter._isSafeCut(text, idx)
+
+##### ALT REGEX REWRITING #####
+
+# characters which preprocessing converts to a single "'" or "-"; see
+# steps 4(c) and 4(d)
+_ALT_QUOTES = "'\"«»‘’‚‛“”„‟‹›`"
+_ALT_HYPHENS = "-‐‑‒–—―"
+
+# regexes for group openings and repeats in <alt> regexes, which are copied
+# unchanged
+_ALT_GROUP_REGEX = re.compile(
+    r"\(\?(?:P<\w+>|P=\w+\)|#[^)]*\)|<[=!]|[:=!>]|[aiLmsux-]+[:)])")
+_ALT_REPEAT_REGEX = re.compile(r"(?:[*+?]|\{\d+(?:,\d*)?\}|\{,\d+\})[?+]?")
+
+# regex for the http protocol in a rewritten regex; see step 5(b)
+_ALT_HTTP_REGEX = re.compile(r"http(?=:(?:\\?/){2})")
+
+# regex for the minimum count of a repeat
+_ALT_REPEAT_MIN_REGEX = re.compile(r"\{(\d+)")
+
+# regex for escapes of a single character by its code or name, e.g. "\xA9"
+_ALT_CHAR_ESCAPE_REGEX = re.compile(
+    r"\\(?:x(?P<hex>[0-9a-fA-F]{2})|u(?P<hex4>[0-9a-fA-F]{4})|"
+    r"U(?P<hex8>[0-9a-fA-F]{8})|N\{(?P<name>[^}]+)\})")
+
+# Rewrites an <alt> regex, which is written against the original license
+# text, into an equivalent regex for text preprocessed with cfg: letters
+# are lowercased, whitespace matches any run of whitespace, quote-like and
+# hyphen-like characters match their converted forms, the copyright
+# symbol and http protocol are converted, and words with equivalents (step
+# 5(c)) also match the equivalent word. Results are cached in cfg.regexes,
+# so each distinct regex is only rewritten once.
+# given:   regex: <alt> regex string
+#          cfg: TextPreprocessorConfig
+# returns: rewritten regex string; if it could not be rewritten, the
+#          original regex made case-insensitive instead
+def rewriteAltRegex(regex, cfg):
+    cache = cfg.regexes._altRegexes
+    rewritten = cache.get(regex)
+    if rewritten is None:
+        try:
+            rewritten = _rewriteAltRegex(regex, cfg)
+            re.compile(rewritten)
+        except (re.error, KeyError):
+            rewritten = f"(?i:{regex})"
+        cache[regex] = rewritten
+    return rewritten
+
+# Returns the compiled regex for an <alt> regex rewritten with
+# rewriteAltRegex(), compiling and caching it the first time.
+# throws:  re.error if regex cannot be compiled
+def compileAltRegex(regex, cfg):
+    cache = cfg.regexes._altPatterns
+    pattern = cache.get(regex)
+    if pattern is None:
+        pattern = re.compile(rewriteAltRegex(regex, cfg))
+        cache[regex] = pattern
+    return pattern
+
+# Helper function for rewriteAltRegex(). Walks through the regex one item
+# at a time, copying operators, groups, repeats and escapes unchanged and
+# rewriting literal characters and character sets. Runs of consecutive
+# literals are collected so that equivalent words are only looked for in
+# literal text, never in group names, sets or escapes.
+def _rewriteAltRegex(regex, cfg):
+    parts = []
+    # (preprocessed text, rewritten regex) for each literal in the current
+    # run of literals
+    run = []
+    # kind of the last rewritten literal ("space", "quote" or "hyphen"),
+    # if a following one of the same kind should be merged into it
+    prevKind = None
+    i = 0
+    while i < len(regex):
+        c = regex[i]
+        kind = None
+
+        m = _ALT_GROUP_REGEX.match(regex, i)
+        if m is not None:
+            parts.extend(_rewriteAltRun(run, cfg))
+            parts.append(m.group(0))
+            i = m.end()
+            prevKind = None
+            continue
+        m = _ALT_REPEAT_REGEX.match(regex, i)
+        if m is not None and (len(parts) > 0 or len(run) > 0):
+            parts.extend(_rewriteAltRun(run, cfg))
+            parts.append(m.group(0))
+            i = m.end()
+            prevKind = None
+            continue
+
+        if c == "[":
+            parts.extend(_rewriteAltRun(run, cfg))
+            part, i = _rewriteAltSet(regex, i)
+            parts.append(part)
+            prevKind = None
+            continue
+
+        m = _ALT_CHAR_ESCAPE_REGEX.match(regex, i)
+        if m is not None:
+            # escaped literal character, e.g. "\xA9"
+            c = _altEscapedChar(m)
+            i = m.end()
+        elif c == "\\" and i + 1 < len(regex):
+            c = regex[i + 1]
+            i += 2
+            if c.isalnum():
+                # class escapes, backreferences etc.
+                parts.extend(_rewriteAltRun(run, cfg))
+                parts.append("\\" + c)
+                prevKind = None
+                continue
+        elif c in "()|^$.":
+            parts.extend(_rewriteAltRun(run, cfg))
+            parts.append(c)
+            i += 1
+            prevKind = None
+            continue
+        else:
+            i += 1
+
+        # literal character
+        if c.isspace():
+            kind, part, proc = "space", r"\s+", " "
+        elif c in _ALT_QUOTES:
+            kind, part, proc = "quote", "'", "'"
+        elif c in _ALT_HYPHENS:
+            kind, part, proc = "hyphen", "-", "-"
+            if not cfg.combineHyphens:
+                kind = None
+        elif c == "©":
+            part, proc = r"\(c\)", "(c)"
+        else:
+            part, proc = re.escape(c.lower()), c.lower()
+
+        m = _ALT_REPEAT_REGEX.match(regex, i)
+        if m is not None and kind is not None:
+            # runs of these are converted to one character (or space), so
+            # only whether the repeat allows none of them matters
+            i = m.end()
+            minCount = _ALT_REPEAT_MIN_REGEX.match(m.group(0))
+            if m.group(0)[0] in "*?" or (minCount is not None and
+                                         int(minCount.group(1)) == 0):
+                parts.extend(_rewriteAltRun(run, cfg))
+                parts.append(r"\s*" if kind == "space" else part + "?")
+                prevKind = None
+                continue
+        if kind is not None and kind == prevKind:
+            # already matched by the previous literal's rewritten form
+            continue
+        if m is not None and kind is None:
+            # a repeated literal is not fixed text, so it ends the run
+            parts.extend(_rewriteAltRun(run, cfg))
+            if len(proc) > 1:
+                # keep the repeat applying to the whole rewritten form
+                part = f"(?:{part})"
+            parts.append(part)
+        else:
+            run.append((proc, part))
+        prevKind = kind
+
+    parts.extend(_rewriteAltRun(run, cfg))
+    return _ALT_HTTP_REGEX.sub("https", "".join(parts))
+
+# Helper function for _rewriteAltRegex() to rewrite a run of literals, so
+# that any word with an equivalent (step 5(c)) in it also matches the
+# equivalent word. The equivalents are applied in the same order as in
+# preprocessing, so a word only matched after an earlier conversion (e.g.
+# "sub-licence") is found too. Empties run.
+# given:   run: list of (preprocessed text, rewritten regex) for each
+#               literal in the run
+#          cfg: TextPreprocessorConfig
+# returns: list of rewritten regex parts
+def _rewriteAltRun(run, cfg):
+    # [text after conversions, rewritten regex] for each literal or
+    # converted word
+    items = [[proc, part] for proc, part in run]
+    run.clear()
+    for to, _, regexFrom in cfg.regexes._equivalents:
+        text = "".join(proc for proc, _ in items)
+        if regexFrom.search(text) is None:
+            continue
+        # index in items of the one starting at each offset in text
+        itemAt = {}
+        offset = 0
+        for n, (proc, _) in enumerate(items):
+            itemAt[offset] = n
+            offset += len(proc)
+        itemAt[offset] = len(items)
+
+        converted = []
+        n = 0
+        m = regexFrom.search(text)
+        while m is not None:
+            start, end = m.start(2), m.end(2)
+            if start in itemAt and end in itemAt:
+                converted.extend(items[n:itemAt[start]])
+                words = "".join(part for _, part in
+                                items[itemAt[start]:itemAt[end]])
+                converted.append([to, f"(?:{words}|{re.escape(to)})"])
+                n = itemAt[end]
+            m = regexFrom.search(text, end)
+        converted.extend(items[n:])
+        items = converted
+    return [part for _, part in items]
+
+# Helper function to get the character for an escape matched by
+# _ALT_CHAR_ESCAPE_REGEX.
+# throws:  KeyError if a named character is not known
+def _altEscapedChar(m):
+    if m.group("name") is not None:
+        return unicodedata.lookup(m.group("name"))
+    return chr(int(m.group("hex") or m.group("hex4") or m.group("hex8"), 16))
+
+# Helper function to rewrite a character set starting at regex[i], with
+# letters lowercased and the converted forms of any quote-like, hyphen-like
+# or copyright characters added.
+# returns: (rewritten set, index after end of set)
+def _rewriteAltSet(regex, i):
+    parts = ["["]
+    i += 1
+    negated = i < len(regex) and regex[i] == "^"
+    if negated:
+        parts.append("^")
+        i += 1
+    hasQuote = False
+    hasHyphen = False
+    hasCopyright = False
+    first = True
+    while i < len(regex) and (regex[i] != "]" or first):
+        c = regex[i]
+        first = False
+        m = _ALT_CHAR_ESCAPE_REGEX.match(regex, i)
+        if m is not None:
+            c = _altEscapedChar(m)
+            i = m.end()
+            if c in _ALT_QUOTES:
+                hasQuote = True
+            elif c in _ALT_HYPHENS:
+                hasHyphen = True
+            elif c == "©":
+                hasCopyright = True
+            else:
+                parts.append(re.escape(c.lower()))
+            continue
+        if c == "\\" and i + 1 < len(regex):
+            e = regex[i + 1]
+            i += 2
+            if e in _ALT_QUOTES:
+                hasQuote = True
+            elif e in _ALT_HYPHENS:
+                hasHyphen = True
+            elif e == "©":
+                hasCopyright = True
+            else:
+                parts.append("\\" + e)
+            continue
+        i += 1
+        if c in _ALT_QUOTES:
+            hasQuote = True
+        elif c in _ALT_HYPHENS[1:]:
+            hasHyphen = True
+        elif c == "©":
+            hasCopyright = True
+        elif c == "]":
+            parts.append("\\]")
+        elif len(c.lower()) == 1:
+            parts.append(c.lower())
+        else:
+            parts.append(c)
+    if hasQuote:
+        parts.append("'")
+    if hasHyphen:
+        parts.append("\\-")
+    parts.append("]")
+    rewritten = "".join(parts)
+    if hasCopyright and not negated:
+        # "©" is converted to "(c)", which a set cannot match by itself
+        if rewritten == "[]":
+            rewritten = r"(?:\(c\))"
+        else:
+            rewritten = f"(?:{rewritten}|\\(c\\))"
+    elif rewritten in ("[]", "[^]"):
+        # only held a "©", which preprocessed text never contains
+        rewritten = "(?!)" if not negated else "."
+    return rewritten, i + 1
@@ -0,0 +1,60 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import queue
+import threading
+
+# Background thread which loads and flattens all licenses in a License List
+# XML directory, so that the UI can be shown straight away.
+#
+# Licenses are put on a queue in batches as they finish loading, rather
+# than applied directly, because Tk widgets (and AppData, which notifies
+# the UI) must only be touched from the Tk thread. See UI.loadLicenses(),
+# which drains the queue.
+class LicenseLoader(threading.Thread):
+    # given: parser: XMLParser to load with; until the thread has finished,
+    #                it must only be used by this thread
+    #        dirpath: path to directory containing License List XML files
+    #        batchSize: number of licenses to load before queueing them
+    def __init__(self, parser, dirpath, batchSize=25):
+        super(LicenseLoader, self).__init__(daemon=True)
+
+        # XML parser, which records the state of loaded files
+        self.parser = parser
+
+        # path to directory being loaded
+        self.dirpath = dirpath
+
+        # number of licenses to load before queueing them
+        self.batchSize = batchSize
+
+        # queue of (done, total, lics, errors, finished) tuples, where done
+        # is the number of files handled so far out of total, lics is a
+        # dict of license ID => datatypes.License for the batch, errors is
+        # a dict of file or directory path => error message, and finished is
+        # True for the last tuple only
+        self.progress = queue.Queue()
+
+    def run(self):
+        done = 0
+        total = 0
+        lics = {}
+        errors = {}
+        try:
+            for done, total, lic, error in self.parser.iterLoadAll(self.dirpath):
+                if error is not None:
+                    errors[error[0]] = error[1]
+                else:
+                    lics[lic.id] = lic
+                if len(lics) >= self.batchSize and done < total:
+                    errors.update(self.parser.flattenEach(lics))
+                    self.progress.put((done, total, lics, errors, False))
+                    lics = {}
+                    errors = {}
+        except Exception as e:
+            # e.g. the directory could not be listed
+            errors[self.dirpath] = str(e)
+        finally:
+            # always finish, so that the UI does not wait forever
+            errors.update(self.parser.flattenEach(lics))
+            self.progress.put((done, total, lics, errors, True))
@@ -1,12 +1,15 @@
 # SPDX-License-Identifier: MIT
 # Copyright 2024-2025 Steve Winslow
 
+import argparse
 import os
 from pprint import pprint
 
 from datatypes import AppData, NodeType, FlatType
 from parsexml import XMLParserConfig, XMLParser
+from loader import LicenseLoader
 from ui import UI
+from watcher import LicenseDirWatcher
 
 def printNode(n, indent=0):
     if n is None:
@@ -48,18 +51,34 @@ def tempFlattenAll(parser, ad):
         parser.flatten(lic)
 
 if __name__ == "__main__":
-    xmldirpath = "/Users/steve/programming/python/testing/lxml/licenses"
+    argparser = argparse.ArgumentParser(
+        description="Explore the SPDX License List XML files")
+    argparser.add_argument("xmldirpath", nargs="?",
+        default="/Users/steve/programming/python/testing/lxml/licenses",
+        help="path to directory containing License List XML files")
+    argparser.add_argument("--watch", action="store_true",
+        help="reload licenses when their XML files change")
+    args = argparser.parse_args()
+
+    xmldirpath = args.xmldirpath
     cfg = XMLParserConfig()
     parser = XMLParser(cfg)
 
     ad = AppData()
     ad.ui = UI()
-    ad.setLicenses(parser.loadAll(xmldirpath))
     ### FIXME TEMP
     #testlic = parser.load(os.path.join(xmldirpath, "0BSD.xml"))
     #ad.setLicenses({"0BSD": testlic})
     #tempFlatten(parser, ad, "0BSD")
     ### FIXME END TEMP
-    tempFlattenAll(parser, ad)
     ad.ui.setup(ad)
+
+    # load and flatten licenses in the background, so that the window
+    # shows straight away; only start watching once loading has finished,
+    # since both use the parser
+    onLoaded = None
+    if args.watch:
+        onLoaded = lambda: ad.ui.watchLicenses(
+            LicenseDirWatcher(parser, xmldirpath))
+    ad.ui.loadLicenses(LicenseLoader(parser, xmldirpath), onLoaded)
     ad.ui.run()
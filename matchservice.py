@@ -0,0 +1,322 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from datatypes import AppData
+from llmatch import LicenseMatcherConfig, LicenseMatcher, ExactMatchIndex, \
+        matchResultToDict
+from lltokenize import TextPreprocessorConfig, preprocess
+from parsexml import XMLParserConfig, XMLParser
+from sharedcorpus import createSharedCorpus, initCorpusWorker, \
+        corpusWorkerMatch
+
+# maximum accepted size of a request body, in bytes
+MAX_BODY_SIZE = 64 * 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+}
+
+class MatchServiceConfig:
+    def __init__(self):
+        super(MatchServiceConfig, self).__init__()
+
+        # path to directory containing License List XML files
+        self.xmldirpath = ""
+
+        # host and port to listen on, if not using a Unix socket
+        self.host = "127.0.0.1"
+        self.port = 8765
+
+        # path for Unix socket to listen on, or "" to use host and port
+        self.socketPath = ""
+
+        # number of worker threads for handling requests
+        self.workers = 4
+
+        # number of worker processes for matching, sharing one copy of the
+        # license corpus; if 0, matching is done in the worker threads
+        self.processes = 0
+
+# Long-running local service which keeps the license list loaded, and
+# answers JSON requests over HTTP:
+#   GET  /licenses    => list of license IDs
+#   POST /preprocess  {"text": ...} => proc and procmap spans
+#   POST /match       {"text": ..., "fullMatch": true|false} => matches
+#   POST /reload      => IDs of licenses changed or removed on disk
+class MatchService:
+    def __init__(self, cfg):
+        super(MatchService, self).__init__()
+
+        # service configuration object
+        self.cfg = cfg
+
+        # application data, holding loaded licenses
+        self.appdata = AppData()
+
+        # text preprocessor configuration, shared by all requests
+        self.tpcfg = TextPreprocessorConfig()
+
+        # license matcher, holding compiled license regexes
+        self.matcher = LicenseMatcher(LicenseMatcherConfig(), self.tpcfg)
+        self.appdata.licenseListeners.append(self.matcher.licensesChanged)
+
+        # hashes of licenses' canonical text, for verbatim copies
+        self.exactIndex = ExactMatchIndex(self.tpcfg)
+        self.appdata.licenseListeners.append(
+            lambda changedIds, removedIds: self.exactIndex.update(
+                self.appdata.lics, changedIds, removedIds))
+
+        # XML parser, which tracks loaded files for reloading, and lock
+        # held while reloading so that only one reload runs at a time
+        self.parser = XMLParser(XMLParserConfig())
+        self.reloadLock = threading.Lock()
+
+        # lock held while changing appdata.lics and the exact match index,
+        # and while other requests take a copy of the licenses or use the
+        # index, so that they never see a partly reloaded corpus
+        self.licsLock = threading.Lock()
+
+        # worker thread pool for handling requests
+        self.executor = None
+
+        # if cfg.processes > 0: shared memory block with packed license
+        # corpus, and worker process pool for matching
+        self.shm = None
+        self.procExecutor = None
+
+        # lock held while submitting to or replacing procExecutor, so that
+        # nothing is submitted to a pool after it has been shut down
+        self.procExecutorLock = threading.Lock()
+
+    # Loads, flattens and compiles all licenses, once, before serving. As
+    # for /reload, a file which cannot be loaded, or a license which
+    # cannot be flattened, is reported rather than stopping the others.
+    # returns: dict of path => error message
+    def load(self):
+        lics = {}
+        errors = {}
+        for _, _, lic, error in self.parser.iterLoadAll(self.cfg.xmldirpath):
+            if error is not None:
+                errors[error[0]] = error[1]
+            else:
+                lics[lic.id] = lic
+        errors.update(self.parser.flattenEach(lics))
+        self.appdata.setLicenses(lics)
+        if self.cfg.processes > 0:
+            self.shm = createSharedCorpus(lics, self.tpcfg)
+        else:
+            self.matcher.compileAll(lics)
+        return errors
+
+    # Starts the service and runs until cancelled.
+    async def serve(self):
+        self.executor = ThreadPoolExecutor(max_workers=self.cfg.workers)
+        if self.shm is not None:
+            self.procExecutor = ProcessPoolExecutor(
+                max_workers=self.cfg.processes,
+                initializer=initCorpusWorker, initargs=(self.shm.name,))
+        try:
+            if self.cfg.socketPath != "":
+                server = await asyncio.start_unix_server(
+                    self._handleConnection, path=self.cfg.socketPath)
+            else:
+                server = await asyncio.start_server(
+                    self._handleConnection, self.cfg.host, self.cfg.port)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if self.procExecutor is not None:
+                self.procExecutor.shutdown(wait=True, cancel_futures=True)
+            if self.shm is not None:
+                self.shm.close()
+                self.shm.unlink()
+
+    ##### REQUEST HANDLERS #####
+
+    # Preprocesses text, returning proc and the orig span for each
+    # character in proc.
+    def handlePreprocess(self, req):
+        res = preprocess(self._getText(req), self.tpcfg)
+        return {
+            "proc": res.proc,
+            "procmap": [list(s) for s in res.procmap.spans()],
+        }
+
+    # Matches text against all licenses, unless it is a verbatim copy of
+    # one or more licenses.
+    def handleMatch(self, req):
+        text = self._getText(req)
+        fullMatch = bool(req.get("fullMatch", True))
+        res = preprocess(text, self.tpcfg)
+        with self.licsLock:
+            lics = dict(self.appdata.lics)
+            results = self.exactIndex.match(res)
+        if len(results) == 0:
+            if self.procExecutor is not None:
+                with self.procExecutorLock:
+                    future = self.procExecutor.submit(
+                        corpusWorkerMatch, text, fullMatch)
+                results = future.result()
+            else:
+                results = self.matcher.matchAll(lics, res, fullMatch)
+        return {"matches": [matchResultToDict(mr) for mr in results]}
+
+    # Reloads licenses whose XML files were added, changed or removed
+    # since loading, leaving the rest in place.
+    def handleReload(self, req):
+        with self.reloadLock:
+            changed, removed = self.parser.reloadAll(self.cfg.xmldirpath)
+            errors = dict(self.parser.reloadErrors)
+            errors.update(self.parser.flattenEach(changed))
+            if len(changed) > 0 or len(removed) > 0:
+                with self.licsLock:
+                    self.appdata.updateLicenses(changed, removed)
+                if self.procExecutor is not None:
+                    self._repackCorpus()
+                else:
+                    self.matcher.compileAll(changed)
+        return {
+            "changed": sorted(changed.keys(), key=str.casefold),
+            "removed": sorted(removed, key=str.casefold),
+            "errors": errors,
+        }
+
+    # Lists loaded license IDs.
+    def handleLicenses(self, req):
+        with self.licsLock:
+            licIds = list(self.appdata.lics.keys())
+        return {"licenses": sorted(licIds, key=str.casefold)}
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to read one HTTP request, dispatch it to the worker
+    # pool, and write the JSON response.
+    async def _handleConnection(self, reader, writer):
+        try:
+            status, body = await self._handleRequest(reader)
+        except Exception as e:
+            status, body = 500, {"error": str(e)}
+        data = json.dumps(body).encode("utf-8")
+        writer.write((f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                      f"Content-Type: application/json\r\n"
+                      f"Content-Length: {len(data)}\r\n"
+                      f"Connection: close\r\n\r\n").encode("ascii"))
+        writer.write(data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _handleRequest(self, reader):
+        requestLine = (await reader.readline()).decode("latin-1").split()
+        if len(requestLine) < 2:
+            return 400, {"error": "invalid request line"}
+        method, path = requestLine[0], requestLine[1]
+
+        # read headers, keeping only content length
+        contentLength = 0
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if line == "":
+                break
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                try:
+                    contentLength = int(value.strip())
+                except ValueError:
+                    return 400, {"error": "invalid Content-Length header"}
+                if contentLength < 0:
+                    return 400, {"error": "invalid Content-Length header"}
+        if contentLength > MAX_BODY_SIZE:
+            return 413, {"error": "request body too large"}
+
+        routes = {
+            ("GET", "/licenses"): self.handleLicenses,
+            ("POST", "/preprocess"): self.handlePreprocess,
+            ("POST", "/match"): self.handleMatch,
+            ("POST", "/reload"): self.handleReload,
+        }
+        handler = routes.get((method, path))
+        if handler is None:
+            if path in [p for _, p in routes.keys()]:
+                return 405, {"error": f"method {method} not allowed"}
+            return 404, {"error": f"unknown path {path}"}
+
+        req = {}
+        if contentLength > 0:
+            try:
+                req = json.loads(await reader.readexactly(contentLength))
+            except ValueError as e:
+                return 400, {"error": f"invalid JSON: {e}"}
+            if not isinstance(req, dict):
+                return 400, {"error": "request body must be a JSON object"}
+
+        loop = asyncio.get_running_loop()
+        try:
+            body = await loop.run_in_executor(self.executor, handler, req)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        return 200, body
+
+    # Helper function to replace the shared corpus and worker processes
+    # after licenses change. Requests already submitted to the old pool
+    # finish against the old corpus; the new pool is swapped in before the
+    # old one is shut down.
+    def _repackCorpus(self):
+        oldShm, oldExecutor = self.shm, self.procExecutor
+        newShm = createSharedCorpus(self.appdata.lics, self.tpcfg)
+        newExecutor = ProcessPoolExecutor(
+            max_workers=self.cfg.processes,
+            initializer=initCorpusWorker, initargs=(newShm.name,))
+        with self.procExecutorLock:
+            self.shm, self.procExecutor = newShm, newExecutor
+        oldExecutor.shutdown(wait=True)
+        oldShm.close()
+        oldShm.unlink()
+
+    # Helper function to get the text to process from a request
+    def _getText(self, req):
+        text = req.get("text")
+        if not isinstance(text, str):
+            raise ValueError("request must include \"text\" string")
+        return text
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Serve license matching requests with the license list preloaded")
+    argparser.add_argument("xmldirpath",
+        help="path to directory containing License List XML files")
+    argparser.add_argument("--host", default="127.0.0.1")
+    argparser.add_argument("--port", type=int, default=8765)
+    argparser.add_argument("--socket", default="",
+        help="path for Unix socket to listen on, instead of host and port")
+    argparser.add_argument("--workers", type=int, default=4)
+    argparser.add_argument("--processes", type=int, default=0,
+        help="number of worker processes for matching, sharing the license corpus")
+    args = argparser.parse_args()
+
+    cfg = MatchServiceConfig()
+    cfg.xmldirpath = args.xmldirpath
+    cfg.host = args.host
+    cfg.port = args.port
+    cfg.socketPath = args.socket
+    cfg.workers = args.workers
+    cfg.processes = args.processes
+
+    service = MatchService(cfg)
+    for path, msg in sorted(service.load().items()):
+        print(f"Error loading {path}: {msg}", file=sys.stderr)
+    asyncio.run(service.serve())
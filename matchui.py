@@ -0,0 +1,288 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import *
+from tkinter import ttk
+
+from llmatch import LicenseMatcherConfig, LicenseMatcher, ExactMatchIndex
+from lltokenize import TextPreprocessorConfig, preprocess
+
+# milliseconds to wait after the last edit before matching
+DEBOUNCE_MS = 300
+
+# milliseconds between checks for results from match jobs
+RESULTS_POLL_MS = 50
+
+# number of licenses to check between sending partial results
+RESULTS_BATCH = 25
+
+# Match tab: matches the entered text against all licenses as the user
+# types. Matching runs in a worker pool rather than on the Tk thread, and
+# each edit cancels any job still running for earlier text. Results found
+# so far are sent back while a job runs, via a queue which the Tk thread
+# drains with after(). The exact match index is also rebuilt in a worker
+# thread when licenses change; match jobs wait for the latest one.
+class MatchUI:
+    def __init__(self):
+        super(MatchUI, self).__init__()
+
+        # Application data
+        self.appdata = None
+
+        # Tk root window
+        self.root = None
+
+        ##### MATCH UI ELEMENTS #####
+
+        # frame for license matcher, from UI
+        self.cMatch = None
+
+        # target text view, label and scrollbars
+        self.targettext = None
+        self.targetlbl = None
+        self.targetys = None
+        self.targetxs = None
+
+        # checkbox and BooleanVar for matching whole text vs. searching
+        self.fullMatchbtn = None
+        self.fullMatchVar = None
+
+        # results treeview and scrollbar
+        self.results = None
+        self.resultsys = None
+
+        # StringVar for status label, and status label
+        self.statusVar = None
+        self.status = None
+
+        ##### MATCH DATA #####
+
+        # text preprocessor config and matcher
+        self.tpcfg = TextPreprocessorConfig()
+        self.matcher = LicenseMatcher(LicenseMatcherConfig(), self.tpcfg)
+
+        # worker pool for match jobs
+        self.executor = ThreadPoolExecutor(max_workers=2)
+
+        # single worker for updating the exact match index, so that updates
+        # run in order, and Future for the most recent ExactMatchIndex
+        self.indexExecutor = ThreadPoolExecutor(max_workers=1)
+        self.indexFuture = None
+
+        # ID of pending after() call to submit a match job, if any
+        self.debounceId = None
+
+        # generation number of the most recent job; results from jobs with
+        # an earlier generation are ignored
+        self.generation = 0
+
+        # Event to set to cancel the most recent job
+        self.cancelEvent = None
+
+        # queue of (generation, results, done, total, finished) tuples from
+        # match jobs, where results is the list of MatchResults found so far
+        self.resultsQueue = queue.Queue()
+
+    ##### MATCH UI SETUP #####
+
+    def setup(self, root, cMatch, appdata):
+        self.root = root
+        self.cMatch = cMatch
+        self.appdata = appdata
+        self.appdata.licenseListeners.append(self._licensesChanged)
+        self._updateIndex(None, [])
+
+        # set up target text widgets
+        self.targetlbl = ttk.Label(self.cMatch, text="text to match")
+        self.targettext = Text(self.cMatch, width=80, height=40,
+                               wrap="none", undo=True)
+        self.targetys = ttk.Scrollbar(self.cMatch, orient=VERTICAL,
+                                      command=self.targettext.yview)
+        self.targetxs = ttk.Scrollbar(self.cMatch, orient=HORIZONTAL,
+                                      command=self.targettext.xview)
+        self.targettext["yscrollcommand"] = self.targetys.set
+        self.targettext["xscrollcommand"] = self.targetxs.set
+
+        self.targetlbl.grid(column=0, row=0, sticky=(E,W))
+        self.targettext.grid(column=0, row=1, sticky=(N,S,E,W))
+        self.targetys.grid(column=1, row=1, sticky=(N,S))
+        self.targetxs.grid(column=0, row=2, sticky=(E,W))
+
+        # set up full match checkbox and status label
+        self.fullMatchVar = BooleanVar(value=self.matcher.cfg.fullMatch)
+        self.fullMatchbtn = ttk.Checkbutton(self.cMatch,
+            text="match whole text", variable=self.fullMatchVar,
+            command=self._scheduleMatch)
+        self.fullMatchbtn.grid(column=3, row=0, sticky=W)
+        self.statusVar = StringVar()
+        self.status = ttk.Label(self.cMatch, textvariable=self.statusVar)
+        self.status.grid(column=3, row=2, sticky=(E,W))
+
+        # set up results treeview
+        self.results = ttk.Treeview(self.cMatch, height=40,
+            columns=("start", "end"), show="tree headings")
+        self.resultsys = ttk.Scrollbar(self.cMatch, orient=VERTICAL,
+                                       command=self.results.yview)
+        self.results["yscrollcommand"] = self.resultsys.set
+        self.results.column("#0", width=200, anchor=W)
+        self.results.heading("#0", text="License", anchor=W)
+        self.results.column("start", width=80, anchor=W)
+        self.results.heading("start", text="Start", anchor=W)
+        self.results.column("end", width=80, anchor=W)
+        self.results.heading("end", text="End", anchor=W)
+
+        self.results.grid(column=3, row=1, sticky=(N,S,E,W))
+        self.resultsys.grid(column=4, row=1, sticky=(N,S))
+
+        # configure weights for grid resizing
+        self.cMatch.columnconfigure(0, weight=1)
+        self.cMatch.columnconfigure(3, weight=1)
+        self.cMatch.rowconfigure(1, weight=1)
+
+        # match again whenever the text changes
+        self.targettext.bind("<<Modified>>", self._textModified)
+
+        self.root.after(RESULTS_POLL_MS, self._applyResults)
+
+    # Cancels any running job and stops the worker pool.
+    def shutdown(self):
+        if self.cancelEvent is not None:
+            self.cancelEvent.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.indexExecutor.shutdown(wait=False, cancel_futures=True)
+
+    ##### MATCH FUNCTIONS #####
+
+    # Callback: Text widget contents changed
+    def _textModified(self, *args):
+        # reset flag so that the next change triggers this event again
+        self.targettext.edit_modified(False)
+        self._scheduleMatch()
+
+    # Callback: (Re)start the debounce timer for submitting a match job
+    def _scheduleMatch(self, *args):
+        if self.debounceId is not None:
+            self.root.after_cancel(self.debounceId)
+        self.debounceId = self.root.after(DEBOUNCE_MS, self._submitMatch)
+
+    # Cancels any running job, and submits a new one for the current text
+    def _submitMatch(self):
+        self.debounceId = None
+        if self.cancelEvent is not None:
+            self.cancelEvent.set()
+        self.generation += 1
+        self.cancelEvent = threading.Event()
+
+        # take a copy of the licenses, since they may be reloaded on the
+        # Tk thread while the job runs
+        lics = dict(self.appdata.lics)
+        text = self.targettext.get("1.0", "end-1c")
+        self.statusVar.set("Matching...")
+        self.executor.submit(self._matchJob, self.generation, self.cancelEvent,
+                             text, lics, self.fullMatchVar.get(),
+                             self.indexFuture)
+
+    # Runs in a worker thread: matches text against each license in turn,
+    # sending partial results until finished or cancelled
+    def _matchJob(self, generation, cancelEvent, text, lics, fullMatch,
+                  indexFuture):
+        res = preprocess(text, self.tpcfg)
+        if res.proc.strip() == "":
+            self.resultsQueue.put((generation, [], 0, 0, True))
+            return
+
+        # wait for the exact match index to catch up with the licenses; if
+        # it could not be updated, just run the matcher
+        try:
+            results = indexFuture.result().match(res)
+        except Exception:
+            results = []
+        if cancelEvent.is_set():
+            return
+        if len(results) > 0:
+            self.resultsQueue.put((generation, results, len(lics), len(lics),
+                                   True))
+            return
+
+        licIds = sorted(lics.keys(), key=str.casefold)
+        for i, licId in enumerate(licIds):
+            if cancelEvent.is_set():
+                return
+            mr = self.matcher.match(lics[licId], res, fullMatch)
+            if mr is not None:
+                results.append(mr)
+            if (i + 1) % RESULTS_BATCH == 0:
+                self.resultsQueue.put((generation, list(results), i + 1,
+                                       len(licIds), False))
+        self.resultsQueue.put((generation, results, len(licIds), len(licIds),
+                               True))
+
+    # Callback: Show the latest results from the current job, if any
+    def _applyResults(self):
+        latest = None
+        while True:
+            try:
+                item = self.resultsQueue.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == self.generation:
+                latest = item
+
+        if latest is not None:
+            _, results, done, total, finished = latest
+            self._fillResults(results)
+            if finished:
+                self.statusVar.set(f"{len(results)} matches")
+            else:
+                self.statusVar.set(
+                    f"Matching... {done} of {total}, {len(results)} matches so far")
+        self.root.after(RESULTS_POLL_MS, self._applyResults)
+
+    # Helper function to fill the results treeview, showing the matches
+    # covering the most text first
+    def _fillResults(self, results):
+        self.results.delete(*self.results.get_children())
+        ordered = sorted(results,
+                         key=lambda mr: (mr.origStart - mr.origEnd, mr.licenseId))
+        for i, mr in enumerate(ordered):
+            self.results.insert("", "end", i, text=mr.licenseId,
+                values=(f"{mr.startRC[0]}:{mr.startRC[1]}",
+                        f"{mr.endRC[0]}:{mr.endRC[1]}"))
+
+    # Callback: Licenses changed, so drop cached regexes and rematch. Any
+    # running job is cancelled straight away, and its results ignored,
+    # since they may be for the earlier licenses.
+    def _licensesChanged(self, changedIds, removedIds):
+        if self.cancelEvent is not None:
+            self.cancelEvent.set()
+        self.generation += 1
+        self.matcher.licensesChanged(changedIds, removedIds)
+        self._updateIndex(changedIds, removedIds)
+        if self.targettext is not None:
+            self._scheduleMatch()
+
+    # Submits a job to update the exact match index for changed licenses;
+    # see ExactMatchIndex.update()
+    def _updateIndex(self, changedIds, removedIds):
+        # take a copy of the licenses, as in _submitMatch()
+        lics = dict(self.appdata.lics)
+        self.indexFuture = self.indexExecutor.submit(self._indexJob,
+            self.indexFuture, lics, changedIds, removedIds)
+
+    # Runs in the index worker thread: updates a copy of the previous
+    # index, since match jobs may still be using it, or builds a new one
+    # returns: ExactMatchIndex
+    def _indexJob(self, prevFuture, lics, changedIds, removedIds):
+        index = None
+        if prevFuture is not None and changedIds is not None:
+            try:
+                index = prevFuture.result().copy()
+            except Exception:
+                changedIds = None
+        if index is None:
+            index = ExactMatchIndex(self.tpcfg)
+        index.update(lics, changedIds, removedIds)
+        return index
@@ -1,7 +1,10 @@
 # SPDX-License-Identifier: MIT
 # Copyright 2024-2025 Steve Winslow
 
+import hashlib
 import os
+import sys
+import weakref
 
 from lxml import etree
 
@@ -38,6 +41,32 @@ class XMLParserConfig:
         # regex flat node with a spacing value that indicates no spacing?
         self.removeConflictingWhitespace = True
 
+        # should files be loaded incrementally with lxml's iterparse (True),
+        # clearing elements once processed, rather than building a full
+        # element tree for each file first (False)?
+        self.useIterparse = True
+
+        # should only license metadata be loaded, stopping before the
+        # <text> element? if True, each License's textNode is left as None
+        # and licenses cannot be flattened. any metadata elements which
+        # follow <text> in a file are not read. only used with iterparse.
+        self.metadataOnly = False
+
+        # should each License keep its file's original XML text in memory
+        # (True), or only the file's path, for reading when needed (False)?
+        self.keepOrigXML = False
+
+        # should text and regex strings be interned with sys.intern(), so
+        # that text repeated within and across licenses (e.g. common
+        # clauses and disclaimers) is only kept in memory once?
+        self.internText = True
+
+        # should identical flattened subtrees (including line numbers) be
+        # shared between licenses (and within a license), rather than each
+        # having its own copy? shared flats must not be modified, so this
+        # is off by default.
+        self.shareFlats = False
+
 class XMLParser:
     def __init__(self, cfg):
         super(XMLParser, self).__init__()
@@ -45,20 +74,121 @@ class XMLParser:
         # XML loader configuration object
         self.cfg = cfg
 
+        # dict of XML file path => (mtime_ns, size, SHA-256 digest, license ID)
+        # for each file loaded by loadAll() or reloadAll(), used to detect
+        # which files have changed
+        self.fileState = {}
+
+        # dict of XML file path => error message, for files that could not
+        # be parsed during the last call to reloadAll(); these are retried
+        # on the next call, e.g. once an editor has finished saving them
+        self.reloadErrors = {}
+
+        # weak dict of flat key => LicenseFlat, for sharing identical
+        # flattened subtrees if cfg.shareFlats is set; see _shareFlat().
+        # flats only used by licenses which have since been reloaded or
+        # removed drop out of it once those licenses are released.
+        self.sharedFlats = weakref.WeakValueDictionary()
+
     # Loads and parses all SPDX License List XML files in the specified
     # directory (non-recursively).
     # given:   dirpath: path to directory containing License List XML files
     # returns: dict of license ID => datatypes.License
     def loadAll(self, dirpath):
         lics = {}
-        xmlfiles = sorted(os.listdir(dirpath))
-        for xmlfile in xmlfiles:
-            xmlpath = os.path.join(dirpath, xmlfile)
-            if os.path.isfile(xmlpath) and os.path.splitext(xmlpath)[1] == ".xml":
-                lic = self.load(xmlpath)
-                lics[lic.id] = lic
+        self.fileState = {}
+        self.sharedFlats = weakref.WeakValueDictionary()
+        for xmlpath in self._listXMLFiles(dirpath):
+            lic = self.load(xmlpath)
+            lics[lic.id] = lic
+            self._recordFileState(xmlpath, lic.id)
         return lics
 
+    # Generator which loads and parses each SPDX License List XML file in
+    # the specified directory in turn, e.g. to report progress while
+    # loading. Unlike loadAll(), a file which fails to load does not stop
+    # the others; it is reported, and not recorded in fileState, so that
+    # reloadAll() will try it again.
+    # given:   dirpath: path to directory containing License List XML files
+    # yields:  (done, total, lic, error) tuples, where done is the number
+    #          of files handled so far out of total, and either lic is the
+    #          datatypes.License loaded or error is an (xmlpath, message)
+    #          tuple
+    def iterLoadAll(self, dirpath):
+        self.fileState = {}
+        self.sharedFlats = weakref.WeakValueDictionary()
+        xmlpaths = self._listXMLFiles(dirpath)
+        for i, xmlpath in enumerate(xmlpaths):
+            try:
+                lic = self.load(xmlpath)
+                self._recordFileState(xmlpath, lic.id)
+            except Exception as e:
+                # e.g. invalid XML, an invalid tag, or no <license> element
+                yield i + 1, len(xmlpaths), None, (xmlpath, str(e))
+                continue
+            yield i + 1, len(xmlpaths), lic, None
+
+    # Reloads only those SPDX License List XML files in the specified
+    # directory which have been added, changed or removed since the last
+    # call to loadAll() or reloadAll(). Files are first compared by
+    # modification time and size, then by hash of their contents. A file
+    # which fails to load is recorded in reloadErrors and keeps its
+    # previous state, so that it is tried again on the next call.
+    # given:   dirpath: path to directory containing License List XML files
+    # returns: changed: dict of license ID => datatypes.License for new or
+    #                   changed licenses
+    #          removed: list of license IDs that are no longer present
+    def reloadAll(self, dirpath):
+        changed = {}
+        removed = []
+        reloadErrors = {}
+
+        # new fileState, only kept once the whole directory has been
+        # checked, so that an error part way through loses no changes
+        newState = {}
+        for xmlpath in self._listXMLFiles(dirpath):
+            prev = self.fileState.get(xmlpath)
+            try:
+                st = os.stat(xmlpath)
+                if (prev is not None and prev[0] == st.st_mtime_ns and
+                    prev[1] == st.st_size):
+                    newState[xmlpath] = prev
+                    continue
+
+                digest = self._hashFile(xmlpath)
+                if prev is not None and prev[2] == digest:
+                    # touched but not changed
+                    newState[xmlpath] = (st.st_mtime_ns, st.st_size,
+                                         digest, prev[3])
+                    continue
+
+                lic = self.load(xmlpath)
+            except FileNotFoundError:
+                # removed since listing the directory
+                continue
+            except Exception as e:
+                # e.g. invalid XML, an invalid tag, or no <license> element
+                reloadErrors[xmlpath] = str(e)
+                if prev is not None:
+                    newState[xmlpath] = prev
+                continue
+
+            changed[lic.id] = lic
+            if prev is not None and prev[3] != lic.id:
+                removed.append(prev[3])
+            newState[xmlpath] = (st.st_mtime_ns, st.st_size, digest, lic.id)
+
+        for xmlpath, prev in self.fileState.items():
+            if xmlpath not in newState:
+                removed.append(prev[3])
+
+        self.fileState = newState
+        self.reloadErrors = reloadErrors
+
+        # an ID may have moved to a different file rather than being removed
+        removed = [licId for licId in removed if licId not in changed]
+        return changed, removed
+
     # Loads and parses an SPDX License List XML file.
     # FIXME extend to handle exceptions as well
     # given:   filename: path to License List XML file to load
@@ -66,14 +196,19 @@ class XMLParser:
     def load(self, filename):
         # load and parse XML content
         # FIXME handle failure to load file
-        tree = etree.parse(filename)
-        root = tree.getroot()
-        l = self.parse(root)
-
-        # reload file and save original text
+        if self.cfg.useIterparse:
+            l = self.iterparse(filename)
+        else:
+            tree = etree.parse(filename)
+            root = tree.getroot()
+            l = self.parse(root)
+
+        # save file path, and original text if wanted
         # FIXME handle failure to load file
-        with open(filename, 'r') as f:
-            l.origXML = f.read()
+        l.xmlPath = filename
+        if self.cfg.keepOrigXML:
+            with open(filename, 'r') as f:
+                l.origXML = f.read()
 
         return l
 
@@ -86,14 +221,11 @@ class XMLParser:
         l = License()
 
         licXNode = root.find(f"{XHTML}license")
+        if licXNode is None:
+            raise ValueError("No license element")
 
         # fill in metadata
-        l.id = licXNode.get("licenseId")
-        l.name = licXNode.get("name")
-        osiText = licXNode.get("isOsiApproved", "false")
-        l.osi = (osiText == "true")
-        l.versionAdded = licXNode.get("listVersionAdded", "")
-        l.versionDeprecated = licXNode.get("deprecatedVersion", "")
+        self._parseLicenseAttribs(l, licXNode)
 
         crossRefsXNode = licXNode.find(f"{XHTML}crossRefs")
         if crossRefsXNode is not None:
@@ -112,6 +244,84 @@ class XMLParser:
 
         return l
 
+    # Parses an SPDX License List XML file incrementally, producing the
+    # same result as parse() without keeping a full element tree. Metadata
+    # is taken from each element as it ends, and the <text> subtree is
+    # converted into LicenseNodes as soon as it is complete. Processed
+    # elements are then cleared and removed. See also cfg.metadataOnly.
+    # given:   filename: path to License List XML file
+    # returns: datatypes.License
+    def iterparse(self, filename):
+        l = License()
+        licXNode = None
+        textDepth = 0
+        crossRefsSeen = False
+        notesSeen = False
+
+        # <text> element and its LicenseNode, waiting for the element's tail
+        # content to be parsed
+        pendingText = None
+
+        # open the file here, so that it is closed even if parsing stops
+        # part way through with an error
+        with open(filename, "rb") as f:
+            for event, xmlnode in etree.iterparse(f, events=("start", "end")):
+                # the <text> element's tail is complete once any later element
+                # starts or ends
+                if pendingText is not None:
+                    lnode, textXNode = pendingText
+                    tailnode = self._makeTailNode(textXNode)
+                    if tailnode is not None:
+                        lnode.children.append(tailnode)
+                    textXNode.clear()
+                    pendingText = None
+
+                # wait for the whole <text> subtree before processing it
+                if textDepth > 0:
+                    if event == "start":
+                        textDepth += 1
+                        continue
+                    textDepth -= 1
+                    if textDepth > 0:
+                        continue
+
+                tag = xmlnode.tag
+                if event == "start":
+                    if tag == f"{XHTML}license" and licXNode is None:
+                        licXNode = xmlnode
+                        self._parseLicenseAttribs(l, licXNode)
+                    elif tag == f"{XHTML}text" and xmlnode.getparent() is licXNode:
+                        if self.cfg.metadataOnly:
+                            break
+                        if l.textNode is None:
+                            textDepth = 1
+                    continue
+
+                # end events for license's direct children
+                if licXNode is None or xmlnode.getparent() is not licXNode:
+                    continue
+                if tag == f"{XHTML}crossRefs" and not crossRefsSeen:
+                    for crn in xmlnode.getchildren():
+                        l.crossRefs.append(crn.text)
+                    crossRefsSeen = True
+                elif tag == f"{XHTML}notes" and not notesSeen:
+                    l.notes = xmlnode.text
+                    notesSeen = True
+                elif tag == f"{XHTML}text" and l.textNode is None:
+                    lnode, _ = self.processXMLNode(xmlnode)
+                    l.textNode = lnode
+                    pendingText = (lnode, xmlnode)
+                    continue
+                xmlnode.clear()
+                # also drop the license's earlier children, now processed,
+                # so that they are not kept in memory until the end
+                while xmlnode.getprevious() is not None:
+                    del licXNode[0]
+
+        if licXNode is None:
+            raise ValueError(f"No license element in {filename}")
+        return l
+
     # Processes SPDX License List XML nodes into parsed nodes.
     # given:   xmlnode: lxml Element being processed
     # returns: lnode: newly created parsed node - LicenseNode
@@ -144,7 +354,7 @@ class XMLParser:
             case "alt":
                 lnode.type = NodeType.ALT
                 lnode.spacing = self._getSpacingAttrib(xmlnode)
-                lnode.regex = xmlnode.get("match")
+                lnode.regex = self._intern(xmlnode.get("match"))
                 lnode.matchName = xmlnode.get("name")
             case "standardLicenseHeader":
                 lnode.type = NodeType.SLHEADER
@@ -162,7 +372,6 @@ class XMLParser:
 
     def processChildren(self, xmlnode):
         children = []
-        tailnode = None
 
         # if any text var exists, create a whitespace or text node,
         # depending if we have non-whitespace .text content
@@ -181,18 +390,52 @@ class XMLParser:
             if childTailnode is not None:
                 children.append(childTailnode)
 
-        # if any tail var exists, create a whitespace or text node,
-        # depending if we have non-whitespace .tail content
         # note: tail content gets added to this node's _parent's_ children!
-        if xmlnode.tail is not None:
-            # FIXME BUG - line numbers are incorrect for tail nodes!
-            if xmlnode.tail.strip() == "":
-                tailnode = self._makeWhitespaceNode(xmlnode.sourceline)
-            else:
-                tailnode = self._makeTextNode(xmlnode.tail, xmlnode.sourceline)
+        tailnode = self._makeTailNode(xmlnode)
 
         return children, tailnode
 
+    # Helper function to fill in a License's metadata from the attributes
+    # of its <license> element
+    def _parseLicenseAttribs(self, l, licXNode):
+        l.id = licXNode.get("licenseId")
+        l.name = licXNode.get("name")
+        osiText = licXNode.get("isOsiApproved", "false")
+        l.osi = (osiText == "true")
+        l.versionAdded = licXNode.get("listVersionAdded", "")
+        l.versionDeprecated = licXNode.get("deprecatedVersion", "")
+
+    # Helper function to create a whitespace or text node from an XML
+    # node's tail, depending if we have non-whitespace .tail content;
+    # returns None if there is no tail
+    def _makeTailNode(self, xmlnode):
+        if xmlnode.tail is None:
+            return None
+        # FIXME BUG - line numbers are incorrect for tail nodes!
+        if xmlnode.tail.strip() == "":
+            return self._makeWhitespaceNode(xmlnode.sourceline)
+        return self._makeTextNode(xmlnode.tail, xmlnode.sourceline)
+
+    # Helper function to list the XML files in a directory, in sorted order
+    def _listXMLFiles(self, dirpath):
+        xmlpaths = []
+        for xmlfile in sorted(os.listdir(dirpath)):
+            xmlpath = os.path.join(dirpath, xmlfile)
+            if os.path.isfile(xmlpath) and os.path.splitext(xmlpath)[1] == ".xml":
+                xmlpaths.append(xmlpath)
+        return xmlpaths
+
+    # Helper function to compute the SHA-256 digest of a file's contents
+    def _hashFile(self, path):
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    # Helper function to record the current state of a loaded file
+    def _recordFileState(self, xmlpath, licId):
+        st = os.stat(xmlpath)
+        self.fileState[xmlpath] = (st.st_mtime_ns, st.st_size,
+                                   self._hashFile(xmlpath), licId)
+
     # Helper function to create a text node from the specified text string
     def _makeTextNode(self, s, sourceline):
         n = LicenseNode()
@@ -200,7 +443,7 @@ class XMLParser:
         # retain original whitespace for now, but get starting line number
         # from where non-whitespace character begins
         n.lineno = sourceline + self._getPrecedingLineCount(s)
-        n.text = s
+        n.text = self._intern(s)
         return n
 
     # Helper function to create a node representing just whitespace
@@ -243,6 +486,22 @@ class XMLParser:
             count += 1
         return count
 
+    # Flattens each of a dict of licenses, e.g. as loaded in the background
+    # by loader.LicenseLoader or watcher.LicenseDirWatcher. A license which
+    # cannot be flattened is reported but kept, so that its XML can still
+    # be viewed.
+    # given:   lics: dict of license ID => datatypes.License
+    # returns: dict of XML file path (or license ID, if it has none) =>
+    #          error message, as for load errors
+    def flattenEach(self, lics):
+        errors = {}
+        for licId, lic in lics.items():
+            try:
+                self.flatten(lic)
+            except Exception as e:
+                errors[lic.xmlPath or licId] = f"could not flatten: {e}"
+        return errors
+
     # Creates a flattened version of the specified License's textNode.
     # given:   lic: License to flatten
     def flatten(self, lic):
@@ -250,6 +509,8 @@ class XMLParser:
         if lic.textNode.type != NodeType.TOPTEXT:
             raise RuntimeError(f"expected NodeType.TOPTEXT, got {lic.textNode.type}")
         self._flattenChildren(lic.textNode, flats)
+        if self.cfg.shareFlats:
+            flats = [self._shareFlat(lf) for lf in flats]
         lic.textFlat = flats
 
     def _flattenChildren(self, t, flats):
@@ -314,7 +575,8 @@ class XMLParser:
         lf = LicenseFlat()
         lf.type = FlatType.REGEX
         lf.lineno = c.lineno
-        lf.regex = regex
+        lf.regex = self._intern(regex)
+        lf.text = self._intern(self._getDefaultText(c))
         flats.append(lf)
 
         # add spacing after if applicable
@@ -323,6 +585,34 @@ class XMLParser:
              self.cfg.defaultSpacing in [NodeSpacing.AFTER, NodeSpacing.BOTH])):
             self._addFlatsWhitespace(c, flats)
 
+    # Helper function to intern a string if cfg.internText is set
+    def _intern(self, s):
+        if s is None or not self.cfg.internText:
+            return s
+        return sys.intern(s)
+
+    # Helper function to return the shared copy of a flat identical to lf,
+    # after first sharing its children; lf itself becomes the shared copy
+    # if there is none yet. Flats are identical if they have the same type,
+    # line number, text, regex and (shared) children, so that a shared flat
+    # has the same line number as the one it replaces.
+    def _shareFlat(self, lf):
+        if len(lf.children) > 0:
+            lf.children = [self._shareFlat(c) for c in lf.children]
+        key = (lf.type, lf.lineno, lf.text, lf.regex,
+               tuple(id(c) for c in lf.children))
+        return self.sharedFlats.setdefault(key, lf)
+
+    # Helper function to get the text content within a node, such as the
+    # default text for an <alt>, with whitespace nodes as single spaces
+    def _getDefaultText(self, c):
+        match c.type:
+            case NodeType.PLAINTEXT:
+                return c.text
+            case NodeType.WHITESPACE | NodeType.BR:
+                return " "
+        return "".join(self._getDefaultText(sub) for sub in c.children)
+
     def _addFlatsOptional(self, c, flats, spacing):
         # add spacing before if applicable
         if (spacing in [NodeSpacing.BEFORE, NodeSpacing.BOTH] or
@@ -0,0 +1,131 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+
+# Computes the cache key for a scanned file's contents.
+# given:   data: file contents, as bytes
+#          fingerprint: configuration fingerprint, as bytes; see
+#                       batchscan.BatchScanner.makeFingerprint()
+# returns: key, as bytes
+def makeScanKey(data, fingerprint):
+    h = hashlib.sha256(data).digest()
+    return hashlib.sha256(fingerprint + h).digest()
+
+# In-memory cache of scan results, keeping a bounded number of the most
+# recently used entries. Values are anything that can be converted to
+# JSON, e.g. a list of match dicts.
+class ScanCache:
+    # given: maxEntries: maximum number of results to keep
+    def __init__(self, maxEntries=10000):
+        super(ScanCache, self).__init__()
+
+        # maximum number of results to keep
+        self.maxEntries = maxEntries
+
+        # ordered dict of key => value, least recently used first
+        self.entries = OrderedDict()
+
+    # Returns the value for a key, or None if not present.
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    # Stores the value for a key.
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+
+    # Nothing to save; for compatibility with PersistentScanCache.
+    def close(self):
+        pass
+
+# Persistent cache of scan results in an SQLite database file, in front of
+# which a smaller in-memory ScanCache is kept. When the stored values grow
+# past maxBytes, the least recently used entries are evicted.
+class PersistentScanCache:
+    # given: path: path to SQLite database file, created if needed
+    #        maxBytes: maximum total size of stored values
+    #        maxMemoryEntries: maximum number of results to keep in memory
+    def __init__(self, path, maxBytes=64*1024*1024, maxMemoryEntries=10000):
+        super(PersistentScanCache, self).__init__()
+
+        # maximum total size of stored values, in bytes
+        self.maxBytes = maxBytes
+
+        # in-memory cache of recently used results
+        self.memory = ScanCache(maxMemoryEntries)
+
+        self.db = sqlite3.connect(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS results (
+                           key BLOB PRIMARY KEY,
+                           value TEXT NOT NULL,
+                           size INTEGER NOT NULL,
+                           lastUsed INTEGER NOT NULL)""")
+        self.db.execute("""CREATE INDEX IF NOT EXISTS results_lastUsed
+                           ON results (lastUsed)""")
+        self.db.commit()
+
+        # total size of stored values, in bytes
+        self.totalBytes = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    # Returns the value for a key, or None if not present.
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            row = self.db.execute("SELECT value FROM results WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is None:
+                return None
+            value = json.loads(row[0])
+        self.db.execute("UPDATE results SET lastUsed = ? WHERE key = ?",
+                        (time.time_ns(), key))
+        self.memory.put(key, value)
+        return value
+
+    # Stores the value for a key, evicting old entries if needed.
+    def put(self, key, value):
+        self.memory.put(key, value)
+        data = json.dumps(value)
+        size = len(data.encode("utf-8"))
+        row = self.db.execute("SELECT size FROM results WHERE key = ?",
+                              (key,)).fetchone()
+        if row is not None:
+            self.totalBytes -= row[0]
+        self.db.execute("""INSERT OR REPLACE INTO results
+                           (key, value, size, lastUsed) VALUES (?, ?, ?, ?)""",
+                        (key, data, size, time.time_ns()))
+        self.totalBytes += size
+        self._evict()
+
+    # Saves changes and closes the database.
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to remove least recently used entries until the
+    # stored values fit within maxBytes
+    def _evict(self):
+        while self.totalBytes > self.maxBytes:
+            rows = self.db.execute("""SELECT key, size FROM results
+                                      ORDER BY lastUsed LIMIT 100""").fetchall()
+            if len(rows) == 0:
+                self.totalBytes = 0
+                return
+            for key, size in rows:
+                self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.memory.entries.pop(key, None)
+                self.totalBytes -= size
+                if self.totalBytes <= self.maxBytes:
+                    break
@@ -0,0 +1,354 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import mmap
+import struct
+from array import array
+from multiprocessing import shared_memory
+
+from datatypes import License, LicenseFlat, FlatType
+from llmatch import LicenseMatcherConfig, LicenseMatcher
+from lltokenize import TextPreprocessorConfig, preprocess
+
+##### PACKED CORPUS LAYOUT #####
+
+# The packed corpus is a single flat binary buffer, so that it can be
+# placed in shared memory or an mmap'd file and used by several worker
+# processes without each one keeping its own copy.
+#
+# Layout: a header, followed by sections aligned to 8 bytes.
+#   header:   magic, version, then (offset, length) in bytes per section
+#   STRINGS:  UTF-8 bytes for all strings (IDs, flat text, regexes, words)
+#   STROFFS:  int64 start offset of each string in STRINGS, plus end
+#   LICS:     int64 x 5 per license: ID string, first flat record, number
+#             of flat records, first token, number of tokens
+#   FLATS:    int64 x 5 per flat record, in pre-order: FlatType value,
+#             lineno, string (text or regex, or -1), number of descendants,
+#             string for a regex's default text (or -1)
+#   TOKENS:   int32 vocabulary index for each word in each license's
+#             preprocessed TEXT flats, in order
+#   TOKFLATS: int32 flat record index (relative to the license) that each
+#             token came from
+#   VOCAB:    int64 string index for each vocabulary word
+
+CORPUS_MAGIC = b"LLXCORP1"
+CORPUS_VERSION = 2
+
+SECTIONS = ["STRINGS", "STROFFS", "LICS", "FLATS", "TOKENS", "TOKFLATS", "VOCAB"]
+SECTION_FORMATS = {
+    "STRINGS": "B",
+    "STROFFS": "q",
+    "LICS": "q",
+    "FLATS": "q",
+    "TOKENS": "i",
+    "TOKFLATS": "i",
+    "VOCAB": "q",
+}
+
+LIC_FIELDS = 5
+FLAT_FIELDS = 5
+
+HEADER_FORMAT = "<8sI" + "QQ" * len(SECTIONS)
+HEADER_SIZE = (struct.calcsize(HEADER_FORMAT) + 7) // 8 * 8
+
+# Packs flattened licenses into the binary corpus layout.
+# given:   lics: dict of license ID => datatypes.License, already flattened
+#          tpcfg: TextPreprocessorConfig for tokenizing flat text
+# returns: bytes
+def packCorpus(lics, tpcfg):
+    packer = _CorpusPacker(tpcfg)
+    for licId in sorted(lics.keys(), key=str.casefold):
+        packer.addLicense(lics[licId])
+    return packer.toBytes()
+
+##### SHARING #####
+
+# Creates a shared memory block containing the packed corpus. The caller
+# is responsible for calling close() and unlink() on the result when done.
+# given:   lics: dict of license ID => datatypes.License, already flattened
+#          tpcfg: TextPreprocessorConfig for tokenizing flat text
+#          name: name for shared memory block, or None to generate one
+# returns: multiprocessing.shared_memory.SharedMemory
+def createSharedCorpus(lics, tpcfg, name=None):
+    data = packCorpus(lics, tpcfg)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+    shm.buf[:len(data)] = data
+    return shm
+
+# Attaches to an existing shared memory block containing a packed corpus.
+# given:   name: name of shared memory block
+# returns: (SharedMemory, PackedCorpus); keep the SharedMemory referenced
+#          for as long as the PackedCorpus is in use
+def attachSharedCorpus(name):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, PackedCorpus(shm.buf)
+
+# Writes the packed corpus to a file, for use with openCorpusFile().
+def writeCorpusFile(path, lics, tpcfg):
+    with open(path, "wb") as f:
+        f.write(packCorpus(lics, tpcfg))
+
+# Opens a packed corpus file via mmap, so that all processes opening the
+# same file share its pages.
+# returns: PackedCorpus
+def openCorpusFile(path):
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return PackedCorpus(memoryview(mm))
+
+##### READING #####
+
+# Read-only view onto a packed corpus buffer. Nothing is copied out of the
+# buffer until requested, e.g. via getFlats() or getLicense().
+class PackedCorpus:
+    def __init__(self, buf):
+        super(PackedCorpus, self).__init__()
+
+        # underlying buffer (bytes, mmap or shared memory)
+        self.buf = memoryview(buf).cast("B")
+
+        header = struct.unpack_from(HEADER_FORMAT, self.buf, 0)
+        if header[0] != CORPUS_MAGIC:
+            raise ValueError("not a packed license corpus")
+        if header[1] != CORPUS_VERSION:
+            raise ValueError(f"unsupported packed corpus version {header[1]}")
+
+        # typed views onto each section, by section name
+        self.sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset = header[2 + i*2]
+            length = header[3 + i*2]
+            view = self.buf[offset:offset + length]
+            self.sections[name] = view.cast(SECTION_FORMATS[name])
+
+        # dict of license ID => index in LICS section
+        self.licIndex = {}
+        lics = self.sections["LICS"]
+        for i in range(len(lics) // LIC_FIELDS):
+            self.licIndex[self.getString(lics[i * LIC_FIELDS])] = i
+
+    # Releases views onto the underlying buffer, which is needed before
+    # closing shared memory.
+    def release(self):
+        for view in self.sections.values():
+            view.release()
+        self.sections = {}
+        self.buf.release()
+
+    # Returns the list of license IDs in the corpus.
+    def licenseIds(self):
+        return list(self.licIndex.keys())
+
+    # Returns a string from the STRINGS section by index.
+    def getString(self, strIdx):
+        offs = self.sections["STROFFS"]
+        return bytes(self.sections["STRINGS"][offs[strIdx]:offs[strIdx+1]]).decode("utf-8")
+
+    # Returns the vocabulary word for a token value.
+    def getWord(self, vocabIdx):
+        return self.getString(self.sections["VOCAB"][vocabIdx])
+
+    # Returns the token values for a license's preprocessed TEXT flats.
+    # returns: memoryview of int32 vocabulary indices
+    def getTokens(self, licId):
+        _, _, _, tokStart, tokCount = self._licFields(licId)
+        return self.sections["TOKENS"][tokStart:tokStart + tokCount]
+
+    # Returns the flat record index (relative to the license) for each
+    # token in getTokens().
+    def getTokenFlats(self, licId):
+        _, _, _, tokStart, tokCount = self._licFields(licId)
+        return self.sections["TOKFLATS"][tokStart:tokStart + tokCount]
+
+    # Reconstructs the flattened nodes for a license.
+    # returns: list of LicenseFlats, as for License.textFlat
+    def getFlats(self, licId):
+        _, flatStart, flatCount, _, _ = self._licFields(licId)
+        flats, _ = self._buildFlats(flatStart, flatStart + flatCount)
+        return flats
+
+    # Reconstructs a License with its ID and flattened nodes, suitable for
+    # matching. Other fields are left at their defaults.
+    def getLicense(self, licId):
+        lic = License()
+        lic.id = licId
+        lic.textFlat = self.getFlats(licId)
+        return lic
+
+    ##### HELPER FUNCTIONS #####
+
+    def _licFields(self, licId):
+        i = self.licIndex[licId] * LIC_FIELDS
+        return tuple(self.sections["LICS"][i:i + LIC_FIELDS])
+
+    # Helper function to rebuild LicenseFlats from records in [idx, endIdx)
+    # returns: list of LicenseFlats, and index of next record
+    def _buildFlats(self, idx, endIdx):
+        records = self.sections["FLATS"]
+        flats = []
+        while idx < endIdx:
+            r = idx * FLAT_FIELDS
+            lf = LicenseFlat()
+            lf.type = FlatType(records[r])
+            lf.lineno = records[r + 1]
+            strIdx = records[r + 2]
+            descendants = records[r + 3]
+            match lf.type:
+                case FlatType.TEXT:
+                    lf.text = self.getString(strIdx)
+                case FlatType.REGEX:
+                    lf.regex = self.getString(strIdx)
+                    lf.text = self.getString(records[r + 4])
+            idx += 1
+            if lf.type == FlatType.OPTIONAL:
+                lf.children, idx = self._buildFlats(idx, idx + descendants)
+            flats.append(lf)
+        return flats, idx
+
+##### WORKER PROCESSES #####
+
+# Matching state for a worker process, attached to a shared corpus.
+# Each license's regex is compiled the first time it is needed, and its
+# reconstructed flats are then dropped.
+class CorpusWorker:
+    def __init__(self, shmName):
+        super(CorpusWorker, self).__init__()
+
+        # shared memory block and corpus view onto it
+        self.shm, self.corpus = attachSharedCorpus(shmName)
+
+        # text preprocessor and matcher, local to this process
+        self.tpcfg = TextPreprocessorConfig()
+        self.matcher = LicenseMatcher(LicenseMatcherConfig(), self.tpcfg)
+
+    # Matches text against all licenses in the corpus.
+    # returns: list of llmatch.MatchResults
+    def match(self, text, fullMatch=None):
+        res = preprocess(text, self.tpcfg)
+        results = []
+        for licId in sorted(self.corpus.licenseIds(), key=str.casefold):
+            if licId in self.matcher.patterns:
+                pattern = self.matcher.patterns[licId]
+            else:
+                pattern = self.matcher.compile(self.corpus.getLicense(licId))
+            mr = self.matcher.matchPattern(licId, pattern, res, fullMatch)
+            if mr is not None:
+                results.append(mr)
+        return results
+
+# CorpusWorker for the current process; see initCorpusWorker()
+_corpusWorker = None
+
+# Initializer for worker processes, e.g. for ProcessPoolExecutor's
+# initializer argument.
+# given:   shmName: name of shared memory block from createSharedCorpus()
+def initCorpusWorker(shmName):
+    global _corpusWorker
+    _corpusWorker = CorpusWorker(shmName)
+
+# Matches text in a worker process set up with initCorpusWorker().
+# returns: list of llmatch.MatchResults
+def corpusWorkerMatch(text, fullMatch=None):
+    return _corpusWorker.match(text, fullMatch)
+
+##### PACKING #####
+
+class _CorpusPacker:
+    def __init__(self, tpcfg):
+        super(_CorpusPacker, self).__init__()
+
+        # text preprocessor configuration, for tokenizing flat text
+        self.tpcfg = tpcfg
+
+        # encoded strings and dict of string => index, to share repeats
+        self.strings = []
+        self.stringIndex = {}
+
+        # section contents
+        self.lics = array("q")
+        self.flats = array("q")
+        self.tokens = array("i")
+        self.tokFlats = array("i")
+        self.vocab = array("q")
+
+        # dict of word => vocabulary index
+        self.vocabIndex = {}
+
+    def addLicense(self, lic):
+        flatStart = len(self.flats) // FLAT_FIELDS
+        tokStart = len(self.tokens)
+        self._addFlats(lic.textFlat, flatStart)
+        self.lics.extend([
+            self._addString(lic.id),
+            flatStart,
+            len(self.flats) // FLAT_FIELDS - flatStart,
+            tokStart,
+            len(self.tokens) - tokStart,
+        ])
+
+    def toBytes(self):
+        offs = array("q", [0])
+        for s in self.strings:
+            offs.append(offs[-1] + len(s))
+        contents = {
+            "STRINGS": b"".join(self.strings),
+            "STROFFS": offs.tobytes(),
+            "LICS": self.lics.tobytes(),
+            "FLATS": self.flats.tobytes(),
+            "TOKENS": self.tokens.tobytes(),
+            "TOKFLATS": self.tokFlats.tobytes(),
+            "VOCAB": self.vocab.tobytes(),
+        }
+
+        parts = []
+        positions = []
+        pos = HEADER_SIZE
+        for name in SECTIONS:
+            data = contents[name]
+            positions.extend([pos, len(data)])
+            padding = (8 - len(data) % 8) % 8
+            parts.append(data + b"\0" * padding)
+            pos += len(data) + padding
+
+        header = struct.pack(HEADER_FORMAT, CORPUS_MAGIC, CORPUS_VERSION,
+                             *positions)
+        header += b"\0" * (HEADER_SIZE - len(header))
+        return header + b"".join(parts)
+
+    def _addString(self, s):
+        strIdx = self.stringIndex.get(s)
+        if strIdx is None:
+            strIdx = len(self.strings)
+            self.strings.append(s.encode("utf-8"))
+            self.stringIndex[s] = strIdx
+        return strIdx
+
+    # Helper function to add flat records in pre-order, with the number
+    # of descendants for each so that children can be found again
+    def _addFlats(self, fts, flatStart):
+        for ft in fts:
+            recIdx = len(self.flats) // FLAT_FIELDS
+            strIdx = -1
+            textIdx = -1
+            match ft.type:
+                case FlatType.TEXT:
+                    strIdx = self._addString(ft.text)
+                    self._addTokens(ft.text, recIdx - flatStart)
+                case FlatType.REGEX:
+                    strIdx = self._addString(ft.regex)
+                    textIdx = self._addString(ft.text)
+            self.flats.extend([ft.type.value, ft.lineno, strIdx, 0, textIdx])
+            if ft.type == FlatType.OPTIONAL:
+                self._addFlats(ft.children, flatStart)
+                descendants = len(self.flats) // FLAT_FIELDS - recIdx - 1
+                self.flats[recIdx * FLAT_FIELDS + 3] = descendants
+
+    def _addTokens(self, text, recIdx):
+        for word in preprocess(text, self.tpcfg).proc.split():
+            vocabIdx = self.vocabIndex.get(word)
+            if vocabIdx is None:
+                vocabIdx = len(self.vocab)
+                self.vocab.append(self._addString(word))
+                self.vocabIndex[word] = vocabIdx
+            self.tokens.append(vocabIdx)
+            self.tokFlats.append(recIdx)
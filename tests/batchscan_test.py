@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import os
+import tempfile
+import unittest
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+if lxml is not None:
+    from batchscan import BatchScanConfig, BatchScanner
+
+GOOD_XML = ('<SPDXLicenseCollection xmlns="http://www.spdx.org/license">'
+            '<license licenseId="Good" name="Good"><text><p>Some text.</p>'
+            '</text></license></SPDXLicenseCollection>')
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class BatchScannerTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.scanner = BatchScanner(BatchScanConfig())
+
+    def tearDown(self):
+        self.scanner.close()
+        self.tmpdir.cleanup()
+
+    def test_unreadable_file(self):
+        # testing that a file which cannot be read is reported with an
+        # error, and the files after it are still scanned
+        missing = os.path.join(self.tmpdir.name, "a-missing")
+        os.symlink(os.path.join(self.tmpdir.name, "nowhere"), missing)
+        present = os.path.join(self.tmpdir.name, "b-present")
+        with open(present, "w") as f:
+            f.write("Some text.")
+
+        rows = list(self.scanner.scanPaths([self.tmpdir.name]))
+        self.assertEqual([(path, error is None) for path, _, error in rows],
+                         [(missing, False), (present, True)])
+        self.assertEqual(rows[0][1], [])
+        self.assertEqual(self.scanner.scanned, 1)
+        self.assertEqual(self.scanner.errors, 1)
+
+    def test_load_reports_bad_files(self):
+        # testing that a license file which cannot be loaded is reported,
+        # and the others are still loaded
+        xmldir = os.path.join(self.tmpdir.name, "xml")
+        os.mkdir(xmldir)
+        with open(os.path.join(xmldir, "Good.xml"), "w") as f:
+            f.write(GOOD_XML)
+        badPath = os.path.join(xmldir, "Bad.xml")
+        with open(badPath, "w") as f:
+            f.write(GOOD_XML.replace("<p>", "<px>").replace("</p>", "</px>"))
+        self.scanner.cfg.xmldirpath = xmldir
+
+        errors = self.scanner.load()
+        self.assertEqual(list(errors.keys()), [badPath])
+        self.assertEqual(list(self.scanner.lics.keys()), ["Good"])
+        self.assertEqual(len(self.scanner.lics["Good"].textFlat), 1)
+
+    def test_identical_files_cached(self):
+        # testing that a byte-identical file is served from the cache,
+        # without being matched again
+        xmldir = os.path.join(self.tmpdir.name, "xml")
+        os.mkdir(xmldir)
+        with open(os.path.join(xmldir, "Good.xml"), "w") as f:
+            f.write(GOOD_XML)
+        self.scanner.cfg.xmldirpath = xmldir
+        self.scanner.load()
+
+        # count calls to the exact match index, which every file that is
+        # not cached goes through
+        calls = []
+        match = self.scanner.exactIndex.match
+        def countingMatch(res):
+            calls.append(res.proc)
+            return match(res)
+        self.scanner.exactIndex.match = countingMatch
+
+        paths = []
+        for name in ["a", "b"]:
+            paths.append(os.path.join(self.tmpdir.name, name))
+            with open(paths[-1], "w") as f:
+                f.write("Some text.\n")
+        rows = list(self.scanner.scanPaths(paths))
+
+        self.assertEqual([r[1] for r in rows], [rows[0][1], rows[0][1]])
+        self.assertEqual(rows[0][1][0]["licenseId"], "Good")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((self.scanner.scanned, self.scanner.cached), (2, 1))
@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import os
+import tempfile
+import unittest
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+if lxml is not None:
+    from corpusprofile import CorpusProfiler
+
+BIG_XML = '''<SPDXLicenseCollection xmlns="http://www.spdx.org/license">
+<license licenseId="Big" name="Big">
+<text>
+<titleText><p>Big License</p></titleText>
+<copyrightText><p>Copyright (c) <alt name="year" match="\\d{4}">2025</alt> Someone</p></copyrightText>
+<p>Permission is granted.</p>
+<optional><p>Outer <optional>inner</optional> text.</p></optional>
+<p>Version <alt name="v" match="\\d+(\\.\\d+)?">1.0</alt>.</p>
+</text>
+</license>
+</SPDXLicenseCollection>
+'''
+
+SMALL_XML = ('<SPDXLicenseCollection xmlns="http://www.spdx.org/license">'
+             '<license licenseId="Small" name="Small"><text><p>Some text.</p>'
+             '</text></license></SPDXLicenseCollection>')
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class CorpusProfilerTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.profiler = CorpusProfiler(worstAlts=1)
+        self.write("Big.xml", BIG_XML)
+        self.write("Small.xml", SMALL_XML)
+        self.badPath = self.write("Bad.xml", SMALL_XML.replace("p>", "px>"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, xml):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            f.write(xml)
+        return path
+
+    def test_profile_dir(self):
+        # testing the statistics gathered for each license, and that the
+        # licenses are ordered by cost with a bad file as an error row
+        profiles = self.profiler.profileDir(self.tmpdir.name)
+        self.assertEqual(sorted(p.licenseId for p in profiles),
+                         sorted(["Big", "Small", self.badPath]))
+        costs = [p.cost for p in profiles]
+        self.assertEqual(costs, sorted(costs, reverse=True))
+
+        byId = {p.licenseId: p for p in profiles}
+        big = byId["Big"]
+        self.assertEqual(big.error, "")
+        self.assertEqual(big.nodeCount, 30)
+        self.assertEqual(big.flatCount, 26)
+        self.assertEqual(big.maxOptionalDepth, 2)
+        self.assertEqual(big.regexCount, 2)
+        # 88 characters of text and alt default text, and 14 whitespace
+        # flats as single spaces
+        self.assertEqual(big.textLength, 102)
+        self.assertEqual(len(big.worstAlts), 1)
+        self.assertIn(big.worstAlts[0][1], [".*", "\\d+(\\.\\d+)?"])
+        self.assertGreater(big.cost, 0)
+
+        small = byId["Small"]
+        self.assertEqual((small.nodeCount, small.flatCount,
+                          small.maxOptionalDepth, small.regexCount,
+                          small.textLength), (3, 1, 0, 0, 10))
+        self.assertEqual(small.worstAlts, [])
+
+        bad = byId[self.badPath]
+        self.assertIs(profiles[-1], bad)
+        self.assertTrue(bad.error.startswith("could not parse: "), bad.error)
+        self.assertEqual(bad.cost, 0)
+        self.assertEqual(bad.toDict()["error"], bad.error)
@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import os
+import tempfile
+import unittest
+
+from datatypes import License, OrigXMLCache, LicenseIDIndex, AppData
+
+class OrigXMLCacheTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.lics = []
+        for i in range(3):
+            lic = License()
+            lic.id = f"Lic-{i}"
+            lic.xmlPath = os.path.join(self.tmpdir.name, f"Lic-{i}.xml")
+            with open(lic.xmlPath, "w") as f:
+                f.write(f"<license {i}/>")
+            self.lics.append(lic)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_reads_on_demand_with_lru(self):
+        # testing that XML is read from file and least recently used
+        # entries are dropped
+        cache = OrigXMLCache(maxEntries=2)
+
+        self.assertEqual(cache.get(self.lics[0]), "<license 0/>")
+        self.assertEqual(cache.get(self.lics[1]), "<license 1/>")
+        self.assertEqual(cache.get(self.lics[0]), "<license 0/>")
+        self.assertEqual(cache.get(self.lics[2]), "<license 2/>")
+        self.assertEqual(list(cache.entries.keys()),
+                         [self.lics[0].xmlPath, self.lics[2].xmlPath])
+
+        # kept entries are not re-read until cleared
+        with open(self.lics[0].xmlPath, "w") as f:
+            f.write("<changed/>")
+        self.assertEqual(cache.get(self.lics[0]), "<license 0/>")
+        cache.clear()
+        self.assertEqual(cache.get(self.lics[0]), "<changed/>")
+
+    def test_discard(self):
+        # testing that only the given license's XML is dropped
+        cache = OrigXMLCache()
+        cache.get(self.lics[0])
+        cache.get(self.lics[1])
+        cache.discard(self.lics[0])
+        cache.discard(self.lics[2])
+        self.assertEqual(list(cache.entries.keys()), [self.lics[1].xmlPath])
+
+    def test_update_licenses_discards_changed(self):
+        # testing that updating licenses only drops their own XML
+        appdata = AppData()
+        appdata.setLicenses({lic.id: lic for lic in self.lics})
+        for lic in self.lics:
+            appdata.origXMLCache.get(lic)
+
+        appdata.updateLicenses({"Lic-1": self.lics[1]}, ["Lic-2"])
+        self.assertEqual(list(appdata.origXMLCache.entries.keys()),
+                         [self.lics[0].xmlPath])
+
+    def test_kept_orig_xml(self):
+        # testing that XML kept in memory is used, and no path gives ""
+        cache = OrigXMLCache()
+        self.lics[0].origXML = "<kept/>"
+
+        self.assertEqual(cache.get(self.lics[0]), "<kept/>")
+        self.assertEqual(cache.get(License()), "")
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_unreadable_file(self):
+        # testing that a removed or unreadable file gives "", and is read
+        # again once it is available
+        cache = OrigXMLCache()
+        os.remove(self.lics[0].xmlPath)
+        self.assertEqual(cache.get(self.lics[0]), "")
+        with open(self.lics[1].xmlPath, "wb") as f:
+            f.write(b"<license \xff/>")
+        self.assertEqual(cache.get(self.lics[1]), "")
+        self.assertEqual(len(cache.entries), 0)
+
+        with open(self.lics[0].xmlPath, "w") as f:
+            f.write("<restored/>")
+        self.assertEqual(cache.get(self.lics[0]), "<restored/>")
+
+class LicenseIDIndexTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.index = LicenseIDIndex()
+        self.index.rebuild({licId: None for licId in
+            ["MIT", "Apache-2.0", "mit-0", "GPL-2.0-only", "LGPL-2.1-only", "BSD-3-Clause"]})
+
+    def test_sorted_ids(self):
+        self.assertEqual(self.index.ids, ["Apache-2.0", "BSD-3-Clause",
+            "GPL-2.0-only", "LGPL-2.1-only", "MIT", "mit-0"])
+        self.assertEqual(self.index.search(""), self.index.ids)
+
+    def test_search(self):
+        # testing that substring search is case-insensitive, lists each ID
+        # once and does not match across IDs
+        self.assertEqual(self.index.search("mit"), ["MIT", "mit-0"])
+        self.assertEqual(self.index.search("-only"),
+                         ["GPL-2.0-only", "LGPL-2.1-only"])
+        self.assertEqual(self.index.search("2.0"), ["Apache-2.0", "GPL-2.0-only"])
+        self.assertEqual(self.index.search("0\nbsd"), [])
+        self.assertEqual(self.index.search("clausegpl"), [])
+        self.assertEqual(self.index.search("gpl", prefixOnly=True),
+                         ["GPL-2.0-only"])
+        self.assertEqual(self.index.search("M", prefixOnly=True),
+                         ["MIT", "mit-0"])
+        self.assertEqual(self.index.search("zlib", prefixOnly=True), [])
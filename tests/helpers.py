@@ -0,0 +1,41 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+from datatypes import License, LicenseFlat, FlatType
+
+# Helper to create a flattened node
+def makeFlat(flatType, lineno=0, text="", regex="", children=None):
+    lf = LicenseFlat()
+    lf.type = flatType
+    lf.lineno = lineno
+    lf.text = text
+    lf.regex = regex
+    lf.children = children if children is not None else []
+    return lf
+
+# Helper to create a simple flattened "Test-1.0" license: an optional
+# title, a regex part (e.g. for a copyright notice) and required text,
+# with line numbers as if from its XML file.
+# given:   regex, regexText: regex and default text for the regex part
+#          text: required text
+#          withVersion: True to nest an optional version in the title
+# returns: datatypes.License
+def makeTestLicense(regex="Copyright.*?(?=Permission)", regexText="",
+                    text="Permission is hereby granted, to use this licence.",
+                    withVersion=False):
+    title = [makeFlat(FlatType.TEXT, 3, text="The Test License")]
+    if withVersion:
+        title.append(makeFlat(FlatType.OPTIONAL, 4, children=[
+            makeFlat(FlatType.TEXT, 4, text="Version 1.0"),
+        ]))
+
+    lic = License()
+    lic.id = "Test-1.0"
+    lic.textFlat = [
+        makeFlat(FlatType.OPTIONAL, 3, children=title),
+        makeFlat(FlatType.WHITESPACE, 5),
+        makeFlat(FlatType.REGEX, 6, regex=regex, text=regexText),
+        makeFlat(FlatType.WHITESPACE, 6),
+        makeFlat(FlatType.TEXT, 7, text=text),
+    ]
+    return lic
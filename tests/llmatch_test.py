@@ -0,0 +1,181 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import unittest
+
+from datatypes import License, FlatType
+from llmatch import LicenseMatcherConfig, LicenseMatcher, ExactMatchIndex
+from lltokenize import TextPreprocessorConfig, preprocess
+
+from helpers import makeFlat, makeTestLicense
+
+class LicenseMatcherTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tpcfg = TextPreprocessorConfig()
+        self.cfg = LicenseMatcherConfig()
+        self.matcher = LicenseMatcher(self.cfg, self.tpcfg)
+
+        # simple license with optional title and copyright notice
+        self.lic = makeTestLicense()
+
+    def tearDown(self):
+        pass
+
+    def test_compile_flats(self):
+        # testing conversion of flattened nodes into a regex
+        pattern = self.matcher.compile(self.lic)
+
+        self.assertEqual(pattern.pattern,
+            r"(?:the test license)? ?(?:copyright.*?(?=permission)) ?" +
+            r"permission is hereby granted, to use this license\.")
+        self.assertIs(self.matcher.patterns["Test-1.0"], pattern)
+
+    def test_full_match(self):
+        # testing matching against whole text, with orig row/col values
+        t = "Copyright (c) 2025 Someone\n\nPermission  is hereby granted,\nto use this license."
+        res = preprocess(t, self.tpcfg)
+
+        mr = self.matcher.match(self.lic, res)
+        self.assertIsNotNone(mr)
+        self.assertEqual(mr.licenseId, "Test-1.0")
+        self.assertEqual(mr.origStart, 0)
+        self.assertEqual(mr.origEnd, len(t))
+        self.assertEqual(mr.startRC, (1, 1))
+        self.assertEqual(mr.endRC, (4, 20))
+
+        # extra text should prevent a full match
+        res = preprocess("Intro text. " + t, self.tpcfg)
+        self.assertIsNone(self.matcher.match(self.lic, res))
+
+    def test_search_match(self):
+        # testing finding a license within longer text
+        self.cfg.fullMatch = False
+        t = "Intro.\nCopyright 2025 Someone Permission is hereby granted, to use this license. End."
+        res = preprocess(t, self.tpcfg)
+
+        mr = self.matcher.match(self.lic, res)
+        self.assertIsNotNone(mr)
+        self.assertEqual(t[mr.origStart:mr.origEnd],
+            "Copyright 2025 Someone Permission is hereby granted, to use this license.")
+        self.assertEqual(mr.startRC, (2, 1))
+
+    def test_find_all(self):
+        # testing finding several licenses, from seeds, within one text
+        other = License()
+        other.id = "Other-1.0"
+        other.textFlat = [
+            makeFlat(FlatType.TEXT, text="Redistribution is allowed"),
+            makeFlat(FlatType.WHITESPACE),
+            makeFlat(FlatType.OPTIONAL, children=[
+                makeFlat(FlatType.TEXT, text="in all forms"),
+            ]),
+            makeFlat(FlatType.TEXT, text="."),
+        ]
+        lics = {"Test-1.0": self.lic, "Other-1.0": other}
+        self.assertEqual(self.matcher._getSeed(self.lic)[0],
+                         ("is", "hereby", "granted,"))
+        self.assertEqual(self.matcher._getSeed(other)[0],
+                         ("redistribution", "is"))
+
+        t = ("NOTICE\n\nRedistribution is allowed in all forms.\n\n" +
+             "Copyright 2025 Someone\nPermission is hereby granted, to use this license.\n" +
+             "Then Redistribution is allowed.\nUnrelated permission is hereby denied.")
+        res = preprocess(t, self.tpcfg)
+
+        results = self.matcher.findAll(lics, res)
+        self.assertEqual([mr.licenseId for mr in results],
+                         ["Other-1.0", "Test-1.0", "Other-1.0"])
+        self.assertEqual(t[results[0].origStart:results[0].origEnd],
+                         "Redistribution is allowed in all forms.")
+        self.assertEqual(results[1].startRC, (5, 1))
+        self.assertEqual(results[1].endRC, (6, 50))
+        self.assertEqual(results[2].startRC, (7, 6))
+
+    def test_greedy_copyright(self):
+        # testing that a greedy copyright regex at the start of a license
+        # does not take in the text before it, or join separate copies
+        mit = License()
+        mit.id = "MIT"
+        mit.textFlat = [
+            makeFlat(FlatType.OPTIONAL, children=[
+                makeFlat(FlatType.TEXT, text="MIT License"),
+            ]),
+            makeFlat(FlatType.WHITESPACE),
+            makeFlat(FlatType.REGEX, regex=".*"),
+            makeFlat(FlatType.WHITESPACE),
+            makeFlat(FlatType.TEXT,
+                     text="Permission is hereby granted, free of charge."),
+        ]
+        copy = ("MIT License\n\nCopyright (c) 2025 Someone\n\n" +
+                "Permission is hereby granted, free of charge.")
+        preamble = "This package includes third-party code.\n\n"
+
+        self.cfg.fullMatch = False
+        t = preamble + copy + "\nEnd."
+        mr = self.matcher.match(mit, preprocess(t, self.tpcfg))
+        self.assertIsNotNone(mr)
+        self.assertEqual(t[mr.origStart:mr.origEnd], copy)
+        self.assertEqual(mr.startRC, (3, 1))
+
+        t = preamble + copy + "\n\nUnrelated text.\n\n" + copy
+        results = self.matcher.findAll({"MIT": mit}, preprocess(t, self.tpcfg))
+        self.assertEqual([t[mr.origStart:mr.origEnd] for mr in results],
+                         [copy, copy])
+        self.assertEqual(results[1].startRC, (11, 1))
+
+    def test_stale_pattern(self):
+        # testing that a regex compiled from an earlier version of a
+        # license is not used for the current one
+        old = License()
+        old.id = "Test-1.0"
+        old.textFlat = [makeFlat(FlatType.TEXT, text="Old text.")]
+        self.matcher.licensesChanged(["Test-1.0"], [])
+        self.matcher.compile(old)
+
+        pattern = self.matcher.getPattern(self.lic)
+        self.assertIn("permission", pattern.pattern)
+        self.assertIs(self.matcher.getPattern(self.lic), pattern)
+
+    def test_invalid_regex(self):
+        # testing that a license with an invalid regex is skipped
+        self.lic.textFlat.append(makeFlat(FlatType.REGEX, regex="(unclosed"))
+        res = preprocess("anything", self.tpcfg)
+
+        self.assertIsNone(self.matcher.match(self.lic, res))
+        self.assertIn("Test-1.0", self.matcher.errors)
+
+class ExactMatchIndexTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tpcfg = TextPreprocessorConfig()
+        self.index = ExactMatchIndex(self.tpcfg)
+
+        self.lic = makeTestLicense(regex="\\S{0,7}", regexText="1.",
+                                   text="Permission is hereby granted.")
+        self.index.build({"Test-1.0": self.lic})
+
+    def tearDown(self):
+        pass
+
+    def test_exact_match_variants(self):
+        # testing that verbatim copies match, with or without optional text
+        for t in ["The Test License\n\n1. Permission is hereby granted.\n",
+                  "  1.  PERMISSION is hereby granted."]:
+            results = self.index.match(preprocess(t, self.tpcfg))
+            self.assertEqual([mr.licenseId for mr in results], ["Test-1.0"])
+            self.assertEqual(t[results[0].origStart:results[0].origEnd],
+                             t.strip())
+
+        # any other text is not found
+        res = preprocess("1. Permission is hereby granted. Extra.", self.tpcfg)
+        self.assertEqual(self.index.match(res), [])
+
+    def test_update(self):
+        # testing that changed and removed licenses are reindexed
+        res = preprocess("1. Permission is hereby granted.", self.tpcfg)
+        self.lic.textFlat[-1].text = "Permission is denied."
+        self.index.update({"Test-1.0": self.lic}, ["Test-1.0"], [])
+        self.assertEqual(self.index.match(res), [])
+
+        self.index.update({}, [], ["Test-1.0"])
+        self.assertEqual(self.index.licIdsByHash, {})
+        self.assertEqual(self.index.hashesByLicId, {})
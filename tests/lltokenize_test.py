@@ -3,8 +3,12 @@
 
 import re
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
-from lltokenize import TextPreprocessorConfig, TextPreprocessor
+from lltokenize import TextPreprocessorConfig, TextPreprocessor, \
+        StreamingTextPreprocessor, IncrementalTextPreprocessor, preprocess, \
+        rewriteAltRegex, compileAltRegex
+from textmap import ProcMap, RowColIndex
 
 class TextPreprocessorTestSuite(unittest.TestCase):
     def setUp(self):
@@ -116,6 +120,39 @@ Don't drop at end #"""
         # procmap should be expanded as well
         self.assertEqual(self.tp.procmap, wantProcmap)
 
+    def test_step3_expanded_lowercase_many(self):
+        # testing lowercasing with several expanding characters among other
+        # non-ASCII characters that do not change length
+        t    = "İÉİxÅ"
+        want = "i̇éi̇xå"
+        wantProcmap = [0, 0, 1, 2, 2, 3, 4]
+
+        self.tp.orig = t
+        self.tp._step1()
+        self.tp._step2()
+        self.tp._step3()
+
+        # proc should now be all lowercase, with expanded length
+        self.assertEqual(self.tp.proc, want)
+
+        # procmap should be expanded only for the expanding characters
+        self.assertEqual(self.tp.procmap, wantProcmap)
+
+    def test_step3_per_character_lowercase(self):
+        # testing that characters are lowercased individually, rather than
+        # with context-dependent rules such as Greek final sigma
+        t    = "ΑΣ Σ"
+        want = "ασ σ"
+
+        self.tp.orig = t
+        self.tp._step1()
+        self.tp._step2()
+        self.tp._step3()
+
+        # each capital sigma should be converted the same way
+        self.assertEqual(self.tp.proc, want)
+        self.assertEqual(self.tp.procmap, [0, 1, 2, 3])
+
     def test_step4a_basic_separator(self):
         # testing removal of a single separator on its own line
         t    = "hello\n@@@\nworld"
@@ -434,6 +471,38 @@ Don't drop at end #"""
         # procmap should be expanded accordingly
         self.assertEqual(self.tp.procmap, wantProcmap)
 
+    def test_step4b_to_5b_combined(self):
+        # testing that the combined single-pass step gives the same results
+        # as running steps 4(b) through 5(b) separately
+        t = " \n Copyright ©  2025 -- a‐–b “quoted” '' `x` http://a.b - c '\t"
+
+        for combine in [True, False]:
+            self.tp.cfg.combineHyphens = combine
+            self.tp.orig = t
+            self.tp._step1()
+            self.tp._step2()
+            self.tp._step3()
+            self.tp._step4a()
+            self.tp._step4b()
+            self.tp._step4c()
+            self.tp._step4d()
+            self.tp._step5a()
+            self.tp._step5b()
+            wantProc = self.tp.proc
+            wantProcmap = list(self.tp.procmap)
+
+            self.tp.clear()
+            self.tp.orig = t
+            self.tp._step1()
+            self.tp._step2()
+            self.tp._step3()
+            self.tp._step4a()
+            self.tp._step4bTo5b()
+
+            # proc and procmap should be identical to separate steps
+            self.assertEqual(self.tp.proc, wantProc)
+            self.assertEqual(self.tp.procmap, wantProcmap)
+
     def test_step5c_equivalent_words_one(self):
         # testing conversion of one equivalent word to its "to" variant
         t    = "hi & hi"
@@ -503,7 +572,7 @@ Don't drop at end #"""
 
         self.tp.orig = t
         self.tp.proc = self.tp.orig
-        self.tp.procmap = list(range(len(self.tp.proc)))
+        self.tp.procmap = ProcMap(len(self.tp.proc))
 
         res = self.tp._helperReplace(2, 6, "ABCDEF")
 
@@ -523,7 +592,7 @@ Don't drop at end #"""
 
         self.tp.orig = t
         self.tp.proc = self.tp.orig
-        self.tp.procmap = list(range(len(self.tp.proc)))
+        self.tp.procmap = ProcMap(len(self.tp.proc))
 
         res = self.tp._helperReplace(2, 6, "ABCDEFGHI")
 
@@ -543,7 +612,7 @@ Don't drop at end #"""
 
         self.tp.orig = t
         self.tp.proc = self.tp.orig
-        self.tp.procmap = list(range(len(self.tp.proc)))
+        self.tp.procmap = ProcMap(len(self.tp.proc))
 
         res = self.tp._helperReplace(2, 6, "ABC")
 
@@ -563,7 +632,7 @@ Don't drop at end #"""
 
         self.tp.orig = t
         self.tp.proc = self.tp.orig
-        self.tp.procmap = list(range(len(self.tp.proc)))
+        self.tp.procmap = ProcMap(len(self.tp.proc))
 
         res = self.tp._helperReplace(0, 3, "a")
 
@@ -585,7 +654,7 @@ c3dee"""
 
         self.tp.orig = t
         self.tp.proc = self.tp.orig
-        self.tp.procmap = list(range(len(self.tp.proc)))
+        self.tp.procmap = ProcMap(len(self.tp.proc))
 
         self.tp._helperReplaceAll(
             r"([a-zA-Z0-9.])\1{2,}",
@@ -613,3 +682,252 @@ c3dee"""
         self.assertEqual(e2[1], "sub license")
         self.assertEqual(type(e2[2]), re.Pattern)
         self.assertEqual(e2[2].pattern, "(^|[^a-zA-Z])(sub license)($|[^a-zA-Z])")
+
+class PreprocessTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.cfg = TextPreprocessorConfig()
+
+    def tearDown(self):
+        pass
+
+    def test_preprocess_matches_class(self):
+        # testing that the functional API gives the same results as the
+        # TextPreprocessor class
+        t = "Copyright © 2025\n# Licensed “as is” -- sub-licence"
+        tp = TextPreprocessor(self.cfg)
+        tp.process(t)
+
+        res = preprocess(t, self.cfg)
+        self.assertEqual(res.orig, t)
+        self.assertEqual(res.proc, tp.proc)
+        self.assertEqual(res.procmap, tp.procmap)
+        self.assertEqual(list(res.origrc), list(tp.origrc))
+
+    def test_preprocess_result_read_only(self):
+        # testing that results cannot be modified
+        res = preprocess("Hello World", self.cfg)
+
+        with self.assertRaises(AttributeError):
+            res.proc = "changed"
+        with self.assertRaises(RuntimeError):
+            res.procmap.replace(0, 1, 2)
+        with self.assertRaises(RuntimeError):
+            res.procmap.append(11, 12, 1, 1)
+        with self.assertRaises(RuntimeError):
+            res.procmap.extendFrom(ProcMap(1))
+        with self.assertRaises(RuntimeError):
+            res.procmap.length = 0
+        with self.assertRaises(TypeError):
+            res.procmap.origStarts[0] = 5
+        with self.assertRaises(RuntimeError):
+            res.origrc.length = 0
+        with self.assertRaises(TypeError):
+            res.origrc.rowStarts[0] = 5
+        self.assertEqual(res.proc, "hello world")
+        self.assertEqual(res.procmap, ProcMap(11))
+        self.assertEqual(res.origrc, RowColIndex("Hello World"))
+        self.assertEqual(res.origrc[10], (1, 11))
+
+    def test_preprocess_concurrent(self):
+        # testing that one config can be shared by concurrent callers
+        texts = [f"Line {i}\n#   İtem — “{i}” per cent\n" * (i + 1)
+                 for i in range(40)]
+        want = [preprocess(t, self.cfg) for t in texts]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            got = list(pool.map(lambda t: preprocess(t, self.cfg), texts))
+
+        for w, g in zip(want, got):
+            self.assertEqual(g.proc, w.proc)
+            self.assertEqual(g.procmap, w.procmap)
+
+class StreamingTextPreprocessorTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.cfg = TextPreprocessorConfig()
+        self.tp = TextPreprocessor(self.cfg)
+
+    def tearDown(self):
+        pass
+
+    # Helper to run text through the streaming preprocessor in chunks of
+    # the given size, and return the combined proc and procmap
+    def _streamAll(self, stp, t, chunkSize):
+        chunks = [t[i:i+chunkSize] for i in range(0, len(t), chunkSize)]
+        proc = ""
+        procmap = []
+        for segProc, segProcmap in stp.processStream(chunks):
+            proc += segProc
+            procmap += segProcmap
+        return proc, procmap
+
+    def test_stream_matches_full_process(self):
+        # testing that segmented output is identical to processing all at once
+        t = """# Copyright © 2025 Some Author
+#
+# Licensed under the Apache License, Version 2.0 ----- see below
+-----------------------------------------
+Redistribution  and use — in “source” & binary forms, per
+cent sub
+license, with or without modification, http://example.com
+İstanbul copyright
+owner whilst   fulfil
+""" * 20
+
+        self.tp.process(t)
+        for chunkSize in [1, 7, 64, 1000]:
+            stp = StreamingTextPreprocessor(self.cfg, segmentSize=16,
+                                            maxBuffer=4096)
+            proc, procmap = self._streamAll(stp, t, chunkSize)
+
+            # output should be unchanged by segmenting
+            self.assertEqual(proc, self.tp.proc)
+            self.assertEqual(procmap, self.tp.procmap)
+
+    def test_stream_does_not_split_equivalent_words(self):
+        # testing that a cut is not made inside a multi-word equivalent
+        t    = "ten per\ncent"
+        want = "ten percent"
+
+        stp = StreamingTextPreprocessor(self.cfg, segmentSize=1)
+        proc, procmap = self._streamAll(stp, t, 1)
+
+        # "per cent" should be converted as a whole
+        self.assertEqual(proc, want)
+
+        # including where a separator line between the words is removed
+        t    = "a sub\n@@@\nlicense"
+        want = "a sublicense"
+
+        stp = StreamingTextPreprocessor(self.cfg, segmentSize=1)
+        proc, procmap = self._streamAll(stp, t, 1)
+
+        self.assertEqual(proc, want)
+
+    def test_stream_bounded_buffer(self):
+        # testing that buffered text is cut off once maxBuffer is reached,
+        # even with no safe cut point available
+        t = "a-" * 25 + " " + "-a" * 25
+
+        stp = StreamingTextPreprocessor(self.cfg, segmentSize=8, maxBuffer=64)
+        results = stp.feed(t)
+
+        # should have forced a cut after the whitespace
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], "a-" * 25 + " ")
+        self.assertEqual(len(stp.pending), 50)
+
+        # remaining text should be emitted at the end, mapped to orig indices
+        results = stp.finish()
+        self.assertEqual(results[0][0], "-a" * 25)
+        self.assertEqual(results[0][1][0], 51)
+
+class IncrementalTextPreprocessorTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.cfg = TextPreprocessorConfig()
+
+    def tearDown(self):
+        pass
+
+    def test_incremental_matches_full_process(self):
+        # testing that a series of edits gives the same results as
+        # processing the whole text each time
+        lines = [f"Line {i}: Permission is hereby granted, per cent.\n"
+                 for i in range(40)]
+        t = "".join(lines)
+        itp = IncrementalTextPreprocessor(self.cfg, contextLines=1)
+        itp.update(t)
+
+        edits = [
+            (lambda t: t.replace("Line 20:", "Line 20: // Copyright © 2025")),
+            (lambda t: t.replace("Line 5: Permission", "Line 5:\n\n  PERMISSION")),
+            (lambda t: t.replace("per cent.\nLine 31", "per\n")),
+            (lambda t: t[:-10]),
+            (lambda t: "# " + t),
+        ]
+        for edit in edits:
+            t = edit(t)
+            procStart, oldProcEnd, newProcEnd = itp.update(t)
+            res = preprocess(t, self.cfg)
+            self.assertEqual(itp.proc, res.proc)
+            self.assertEqual(list(itp.procmap.spans()), list(res.procmap.spans()))
+            self.assertEqual(itp.origrc, res.origrc)
+
+    def test_incremental_reprocesses_changed_part(self):
+        # testing that only the edited lines and context are reprocessed
+        t = "".join(f"line {i} of text\n" for i in range(100))
+        itp = IncrementalTextPreprocessor(self.cfg, contextLines=1)
+        itp.update(t)
+        procBefore = itp.proc
+
+        procStart, oldProcEnd, newProcEnd = itp.update(
+            t.replace("line 50 of", "line 50 and more of"))
+
+        self.assertGreater(procStart, 0)
+        self.assertLess(oldProcEnd, len(procBefore))
+        self.assertLess(newProcEnd - procStart, 100)
+        self.assertEqual(itp.proc[procStart:newProcEnd],
+                         "line 49 of text line 50 and more of text line 51 of text ")
+
+class AltRegexTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.cfg = TextPreprocessorConfig()
+
+    def test_rewrite_alt_regex(self):
+        # testing that rewritten regexes match the preprocessed form of
+        # text that the original regexes match
+        cases = [
+            ("(The )?Regents of the  University", "THE Regents of the  university"),
+            ("[A-Z]+ ?— ?Foo", "BAR —FOO"),
+            ("[\"“]?Software[\"”]?", "“Software”"),
+            ("Copyright © \\d{4}", "Copyright © 2025"),
+            ("http://example\\.com/?", "http://example.com"),
+            ("x +-{1,2} *y", "x  -- y"),
+            ("Non-Commercial", "non-commercial"),
+            ("\\S{0,7}", "1."),
+        ]
+        for regex, orig in cases:
+            self.assertIsNotNone(re.fullmatch(regex, orig, re.IGNORECASE), regex)
+            rewritten = rewriteAltRegex(regex, self.cfg)
+            proc = preprocess(orig, self.cfg).proc
+            self.assertIsNotNone(re.fullmatch(rewritten, proc), rewritten)
+
+        self.assertEqual(rewriteAltRegex("(?P<Year>\\d{4}) [Ww]ords?", self.cfg),
+                         r"(?P<Year>\d{4})\s+[ww]ords?")
+        self.assertEqual(rewriteAltRegex("“A”  B-+C", self.cfg), r"'a'\s+b-c")
+
+    def test_rewrite_alt_regex_equivalents(self):
+        # testing that equivalent words are only converted in literal text,
+        # and that the copyright symbol is converted in sets and escapes
+        cases = [
+            ("(?P<licence>Licence)", ["Licence"]),
+            ("Sub-Licence", ["sub-licence"]),
+            ("50 per cent", ["50 per cent"]),
+            ("[©] 2025", ["© 2025"]),
+            ("[C©]+ 2025", ["C 2025", "©© 2025"]),
+            ("\\xA9 2025", ["© 2025"]),
+            ("\\u00a9 2025", ["© 2025"]),
+            ("\\N{COPYRIGHT SIGN} 2025", ["© 2025"]),
+            ("\\x41 \\x26 B", ["A & B"]),
+        ]
+        for regex, origs in cases:
+            rewritten = rewriteAltRegex(regex, self.cfg)
+            for orig in origs:
+                self.assertIsNotNone(re.fullmatch(regex, orig, re.IGNORECASE), regex)
+                proc = preprocess(orig, self.cfg).proc
+                self.assertIsNotNone(re.fullmatch(rewritten, proc), rewritten)
+
+        # group names are left unchanged
+        pattern = compileAltRegex("(?P<licence>licence)", self.cfg)
+        self.assertEqual(pattern.groupindex, {"licence": 1})
+        self.assertEqual(pattern.fullmatch("license").group("licence"), "license")
+
+    def test_rewrite_alt_regex_cached(self):
+        # testing that rewritten and compiled regexes are cached, and that
+        # invalid regexes are left case-insensitive rather than rewritten
+        pattern = compileAltRegex("(License|Licence)", self.cfg)
+        self.assertIs(compileAltRegex("(License|Licence)", self.cfg), pattern)
+        self.assertEqual(pattern.pattern, "(license|(?:licence|license))")
+        self.assertEqual(rewriteAltRegex("(unclosed", self.cfg), "(?i:(unclosed)")
+        with self.assertRaises(re.error):
+            compileAltRegex("(unclosed", self.cfg)
+
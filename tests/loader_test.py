@@ -0,0 +1,126 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import os
+import tempfile
+import unittest
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+if lxml is not None:
+    from loader import LicenseLoader
+    from watcher import LicenseDirWatcher, updateLoadErrors
+    from parsexml import XMLParserConfig, XMLParser
+    from datatypes import License
+
+GOOD_XML = ('<SPDXLicenseCollection xmlns="http://www.spdx.org/license">'
+            '<license licenseId="Good" name="Good"><text><p>Some text.</p>'
+            '</text></license></SPDXLicenseCollection>')
+
+BAD_TAG_XML = GOOD_XML.replace("Good", "Bad").replace("<p>", "<px>") \
+        .replace("</p>", "</px>")
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class LicenseLoaderTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for name, xml in [("Bad.xml", BAD_TAG_XML), ("Good.xml", GOOD_XML)]:
+            with open(os.path.join(self.tmpdir.name, name), "w") as f:
+                f.write(xml)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_invalid_tag_does_not_stop_loading(self):
+        # testing that a file with an invalid tag is reported, and the
+        # other files are still loaded and the loader finishes
+        parser = XMLParser(XMLParserConfig())
+        loader = LicenseLoader(parser, self.tmpdir.name)
+        loader.run()
+
+        items = []
+        while not loader.progress.empty():
+            items.append(loader.progress.get_nowait())
+        done, total, lics, errors, finished = items[-1]
+        self.assertTrue(finished)
+        self.assertEqual((done, total), (2, 2))
+        self.assertEqual(list(lics.keys()), ["Good"])
+        self.assertEqual(len(lics["Good"].textFlat), 1)
+        badPath = os.path.join(self.tmpdir.name, "Bad.xml")
+        self.assertIn("Invalid tag", errors[badPath])
+        self.assertNotIn(badPath, parser.fileState)
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class LicenseDirWatcherTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.goodPath = os.path.join(self.tmpdir.name, "Good.xml")
+        with open(self.goodPath, "w") as f:
+            f.write(GOOD_XML)
+        self.parser = XMLParser(XMLParserConfig())
+        self.parser.loadAll(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_invalid_tag_is_reported(self):
+        # testing that an edit leaving an invalid tag is reported, and that
+        # a later fix is still picked up
+        watcher = LicenseDirWatcher(self.parser, self.tmpdir.name)
+        with open(self.goodPath, "w") as f:
+            f.write(GOOD_XML.replace("<p>", "<px>").replace("</p>", "</px>"))
+        watcher.poll()
+        changed, removed, errors = watcher.changes.get_nowait()
+        self.assertEqual((changed, removed), ({}, []))
+        self.assertIn("Invalid tag", errors[self.goodPath])
+
+        with open(self.goodPath, "w") as f:
+            f.write(GOOD_XML + " ")
+        watcher.poll()
+        changed, removed, errors = watcher.changes.get_nowait()
+        self.assertEqual(list(changed.keys()), ["Good"])
+        self.assertEqual(errors, {})
+
+    def test_errors_clear_after_fix(self):
+        # testing that errors for a file, or for the whole directory, are
+        # dropped once a later poll no longer has them
+        watcher = LicenseDirWatcher(self.parser, self.tmpdir.name)
+        badPath = os.path.join(self.tmpdir.name, "Bad.xml")
+        with open(badPath, "w") as f:
+            f.write(BAD_TAG_XML)
+        loadErrors = {self.tmpdir.name: "could not list directory"}
+        watcher.poll()
+        updateLoadErrors(loadErrors, self.tmpdir.name,
+                         *watcher.changes.get_nowait()[::2])
+        self.assertEqual(list(loadErrors.keys()), [badPath])
+
+        # the same error again is not queued again
+        watcher.poll()
+        self.assertTrue(watcher.changes.empty())
+
+        with open(badPath, "w") as f:
+            f.write(GOOD_XML.replace("Good", "Bad"))
+        watcher.poll()
+        changed, _, errors = watcher.changes.get_nowait()
+        updateLoadErrors(loadErrors, self.tmpdir.name, changed, errors)
+        self.assertEqual(list(changed.keys()), ["Bad"])
+        self.assertEqual(loadErrors, {})
+
+    def test_flatten_errors_by_path(self):
+        # testing that flatten errors are keyed by file path, like load
+        # errors, so that they can be cleared when the file reloads
+        lic = License()
+        lic.id = "Broken"
+        lic.xmlPath = self.goodPath
+        errors = self.parser.flattenEach({"Broken": lic})
+        self.assertEqual(list(errors.keys()), [self.goodPath])
+
+        loadErrors = dict(errors)
+        updateLoadErrors(loadErrors, self.tmpdir.name, {}, {})
+        self.assertEqual(list(loadErrors.keys()), [self.goodPath])
+        updateLoadErrors(loadErrors, self.tmpdir.name,
+                         {"Good": self.parser.load(self.goodPath)}, {})
+        self.assertEqual(loadErrors, {})
@@ -0,0 +1,201 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import gc
+import os
+import tempfile
+import unittest
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+if lxml is not None:
+    from parsexml import XMLParserConfig, XMLParser
+
+def makeXML(licId, tag="p"):
+    return ('<SPDXLicenseCollection xmlns="http://www.spdx.org/license">'
+            f'<license licenseId="{licId}" name="{licId}"><text>'
+            f'<{tag}>Some text.</{tag}></text></license></SPDXLicenseCollection>')
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class ReloadAllTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.parser = XMLParser(XMLParserConfig())
+        for licId in ["A", "B", "C"]:
+            self.write(licId, makeXML(licId))
+        self.parser.loadAll(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, licId, xml):
+        path = os.path.join(self.tmpdir.name, f"{licId}.xml")
+        with open(path, "w") as f:
+            f.write(xml)
+        return path
+
+    def test_reload_continues_past_invalid_file(self):
+        # testing that a file with an invalid tag is reported and retried,
+        # and that changes to other files are still returned
+        self.write("A", makeXML("A2"))
+        badPath = self.write("B", makeXML("B", tag="px"))
+        self.write("C", makeXML("C") + " ")
+
+        changed, removed = self.parser.reloadAll(self.tmpdir.name)
+        self.assertEqual(sorted(changed.keys()), ["A2", "C"])
+        self.assertEqual(removed, ["A"])
+        self.assertIn("Invalid tag", self.parser.reloadErrors[badPath])
+        self.assertEqual(self.parser.fileState[badPath][3], "B")
+
+        # still failing, so reported again; then fixed
+        changed, removed = self.parser.reloadAll(self.tmpdir.name)
+        self.assertEqual((changed, removed), ({}, []))
+        self.assertIn(badPath, self.parser.reloadErrors)
+        self.write("B", makeXML("B") + "  ")
+        changed, removed = self.parser.reloadAll(self.tmpdir.name)
+        self.assertEqual(list(changed.keys()), ["B"])
+        self.assertEqual(self.parser.reloadErrors, {})
+
+def makeClausesXML(licId, leadingLines=0, clause="Common clause."):
+    return ('<SPDXLicenseCollection xmlns="http://www.spdx.org/license">\n'
+            f'<license licenseId="{licId}" name="{licId}">\n' +
+            '<!-- comment -->\n' * leadingLines +
+            '<text>\n<p>Some text.</p>\n'
+            f'<optional><p>{clause}</p></optional>\n'
+            f'<alt name="x" match="\\d+">1</alt>\n'
+            '</text></license></SPDXLicenseCollection>\n')
+
+# Helper to convert flats into nested tuples, for comparing them
+def flatTuples(flats):
+    return [(lf.type, lf.lineno, lf.text, lf.regex, flatTuples(lf.children))
+            for lf in flats]
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class ShareFlatsTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for licId, leadingLines in [("A", 0), ("B", 0), ("C", 2)]:
+            self.write(licId, makeClausesXML(licId, leadingLines))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, licId, xml):
+        path = os.path.join(self.tmpdir.name, f"{licId}.xml")
+        with open(path, "w") as f:
+            f.write(xml)
+        return path
+
+    def loadFlattened(self, internText, shareFlats):
+        cfg = XMLParserConfig()
+        cfg.internText = internText
+        cfg.shareFlats = shareFlats
+        parser = XMLParser(cfg)
+        lics = parser.loadAll(self.tmpdir.name)
+        self.assertEqual(parser.flattenEach(lics), {})
+        return parser, lics
+
+    def test_same_flats_as_unshared(self):
+        # testing that interning and sharing do not change the flattened
+        # licenses, including line numbers, but do share identical flats
+        _, want = self.loadFlattened(False, False)
+        for internText, shareFlats in [(True, False), (False, True), (True, True)]:
+            _, lics = self.loadFlattened(internText, shareFlats)
+            for licId in ["A", "B", "C"]:
+                self.assertEqual(flatTuples(lics[licId].textFlat),
+                                 flatTuples(want[licId].textFlat),
+                                 (licId, internText, shareFlats))
+
+        self.assertIsNot(want["A"].textFlat[1], want["B"].textFlat[1])
+        self.assertIs(lics["A"].textFlat[1], lics["B"].textFlat[1])
+        self.assertIsNot(lics["A"].textFlat[1], lics["C"].textFlat[1])
+        self.assertEqual(lics["C"].textFlat[1].lineno,
+                         lics["A"].textFlat[1].lineno + 2)
+
+    def test_reload_prunes_shared_flats(self):
+        # testing that flats only used by a reloaded license's previous
+        # version are no longer kept for sharing
+        parser, lics = self.loadFlattened(True, True)
+        self.write("A", makeClausesXML("A", clause="Changed clause."))
+        changed, removed = parser.reloadAll(self.tmpdir.name)
+        self.assertEqual((list(changed.keys()), removed), (["A"], []))
+        self.assertEqual(parser.flattenEach(changed), {})
+        lics.update(changed)
+        gc.collect()
+
+        texts = [lf.text for lf in parser.sharedFlats.values()]
+        self.assertIn("Changed clause.", texts)
+        self.assertIn("Common clause.", texts)
+        del lics["B"], lics["C"]
+        gc.collect()
+        texts = [lf.text for lf in parser.sharedFlats.values()]
+        self.assertNotIn("Common clause.", texts)
+
+FULL_XML = """<SPDXLicenseCollection xmlns="http://www.spdx.org/license">
+<license isOsiApproved="true" licenseId="Full" listVersionAdded="3.0"
+    deprecatedVersion="3.1" name="Full License">
+<crossRefs>
+<crossRef>https://example.com/a</crossRef>
+<crossRef>https://example.com/b</crossRef>
+</crossRefs>
+<notes>Some notes.</notes>
+<text>
+<titleText><p>Full License</p></titleText>
+<p>Permission is <alt name="x" match="granted|given">granted</alt>.</p>
+<optional><p>Optional text.</p></optional>
+</text>Tail text.
+<standardLicenseHeader><p>Header.</p></standardLicenseHeader>
+</license>
+</SPDXLicenseCollection>
+"""
+
+# Helper to convert a LicenseNode tree into nested tuples, for comparing
+def nodeTuples(node):
+    if node is None:
+        return None
+    return (node.type, node.lineno, node.text, node.regex, node.matchName,
+            node.spacing, [nodeTuples(c) for c in node.children])
+
+# Helper to get a License's parsed fields as a tuple, for comparing
+def licenseTuple(lic):
+    return (lic.id, lic.name, lic.osi, lic.versionAdded,
+            lic.versionDeprecated, lic.crossRefs, lic.notes,
+            nodeTuples(lic.textNode))
+
+@unittest.skipIf(lxml is None, "lxml is not installed")
+class IterparseTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def load(self, xml, useIterparse, metadataOnly=False):
+        path = os.path.join(self.tmpdir.name, "Full.xml")
+        with open(path, "w") as f:
+            f.write(xml)
+        cfg = XMLParserConfig()
+        cfg.useIterparse = useIterparse
+        cfg.metadataOnly = metadataOnly
+        return XMLParser(cfg).load(path)
+
+    def test_same_as_parse(self):
+        # testing that iterparse gives the same License as parsing the
+        # whole tree, with metadata before or after the <text> element
+        notesAfter = FULL_XML.replace("<notes>Some notes.</notes>\n", "") \
+                .replace("</license>", "<notes>Some notes.</notes>\n</license>")
+        for xml in [FULL_XML, notesAfter]:
+            want = licenseTuple(self.load(xml, False))
+            self.assertEqual(want[6], "Some notes.")
+            self.assertEqual(licenseTuple(self.load(xml, True)), want)
+
+    def test_metadata_only(self):
+        # testing that metadataOnly gives the same metadata as parsing the
+        # whole tree, without the <text> content
+        want = licenseTuple(self.load(FULL_XML, False))
+        got = licenseTuple(self.load(FULL_XML, True, metadataOnly=True))
+        self.assertEqual(got[:-1], want[:-1])
+        self.assertIsNone(got[-1])
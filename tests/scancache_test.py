@@ -0,0 +1,62 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import os
+import tempfile
+import unittest
+
+from scancache import makeScanKey, ScanCache, PersistentScanCache
+
+class ScanCacheTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dbpath = os.path.join(self.tmpdir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_fingerprint(self):
+        # testing that keys differ for different content or configuration
+        k = makeScanKey(b"MIT License", b"cfg1")
+
+        self.assertEqual(k, makeScanKey(b"MIT License", b"cfg1"))
+        self.assertNotEqual(k, makeScanKey(b"MIT License", b"cfg2"))
+        self.assertNotEqual(k, makeScanKey(b"MIT License.", b"cfg1"))
+
+    def test_memory_lru(self):
+        # testing that the least recently used entry is dropped
+        cache = ScanCache(maxEntries=2)
+        cache.put(b"a", [1])
+        cache.put(b"b", [2])
+        cache.get(b"a")
+        cache.put(b"c", [])
+
+        self.assertEqual(cache.get(b"a"), [1])
+        self.assertIsNone(cache.get(b"b"))
+        self.assertEqual(cache.get(b"c"), [])
+
+    def test_persistent_between_runs(self):
+        # testing that results are kept in the file after closing
+        cache = PersistentScanCache(self.dbpath)
+        cache.put(b"a", [{"licenseId": "MIT"}])
+        cache.close()
+
+        cache = PersistentScanCache(self.dbpath)
+        self.assertEqual(cache.get(b"a"), [{"licenseId": "MIT"}])
+        self.assertIsNone(cache.get(b"b"))
+        cache.close()
+
+    def test_persistent_eviction(self):
+        # testing that the least recently used entries are evicted once
+        # stored values exceed the maximum size
+        cache = PersistentScanCache(self.dbpath, maxBytes=20)
+        cache.put(b"a", ["x" * 5])
+        cache.put(b"b", ["y" * 5])
+        cache.get(b"a")
+        cache.put(b"c", ["z" * 5])
+
+        self.assertLessEqual(cache.totalBytes, 20)
+        self.assertIsNone(cache.get(b"b"))
+        self.assertEqual(cache.get(b"a"), ["x" * 5])
+        self.assertEqual(cache.get(b"c"), ["z" * 5])
+        cache.close()
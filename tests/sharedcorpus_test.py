@@ -0,0 +1,83 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from datatypes import License, FlatType
+from lltokenize import TextPreprocessorConfig
+from sharedcorpus import packCorpus, PackedCorpus, createSharedCorpus, \
+        attachSharedCorpus, initCorpusWorker, corpusWorkerMatch
+
+from helpers import makeFlat, makeTestLicense
+
+# Helper to convert flats into comparable tuples
+def flatsToTuples(fts):
+    return [(ft.type, ft.lineno, ft.text, ft.regex, flatsToTuples(ft.children))
+            for ft in fts]
+
+class SharedCorpusTestSuite(unittest.TestCase):
+    def setUp(self):
+        self.tpcfg = TextPreprocessorConfig()
+
+        lic1 = makeTestLicense(regexText="Copyright <year> <holder>",
+                               text="Permission is granted, per cent.",
+                               withVersion=True)
+        lic2 = License()
+        lic2.id = "Other"
+        lic2.textFlat = [
+            makeFlat(FlatType.TEXT, 2, text="Permission is not granted."),
+        ]
+        self.lics = {"Test-1.0": lic1, "Other": lic2}
+
+    def tearDown(self):
+        pass
+
+    def test_pack_roundtrip(self):
+        # testing that flats can be reconstructed from packed corpus
+        corpus = PackedCorpus(packCorpus(self.lics, self.tpcfg))
+
+        self.assertEqual(sorted(corpus.licenseIds()), ["Other", "Test-1.0"])
+        for licId, lic in self.lics.items():
+            self.assertEqual(flatsToTuples(corpus.getFlats(licId)),
+                             flatsToTuples(lic.textFlat))
+
+        # a regex part's default text should be kept too, e.g. for
+        # ExactMatchIndex
+        self.assertEqual(corpus.getFlats("Test-1.0")[2].text,
+                         "Copyright <year> <holder>")
+
+    def test_pack_tokens(self):
+        # testing tokens and shared vocabulary for preprocessed flat text
+        corpus = PackedCorpus(packCorpus(self.lics, self.tpcfg))
+
+        words = [corpus.getWord(t) for t in corpus.getTokens("Test-1.0")]
+        self.assertEqual(words, ["the", "test", "license", "version", "1.0",
+                                 "permission", "is", "granted,", "percent."])
+
+        # tokens should refer back to the flat record they came from
+        self.assertEqual(list(corpus.getTokenFlats("Test-1.0")),
+                         [1, 1, 1, 3, 3, 7, 7, 7, 7])
+
+        # "permission" should have the same vocabulary index in both
+        self.assertEqual(corpus.getTokens("Other")[0],
+                         corpus.getTokens("Test-1.0")[5])
+
+    def test_shared_memory_workers(self):
+        # testing matching in worker processes attached to shared memory
+        shm = createSharedCorpus(self.lics, self.tpcfg)
+        try:
+            attached, corpus = attachSharedCorpus(shm.name)
+            self.assertEqual(len(corpus.getFlats("Test-1.0")), 5)
+            corpus.release()
+            attached.close()
+
+            t = "The Test License\nCopyright 2025 Me\nPermission is granted, percent."
+            with ProcessPoolExecutor(max_workers=2, initializer=initCorpusWorker,
+                                     initargs=(shm.name,)) as pool:
+                results = pool.submit(corpusWorkerMatch, t).result()
+            self.assertEqual([mr.licenseId for mr in results], ["Test-1.0"])
+            self.assertEqual(results[0].endRC, (3, 31))
+        finally:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,160 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import unittest
+
+from textmap import ProcMap, RowColIndex
+
+class ProcMapTestSuite(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_identity_single_segment(self):
+        # testing that an unchanged mapping is stored as one segment
+        pm = ProcMap(1000)
+
+        self.assertEqual(len(pm), 1000)
+        self.assertEqual(len(pm.steps), 1)
+        self.assertEqual(pm[0], 0)
+        self.assertEqual(pm[999], 999)
+        self.assertEqual(pm[-1], 999)
+        self.assertEqual(pm.span(500), (500, 501))
+        with self.assertRaises(IndexError):
+            pm.span(1000)
+
+    def test_replace_shorter_extends_span(self):
+        # testing that removed characters are covered by the last kept one,
+        # e.g. "aaa      bbb" => "aaa bbb"
+        pm = ProcMap(12)
+        pm.replace(3, 6, 1)
+
+        self.assertEqual(pm, [0, 1, 2, 3, 9, 10, 11])
+        self.assertEqual(pm.span(3), (3, 9))
+        self.assertEqual(pm.span(4), (9, 10))
+        self.assertEqual(len(pm.steps), 3)
+
+    def test_replace_longer_repeats_span(self):
+        # testing that added characters repeat the span of the last
+        # replaced one, e.g. "a © b" => "a (c) b"
+        pm = ProcMap(5)
+        pm.replace(2, 1, 3)
+
+        self.assertEqual(pm, [0, 1, 2, 2, 2, 3, 4])
+        self.assertEqual(pm.span(3), (2, 3))
+        self.assertEqual(pm.span(4), (2, 3))
+
+    def test_apply_edits_matches_separate_replacements(self):
+        # testing that several edits at once give the same results as
+        # making each replacement in turn, from the end backwards
+        edits = [(1, 3, 1), (6, 1, 3), (9, 2, 2), (12, 4, 0)]
+
+        pm1 = ProcMap(20).applyEdits(edits)
+        pm2 = ProcMap(20)
+        for startIdx, numReplace, newLen in reversed(edits):
+            pm2.replace(startIdx, numReplace, newLen)
+
+        self.assertEqual(pm1, pm2)
+        self.assertEqual(len(pm1), 20 - 2 + 2 - 4)
+
+    def test_extend_from_with_offset(self):
+        # testing copying part of a mapping, shifted to new orig indices
+        pm = ProcMap(10)
+        pm.replace(2, 3, 1)
+        pm2 = ProcMap()
+        pm2.extendFrom(pm, 1, 4, origOffset=100)
+
+        self.assertEqual(list(pm2.spans()), [(101, 102), (102, 105), (105, 106)])
+
+    def test_proc_index(self):
+        # testing finding the first proc character at or after an orig index
+        pm = ProcMap(10)
+        pm.replace(2, 3, 1)
+        pm.replace(4, 1, 3)
+
+        # proc chars map to orig starts [0, 1, 2, 5, 6, 6, 6, 7, 8, 9]
+        self.assertEqual(pm.procIndex(0), 0)
+        self.assertEqual(pm.procIndex(2), 2)
+        self.assertEqual(pm.procIndex(3), 3)
+        self.assertEqual(pm.procIndex(6), 4)
+        self.assertEqual(pm.procIndex(7), 7)
+        self.assertEqual(pm.procIndex(10), 10)
+
+    def test_frozen(self):
+        # testing that a frozen mapping still gives the same lookups, and
+        # that every way of changing it raises an error
+        pm = ProcMap(5)
+        pm.replace(1, 3, 1)
+        want = list(pm.spans())
+        pm.freeze()
+
+        self.assertEqual(list(pm.spans()), want)
+        self.assertEqual(pm.procIndex(4), 2)
+        self.assertEqual(pm.applyEdits([(0, 1, 2)]).span(1), (0, 1))
+        for change in [lambda: pm.append(5, 6, 1, 1),
+                       lambda: pm.extendFrom(ProcMap(1)),
+                       lambda: pm.replace(0, 1, 2),
+                       lambda: setattr(pm, "length", 0),
+                       lambda: setattr(pm, "frozen", False)]:
+            with self.assertRaises(RuntimeError):
+                change()
+        with self.assertRaises(TypeError):
+            pm.procStarts[0] = 1
+        with self.assertRaises(AttributeError):
+            pm.steps.append(1)
+        self.assertEqual(list(pm.spans()), want)
+
+class RowColIndexTestSuite(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_lookup_matches_per_char_walk(self):
+        # testing that lookups match walking through each character
+        t = "ab\n\ncdé\nf\n"
+        expected = []
+        r, c = 1, 0
+        for ch in t:
+            c += 1
+            expected.append((r, c))
+            if ch == "\n":
+                r, c = r + 1, 0
+        rc = RowColIndex(t)
+
+        self.assertEqual(len(rc), len(t))
+        self.assertEqual([rc[i] for i in range(len(t))], expected)
+        self.assertEqual(list(rc), expected)
+        self.assertEqual(rc, expected)
+        self.assertEqual(rc[-1], (4, 2))
+        self.assertEqual(rc[2:5], expected[2:5])
+        with self.assertRaises(IndexError):
+            rc[len(t)]
+
+    def test_empty(self):
+        # testing an index for an empty string
+        rc = RowColIndex("")
+
+        self.assertEqual(len(rc), 0)
+        self.assertEqual(rc, [])
+        self.assertEqual(rc, RowColIndex())
+
+    def test_frozen(self):
+        # testing that a frozen index still gives the same lookups, and
+        # cannot be changed
+        t = "ab\ncd"
+        rc = RowColIndex(t)
+        rc.freeze()
+
+        self.assertEqual(rc, RowColIndex(t))
+        self.assertEqual(rc[3], (2, 1))
+        with self.assertRaises(RuntimeError):
+            rc.length = 0
+        with self.assertRaises(TypeError):
+            rc.rowStarts[1] = 2
+        with self.assertRaises(AttributeError):
+            rc.rowStarts.append(5)
+        self.assertEqual(list(rc), [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2)])
@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import unittest
+
+from xmlview import XMLLineState, highlightLine, XMLHighlighter
+
+class XMLHighlightTestSuite(unittest.TestCase):
+    def test_highlight_line(self):
+        # testing that tags, attributes, entities and comments are found
+        line = '<p class="x">A &amp; B<!-- note --></p>'
+        spans, state = highlightLine(line, XMLLineState.TEXT)
+        self.assertEqual([(tag, line[start:end]) for tag, start, end in spans], [
+            ("xmlTag", "<p"),
+            ("xmlAttrName", "class"),
+            ("xmlAttrValue", '"x"'),
+            ("xmlTag", ">"),
+            ("xmlEntity", "&amp;"),
+            ("xmlComment", "<!-- note -->"),
+            ("xmlTag", "</p"),
+            ("xmlTag", ">"),
+        ])
+        self.assertEqual(state, XMLLineState.TEXT)
+
+    def test_state_across_lines(self):
+        # testing that tags and comments continuing onto later lines are
+        # highlighted from the state at the end of the earlier lines
+        lines = [
+            '<license isOsiApproved="true"',
+            '    name="MIT">text <!-- a',
+            'comment --> more',
+            'text',
+        ]
+        hl = XMLHighlighter(lines)
+        spans = hl.spansForLine(2)
+        self.assertEqual([(tag, lines[2][start:end]) for tag, start, end in spans],
+                         [("xmlComment", "comment -->")])
+        self.assertEqual(hl.lineStates, [XMLLineState.TEXT, XMLLineState.TAG,
+                                         XMLLineState.COMMENT])
+        spans = hl.spansForLine(1)
+        self.assertEqual([(tag, lines[1][start:end]) for tag, start, end in spans], [
+            ("xmlAttrName", "name"),
+            ("xmlAttrValue", '"MIT"'),
+            ("xmlTag", ">"),
+            ("xmlComment", "<!-- a"),
+        ])
+        self.assertEqual(hl.spansForLine(3), [])
@@ -0,0 +1,339 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Represents the mapping from each character in a processed string to the
+# span of characters (origStart, origEnd) in the original string that it
+# came from. See docs/notes.md for details.
+#
+# The mapping is stored as run-length segments, so that memory use depends
+# on the number of edits made to the string rather than on its length.
+# Each segment is either:
+#   - a "step" segment: the n'th character in the segment corresponds to
+#     the single original character (origStart + n, origStart + n + 1); or
+#   - a "fixed" segment: every character in the segment corresponds to the
+#     same original span (origStart, origEnd), e.g. for "(c)" replacing "©"
+#     or for a single space replacing a run of whitespace.
+class ProcMap:
+    # given: length: if > 0, create a 1:1 mapping for this many characters
+    def __init__(self, length=0):
+        super(ProcMap, self).__init__()
+
+        # index in processed string of first character in each segment
+        self.procStarts = array("q")
+
+        # original span for each segment; for step segments, this is the
+        # span for the segment as a whole
+        self.origStarts = array("q")
+        self.origEnds = array("q")
+
+        # 1 for step segments, 0 for fixed segments
+        self.steps = array("b")
+
+        # total number of characters in processed string
+        self.length = 0
+
+        # once frozen, the mapping can no longer be changed; see freeze()
+        self.frozen = False
+
+        if length > 0:
+            self.append(0, length, length, 1)
+
+    ##### LOOKUPS #####
+
+    def __len__(self):
+        return self.length
+
+    # Returns the original start index for a processed character, for
+    # compatibility with the earlier list-of-indices procmap.
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.span(i)[0] for i in range(*idx.indices(self.length))]
+        return self.span(idx)[0]
+
+    def __iter__(self):
+        for origStart, _ in self.spans():
+            yield origStart
+
+    def __eq__(self, other):
+        if isinstance(other, ProcMap):
+            return list(self.spans()) == list(other.spans())
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ProcMap({list(self.spans())})"
+
+    # Returns the original span for a processed character.
+    # given:   idx: index of character in processed string
+    # returns: (origStart, origEnd) tuple
+    def span(self, idx):
+        if idx < 0:
+            idx += self.length
+        if idx < 0 or idx >= self.length:
+            raise IndexError("procmap index out of range")
+        seg = bisect_right(self.procStarts, idx) - 1
+        if self.steps[seg] == 1:
+            origStart = self.origStarts[seg] + idx - self.procStarts[seg]
+            return (origStart, origStart + 1)
+        return (self.origStarts[seg], self.origEnds[seg])
+
+    # Returns the original span covered by a range of processed characters.
+    # given:   startIdx: index of first character in processed string
+    #          endIdx: index after last character in processed string
+    # returns: (origStart, origEnd) tuple
+    def spanRange(self, startIdx, endIdx):
+        return (self.span(startIdx)[0], self.span(endIdx - 1)[1])
+
+    # Returns the index of the first processed character whose original
+    # span starts at or after origIdx (or the processed length, if none).
+    def procIndex(self, origIdx):
+        seg = bisect_left(self.origStarts, origIdx)
+        # check for a step segment that includes origIdx partway through
+        if (seg > 0 and self.steps[seg - 1] == 1 and
+            origIdx < self.origEnds[seg - 1]):
+            return self.procStarts[seg - 1] + origIdx - self.origStarts[seg - 1]
+        if seg < len(self.procStarts):
+            return self.procStarts[seg]
+        return self.length
+
+    # Generator for the original span of each processed character.
+    def spans(self):
+        for seg in range(len(self.steps)):
+            count = self._segmentEnd(seg) - self.procStarts[seg]
+            if self.steps[seg] == 1:
+                origStart = self.origStarts[seg]
+                for i in range(origStart, origStart + count):
+                    yield (i, i + 1)
+            else:
+                s = (self.origStarts[seg], self.origEnds[seg])
+                for _ in range(count):
+                    yield s
+
+    ##### BUILDING AND EDITING #####
+
+    # Prevents any further changes to this mapping, so that it can be
+    # shared safely, e.g. between threads. Its arrays become read-only
+    # views, and its attributes can no longer be set.
+    def freeze(self):
+        if self.frozen:
+            return
+        self.procStarts = memoryview(self.procStarts).toreadonly()
+        self.origStarts = memoryview(self.origStarts).toreadonly()
+        self.origEnds = memoryview(self.origEnds).toreadonly()
+        self.steps = memoryview(self.steps).toreadonly()
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "frozen", False):
+            raise RuntimeError("cannot change a frozen ProcMap")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if self.frozen:
+            raise RuntimeError("cannot change a frozen ProcMap")
+        super().__delattr__(name)
+
+    # Adds characters to the end of the mapping, merging with the last
+    # segment where possible.
+    # given:   origStart, origEnd: original span (for the whole segment,
+    #                              if step == 1)
+    #          count: number of processed characters to add
+    #          step: 1 for a step segment, 0 for a fixed segment
+    def append(self, origStart, origEnd, count, step):
+        if self.frozen:
+            raise RuntimeError("cannot change a frozen ProcMap")
+        if count <= 0:
+            return
+        if count == 1 and origEnd == origStart + 1:
+            step = 1
+
+        last = len(self.steps) - 1
+        if last >= 0:
+            if (step == 1 and self.steps[last] == 1 and
+                self.origEnds[last] == origStart):
+                self.origEnds[last] = origEnd
+                self.length += count
+                return
+            if (step == 0 and self.steps[last] == 0 and
+                self.origStarts[last] == origStart and
+                self.origEnds[last] == origEnd):
+                self.length += count
+                return
+
+        self.procStarts.append(self.length)
+        self.origStarts.append(origStart)
+        self.origEnds.append(origEnd)
+        self.steps.append(step)
+        self.length += count
+
+    # Adds the mappings for a range of another ProcMap's characters to
+    # the end of this one.
+    # given:   other: ProcMap to copy from
+    #          startIdx, endIdx: range of characters in other to copy
+    #          origOffset: amount to add to each original index
+    def extendFrom(self, other, startIdx=0, endIdx=None, origOffset=0):
+        if self.frozen:
+            raise RuntimeError("cannot change a frozen ProcMap")
+        if endIdx is None:
+            endIdx = other.length
+        if startIdx >= endIdx:
+            return
+        seg = bisect_right(other.procStarts, startIdx) - 1
+        while startIdx < endIdx:
+            stopIdx = min(endIdx, other._segmentEnd(seg))
+            count = stopIdx - startIdx
+            if other.steps[seg] == 1:
+                origStart = (other.origStarts[seg] + origOffset +
+                             startIdx - other.procStarts[seg])
+                self.append(origStart, origStart + count, count, 1)
+            else:
+                self.append(other.origStarts[seg] + origOffset,
+                            other.origEnds[seg] + origOffset, count, 0)
+            startIdx = stopIdx
+            seg += 1
+
+    # Creates a new ProcMap reflecting a series of replacements in the
+    # processed string. For each replacement, mappings are retained for
+    # as many characters as possible from the start of the replaced
+    # portion. If the new text is shorter, the last retained character's
+    # span is extended over the removed ones; if longer, the added
+    # characters repeat the span of the last replaced character.
+    # given:   edits: list of (startIdx, numReplace, newLen) tuples, sorted
+    #                 and non-overlapping, where startIdx and numReplace
+    #                 refer to the processed string _before_ any edits
+    # returns: new ProcMap
+    def applyEdits(self, edits):
+        pm = ProcMap()
+        prevIdx = 0
+        for startIdx, numReplace, newLen in edits:
+            pm.extendFrom(self, prevIdx, startIdx)
+            endIdx = startIdx + numReplace
+            if newLen < numReplace:
+                # shorter string => drop excess characters
+                if newLen > 0:
+                    lastIdx = startIdx + newLen - 1
+                    pm.extendFrom(self, startIdx, lastIdx)
+                    pm.append(self.span(lastIdx)[0], self.span(endIdx - 1)[1],
+                              1, 0)
+            else:
+                pm.extendFrom(self, startIdx, endIdx)
+                if newLen > numReplace:
+                    # longer string => add repeats of last extended value
+                    origStart, origEnd = (0, 0)
+                    if endIdx > 0:
+                        origStart, origEnd = self.span(endIdx - 1)
+                    pm.append(origStart, origEnd, newLen - numReplace, 0)
+            prevIdx = endIdx
+        pm.extendFrom(self, prevIdx, self.length)
+        return pm
+
+    # Replaces a portion of the processed string's mappings in place; see
+    # applyEdits() for how mappings are adjusted.
+    # given:   startIdx: index of first character to replace
+    #          numReplace: number of characters to replace
+    #          newLen: length of replacement text
+    def replace(self, startIdx, numReplace, newLen):
+        if self.frozen:
+            raise RuntimeError("cannot change a frozen ProcMap")
+        pm = self.applyEdits([(startIdx, numReplace, newLen)])
+        self.procStarts = pm.procStarts
+        self.origStarts = pm.origStarts
+        self.origEnds = pm.origEnds
+        self.steps = pm.steps
+        self.length = pm.length
+
+    ##### HELPER FUNCTIONS #####
+
+    # Helper function to get the processed index following a segment
+    def _segmentEnd(self, seg):
+        if seg + 1 < len(self.procStarts):
+            return self.procStarts[seg + 1]
+        return self.length
+
+# Represents the (row, col) position of each character in a string, both
+# numbered from 1, where a newline character is the last character of its
+# row. Only the positions where rows start are stored, and each lookup is
+# answered by bisecting them, so building the index only costs one pass
+# over the string's newlines rather than one step per character.
+class RowColIndex:
+    # given: text: string to index
+    def __init__(self, text=""):
+        super(RowColIndex, self).__init__()
+
+        # index in text of first character in each row
+        self.rowStarts = array("q", [0])
+
+        # total number of characters in text
+        self.length = len(text)
+
+        idx = text.find("\n")
+        while idx != -1:
+            self.rowStarts.append(idx + 1)
+            idx = text.find("\n", idx + 1)
+
+        # once frozen, the index can no longer be changed; see freeze()
+        self.frozen = False
+
+    # Prevents any further changes to this index, so that it can be
+    # shared safely, e.g. between threads. Its array becomes a read-only
+    # view, and its attributes can no longer be set.
+    def freeze(self):
+        if self.frozen:
+            return
+        self.rowStarts = memoryview(self.rowStarts).toreadonly()
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "frozen", False):
+            raise RuntimeError("cannot change a frozen RowColIndex")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if self.frozen:
+            raise RuntimeError("cannot change a frozen RowColIndex")
+        super().__delattr__(name)
+
+    def __len__(self):
+        return self.length
+
+    # Returns the (row, col) tuple for a character, as the earlier list of
+    # tuples did.
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(self.length))]
+        if idx < 0:
+            idx += self.length
+        if idx < 0 or idx >= self.length:
+            raise IndexError("origrc index out of range")
+        row = bisect_right(self.rowStarts, idx)
+        return (row, idx - self.rowStarts[row - 1] + 1)
+
+    def __iter__(self):
+        for row in range(1, len(self.rowStarts)):
+            rowStart = self.rowStarts[row - 1]
+            for idx in range(rowStart, self.rowStarts[row]):
+                yield (row, idx - rowStart + 1)
+        rowStart = self.rowStarts[-1]
+        for idx in range(rowStart, self.length):
+            yield (len(self.rowStarts), idx - rowStart + 1)
+
+    def __eq__(self, other):
+        if isinstance(other, RowColIndex):
+            return (self.length == other.length and
+                    self.rowStarts == other.rowStarts)
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"RowColIndex(length={self.length}, rows={len(self.rowStarts)})"
@@ -1,10 +1,21 @@
 # SPDX-License-Identifier: MIT
 # Copyright 2025 Steve Winslow
 
+import os
+import queue
 from tkinter import *
 from tkinter import ttk
 
 from debug import DebugUI
+from matchui import MatchUI
+from watcher import updateLoadErrors
+from xmlview import XMLView
+
+# milliseconds between checks for licenses reloaded by a LicenseDirWatcher
+WATCH_POLL_MS = 250
+
+# milliseconds between checks for licenses loaded by a LicenseLoader
+LOAD_POLL_MS = 50
 
 class UI:
     def __init__(self):
@@ -13,8 +24,10 @@ class UI:
         # Application data
         self.appdata = None
 
-        # StringVar-ified copy of license IDs, generated from appdata.lics
+        # StringVar-ified copy of license IDs shown in the listbox, and
+        # list of the same IDs, generated from appdata.licIndex
         self.licenseIDVar = None
+        self.shownIds = []
 
         # Tk root window
         self.root = None
@@ -31,10 +44,17 @@ class UI:
         # frame for license matcher
         self.cMatch = None
 
+        # Match tab UI object -- MatchUI from matchui.py
+        self.matchUI = None
+
         # license IDs listbox and scrollbar
         self.licids = None
         self.licidsys = None
 
+        # license ID filter entry and its StringVar
+        self.licFilter = None
+        self.licFilterVar = None
+
         # StringVar for selected license ID
         self.licSelectedID = None
 
@@ -44,6 +64,26 @@ class UI:
         self.licxmlys = None
         self.licxmlxs = None
 
+        # XMLView showing license XML in self.licxml
+        self.licxmlView = None
+
+        # watcher.LicenseDirWatcher, if watching for changed licenses
+        self.watcher = None
+
+        # loader.LicenseLoader, while loading licenses in the background,
+        # and function to call once it has finished
+        self.loader = None
+        self.onLoaded = None
+
+        # loading progress bar and status label
+        self.loadProgress = None
+        self.loadStatusVar = None
+        self.loadStatus = None
+
+        # dict of file path => error message, for license files which
+        # could not be loaded or reloaded, shown in the status label
+        self.loadErrors = {}
+
     def setup(self, appdata):
         # set up Tk root window
         self.root = Tk()
@@ -61,9 +101,11 @@ class UI:
         self.cBrowse = ttk.Frame(self.notebook, padding="5 5 12 0")
         self.notebook.add(self.cBrowse, text="Browse")
 
-        # set up placeholder frame for license matcher
+        # set up frame for license matcher
         self.cMatch = ttk.Frame(self.notebook, padding="5 5 12 0")
         self.notebook.add(self.cMatch, text="Match")
+        self.matchUI = MatchUI()
+        self.matchUI.setup(self.root, self.cMatch, self.appdata)
 
         # set up UI for list of license IDs
         self.licids = Listbox(self.cBrowse, height=20, width=30,
@@ -75,8 +117,24 @@ class UI:
         self.licidsys.grid(column=1, row=1, sticky=(N, S))
         self.licids.configure(yscrollcommand=self.licidsys.set)
 
+        # set up UI for filtering license IDs
+        self.licFilterVar = StringVar()
+        self.licFilter = ttk.Entry(self.cBrowse, textvariable=self.licFilterVar)
+        self.licFilter.grid(column=0, row=0, sticky=(E,W))
+        self.licFilterVar.trace_add("write", lambda *args: self._filterLics())
+
+        # set up UI for license loading progress
+        self.loadStatusVar = StringVar()
+        self.loadStatus = ttk.Label(self.cBrowse, textvariable=self.loadStatusVar,
+                                    wraplength=250)
+        self.loadStatus.grid(column=0, row=3, sticky=(E,W))
+        self.loadProgress = ttk.Progressbar(self.cBrowse, orient=HORIZONTAL,
+                                            mode="determinate")
+        self.loadProgress.grid(column=0, row=2, sticky=(E,W))
+        self.loadProgress.grid_remove()
+
         ttk.Separator(self.cBrowse, orient=VERTICAL).grid(
-                column=2, row=0, rowspan=3, sticky=(N,S))
+                column=2, row=0, rowspan=4, sticky=(N,S))
 
         # set up UI for license XML content
         self.licSelectedID = StringVar()
@@ -86,9 +144,9 @@ class UI:
                                       command=self.licxml.yview)
         self.licxmlxs = ttk.Scrollbar(self.cBrowse, orient=HORIZONTAL,
                                       command=self.licxml.xview)
-        self.licxml["yscrollcommand"] = self.licxmlys.set
         self.licxml["xscrollcommand"] = self.licxmlxs.set
         self.licxml["state"] = "disabled"
+        self.licxmlView = XMLView(self.licxml, self.licxmlys.set)
 
         self.licxmllbl.grid(column=3, row=0, sticky=(E,W), columnspan=2)
         self.licxml.grid(column=3, row=1, sticky=(N,S,E,W))
@@ -105,12 +163,7 @@ class UI:
 
         # FIXME note that the rest should maybe be pulled into separate function
 
-        # set up alternating listbox colors
-        alternate = False
-        for i in range(len(self.appdata.lics)):
-            if alternate:
-                self.licids.itemconfigure(i, background="#f0f0ff")
-            alternate = not alternate
+        self._filterLics()
 
         # set up selection bindings
         self.licids.bind("<<ListboxSelect>>",
@@ -119,36 +172,155 @@ class UI:
         # set up debug window
         # FIXME determine switch for whether / when to activate
         self.debug = DebugUI()
-        self.debug.setup(self.root, self.appdata.lics)
+        self.debug.setup(self.root, self.appdata.lics,
+                         self.appdata.origXMLCache, self.appdata.licIndex)
 
     # Update list of licenses from AppData
     # FIXME this logic is unnecessarily complex and should be cleaned up
-    def updateLics(self):
+    # given: changedIds, removedIds: as passed to AppData.licenseListeners;
+    #        the selected license is only redisplayed if it is in one of
+    #        them, or if both are None
+    def updateLics(self, changedIds=None, removedIds=None):
         if self.licenseIDVar is None and self.root is not None:
             self.licenseIDVar = StringVar()
-        if self.licenseIDVar is not None:
-            self.licenseIDVar.set(sorted(self.appdata.lics.keys(), key=str.casefold))
-        # FIXME probably also change licSelectedID
+        self._filterLics()
+        if self.licids is not None:
+            # licenses have been reloaded after setup
+            licid = self.licSelectedID.get()
+            if (changedIds is None or licid in changedIds or
+                licid in removedIds):
+                self._refreshSelectedLic()
+        if self.debug is not None:
+            self.debug.refreshTokenLics(changedIds, removedIds)
 
     # Callback: Selected license ID from self.licids listbox
     def selectId(self, selection):
-        self.licxml["state"] = "normal"
         # FIXME according to TkDocs tutorial, since licids has "browse" for
         # FIXME its selectmode, curselection should always be length 1
         if len(selection) == 1:
             i = selection[0]
 
-            # clear existing text
-            self.licxml.delete('1.0', 'end')
-
-            # set selection
-            licid = sorted(self.appdata.lics.keys(), key=str.casefold)[i]
+            # set selection, replacing existing text
+            licid = self.shownIds[i]
             self.licSelectedID.set(licid)
-            self.licxml.insert('1.0', self.appdata.lics[licid].origXML)
+            self.licxmlView.setText(
+                self.appdata.origXMLCache.get(self.appdata.lics[licid]))
+
+
+    # Starts a loader thread, and adds licenses to the UI as they load.
+    # given:   loader: loader.LicenseLoader, not yet started
+    #          onLoaded: function to call on the Tk thread once all
+    #                    licenses have loaded, or None
+    def loadLicenses(self, loader, onLoaded=None):
+        self.loader = loader
+        self.onLoaded = onLoaded
+        self.loadStatusVar.set("Loading licenses...")
+        self.loadProgress.grid()
+        self.loader.start()
+        self.root.after(LOAD_POLL_MS, self._applyLoadedLics)
+
+    # Callback: Check for licenses loaded by the loader thread
+    def _applyLoadedLics(self):
+        finished = False
+        changed = {}
+        while not finished:
+            try:
+                done, total, lics, errors, finished = \
+                    self.loader.progress.get_nowait()
+            except queue.Empty:
+                break
+            self.loadErrors.update(errors)
+            changed.update(lics)
+            self.loadProgress["maximum"] = max(total, 1)
+            self.loadProgress["value"] = done
+            self.loadStatusVar.set(
+                f"Loading licenses... {done} of {total}{self._errorSummary()}")
+
+        # apply each poll's licenses together, to limit list updates
+        if len(changed) > 0:
+            self.appdata.updateLicenses(changed, [])
+
+        if not finished:
+            self.root.after(LOAD_POLL_MS, self._applyLoadedLics)
+            return
+        self.loadProgress.grid_remove()
+        self._showLicenseCount()
+        self.loader = None
+        if self.onLoaded is not None:
+            self.onLoaded()
+
+    # Starts a watcher thread, and applies the licenses it reloads on
+    # the Tk thread.
+    # given:   watcher: watcher.LicenseDirWatcher, not yet started
+    def watchLicenses(self, watcher):
+        self.watcher = watcher
+        self.watcher.start()
+        self.root.after(WATCH_POLL_MS, self._applyWatchedChanges)
+
+    # Callback: Check for licenses reloaded by the watcher thread
+    def _applyWatchedChanges(self):
+        while True:
+            try:
+                changed, removed, errors = self.watcher.changes.get_nowait()
+            except queue.Empty:
+                break
+            updateLoadErrors(self.loadErrors, self.watcher.dirpath, changed,
+                             errors)
+            if len(changed) > 0 or len(removed) > 0:
+                self.appdata.updateLicenses(changed, removed)
+            if self.loader is None:
+                self._showLicenseCount()
+        self.root.after(WATCH_POLL_MS, self._applyWatchedChanges)
+
+    # Helper function to show the number of licenses, and any errors, in
+    # the status label
+    def _showLicenseCount(self):
+        self.loadStatusVar.set(
+            f"{len(self.appdata.lics)} licenses{self._errorSummary()}")
+
+    # Helper function to describe errors from loading licenses, for the
+    # status label: how many files had errors, and an example
+    def _errorSummary(self):
+        if len(self.loadErrors) == 0:
+            return ""
+        path, msg = next(reversed(self.loadErrors.items()))
+        return (f"; {len(self.loadErrors)} could not be loaded, e.g. "
+                f"{os.path.basename(path)}: {msg}")
+
+    # Helper function to show the license IDs matching the filter text
+    def _filterLics(self):
+        query = ""
+        if self.licFilterVar is not None:
+            query = self.licFilterVar.get().strip()
+        self.shownIds = self.appdata.licIndex.search(query)
+        if self.licenseIDVar is not None:
+            self.licenseIDVar.set(self.shownIds)
+        if self.licids is not None:
+            self._colorLicIDs()
 
-        self.licxml["state"] = "disabled"
+    # Helper function to set up alternating listbox colors
+    def _colorLicIDs(self):
+        alternate = False
+        for i in range(len(self.shownIds)):
+            if alternate:
+                self.licids.itemconfigure(i, background="#f0f0ff")
+            else:
+                self.licids.itemconfigure(i, background="")
+            alternate = not alternate
 
+    # Helper function to redisplay the selected license after reloading
+    def _refreshSelectedLic(self):
+        licid = self.licSelectedID.get()
+        if licid == "":
+            return
+        lic = self.appdata.lics.get(licid)
+        if lic is None:
+            self.licSelectedID.set("")
+            self.licxmlView.setText("")
+        else:
+            self.licxmlView.setText(self.appdata.origXMLCache.get(lic))
 
     # Run user interface
     def run(self):
         self.root.mainloop()
+        self.matchUI.shutdown()
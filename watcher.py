@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import os
+import queue
+import threading
+
+# Background thread which polls a License List XML directory for changes,
+# and re-parses and re-flattens just the added or changed licenses. Polling
+# is used rather than OS file notifications, so that no extra dependencies
+# are needed.
+#
+# As for loader.LicenseLoader, results are put on a queue to be applied on
+# the Tk thread. See UI.watchLicenses(), which drains the queue.
+class LicenseDirWatcher(threading.Thread):
+    # given: parser: XMLParser which has already loaded dirpath with
+    #                loadAll(); from here on, it must only be used by
+    #                this thread
+    #        dirpath: path to directory containing License List XML files
+    #        interval: seconds to wait between polls
+    def __init__(self, parser, dirpath, interval=1.0):
+        super(LicenseDirWatcher, self).__init__(daemon=True)
+
+        # XML parser, which tracks the state of loaded files
+        self.parser = parser
+
+        # path to directory being watched
+        self.dirpath = dirpath
+
+        # seconds to wait between polls
+        self.interval = interval
+
+        # queue of (changed, removed, errors) tuples, one per poll which
+        # found changes or different errors from the poll before; see
+        # XMLParser.reloadAll() for changed and removed, and errors is a
+        # dict of file or directory path => error message. See
+        # updateLoadErrors() for keeping track of errors across polls.
+        self.changes = queue.Queue()
+
+        # errors from the most recent poll
+        self.lastErrors = {}
+
+        # set to ask the thread to stop
+        self.stopEvent = threading.Event()
+
+    def run(self):
+        while not self.stopEvent.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # report it, but keep watching for later changes
+                self._putChanges({}, [], {self.dirpath: f"error while reloading: {e}"})
+
+    # Asks the thread to stop after its current poll.
+    def stop(self):
+        self.stopEvent.set()
+
+    # Checks the directory once, queueing any changes.
+    def poll(self):
+        try:
+            changed, removed = self.parser.reloadAll(self.dirpath)
+        except OSError as e:
+            # e.g. the directory itself is briefly unavailable; try again
+            # on the next poll rather than ending the thread
+            self._putChanges({}, [], {self.dirpath: str(e)})
+            return
+        errors = dict(self.parser.reloadErrors)
+        errors.update(self.parser.flattenEach(changed))
+        self._putChanges(changed, removed, errors)
+
+    # Helper function to queue the results of a poll, if there are any
+    # changes, or if the errors differ from the last poll's (so that
+    # errors which have gone away, e.g. for the directory, are noticed)
+    def _putChanges(self, changed, removed, errors):
+        if len(changed) > 0 or len(removed) > 0 or errors != self.lastErrors:
+            self.changes.put((changed, removed, errors))
+        self.lastErrors = errors
+
+# Updates a dict of errors from loading licenses with the results of one
+# poll by a LicenseDirWatcher, dropping errors which no longer apply: those
+# for licenses which have since reloaded, for files which have since been
+# removed, and for the directory as a whole after a poll without one.
+# given:   loadErrors: dict of file or directory path => error message,
+#                      e.g. from loader.LicenseLoader; updated in place
+#          dirpath: path to directory being watched
+#          changed, errors: as queued by LicenseDirWatcher
+def updateLoadErrors(loadErrors, dirpath, changed, errors):
+    for lic in changed.values():
+        loadErrors.pop(lic.xmlPath, None)
+    for path in list(loadErrors.keys()):
+        if path not in errors and (path == dirpath or not os.path.exists(path)):
+            del loadErrors[path]
+    loadErrors.update(errors)
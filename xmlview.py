@@ -0,0 +1,211 @@
+# SPDX-License-Identifier: MIT
+# Copyright 2025 Steve Winslow
+
+import re
+from enum import Enum
+
+# number of lines to insert into the Text widget at a time
+INSERT_CHUNK_LINES = 500
+
+# number of lines above and below the visible ones to also highlight, so
+# that small scrolls do not show unhighlighted text
+HIGHLIGHT_MARGIN_LINES = 50
+
+# Tk text tag options for each kind of highlighted XML
+XML_TAG_STYLES = {
+    "xmlTag": {"foreground": "#1a5fb4"},
+    "xmlAttrName": {"foreground": "#9141ac"},
+    "xmlAttrValue": {"foreground": "#26a269"},
+    "xmlComment": {"foreground": "#77767b"},
+    "xmlEntity": {"foreground": "#c64600"},
+}
+
+# Where a line of XML starts: in text content, within a tag (after its
+# name), or within a comment.
+class XMLLineState(Enum):
+    TEXT = 0
+    TAG = 1
+    COMMENT = 2
+
+# regexes for the next highlighted part of a line, for each starting state
+_TEXT_RE = re.compile(r'<!--|</?[^\s/>!?]+|<\?[^\s?>]*|&[#\w]+;')
+_TAG_RE = re.compile(r'[^\s=/>?"\']+|"[^"]*"?|\'[^\']*\'?|/?>|\?>')
+_COMMENT_END = "-->"
+
+# Finds the highlighted parts of one line of XML.
+# given:   line: text of line, without its newline
+#          state: XMLLineState at start of line
+# returns: tuple of (list of (tag name, start col, end col), XMLLineState at
+#          end of line)
+def highlightLine(line, state):
+    spans = []
+    pos = 0
+    while pos < len(line):
+        if state == XMLLineState.COMMENT:
+            end = line.find(_COMMENT_END, pos)
+            if end == -1:
+                spans.append(("xmlComment", pos, len(line)))
+                return spans, state
+            end += len(_COMMENT_END)
+            spans.append(("xmlComment", pos, end))
+            pos = end
+            state = XMLLineState.TEXT
+
+        elif state == XMLLineState.TAG:
+            m = _TAG_RE.search(line, pos)
+            if m is None:
+                break
+            s = m.group(0)
+            if s.endswith(">"):
+                spans.append(("xmlTag", m.start(), m.end()))
+                state = XMLLineState.TEXT
+            elif s[0] in "\"'":
+                spans.append(("xmlAttrValue", m.start(), m.end()))
+            else:
+                spans.append(("xmlAttrName", m.start(), m.end()))
+            pos = m.end()
+
+        else:
+            m = _TEXT_RE.search(line, pos)
+            if m is None:
+                break
+            s = m.group(0)
+            if s == "<!--":
+                state = XMLLineState.COMMENT
+                pos = m.start()
+                continue
+            if s[0] == "&":
+                spans.append(("xmlEntity", m.start(), m.end()))
+            else:
+                spans.append(("xmlTag", m.start(), m.end()))
+                state = XMLLineState.TAG
+            pos = m.end()
+
+    return spans, state
+
+# Finds highlighted parts of XML a line at a time, on request. The state
+# at the start of each line depends on the lines before it, so those are
+# scanned (but not highlighted) as needed; this is much cheaper than
+# applying Tk tags.
+class XMLHighlighter:
+    # given: lines: list of lines of XML, without newlines
+    def __init__(self, lines):
+        super(XMLHighlighter, self).__init__()
+
+        # lines of XML
+        self.lines = lines
+
+        # XMLLineState at the start of each line scanned so far
+        self.lineStates = [XMLLineState.TEXT]
+
+    # Returns the highlighted parts of a line; see highlightLine().
+    # given:   i: line number, starting from 0
+    def spansForLine(self, i):
+        while len(self.lineStates) <= i:
+            j = len(self.lineStates) - 1
+            _, state = highlightLine(self.lines[j], self.lineStates[j])
+            self.lineStates.append(state)
+        spans, _ = highlightLine(self.lines[i], self.lineStates[i])
+        return spans
+
+# Shows XML in a Text widget. Long XML is inserted in chunks via after(),
+# so that the start is shown straight away, and syntax highlighting is
+# only applied to the lines around those visible, extended as the view
+# scrolls.
+class XMLView:
+    # given: text: Text widget to show XML in
+    #        yscrollcommand: function to also pass the widget's vertical
+    #                        view changes to, e.g. its scrollbar's set
+    def __init__(self, text, yscrollcommand=None):
+        super(XMLView, self).__init__()
+
+        # Text widget
+        self.text = text
+
+        # function to pass vertical view changes to, or None
+        self.yscrollcommand = yscrollcommand
+
+        # lines of XML being shown, and number inserted so far
+        self.lines = []
+        self.inserted = 0
+
+        # highlighter for lines, and which lines have had tags applied
+        self.highlighter = XMLHighlighter([])
+        self.highlighted = bytearray()
+
+        # IDs of after() calls to insert the next chunk, and to highlight
+        # the visible lines, if any
+        self.insertId = None
+        self.highlightId = None
+
+        for tag, style in XML_TAG_STYLES.items():
+            self.text.tag_configure(tag, **style)
+        self.text["yscrollcommand"] = self._viewChanged
+        self.text.bind("<Configure>", self._viewChanged, add="+")
+
+    # Replaces the shown XML.
+    # given: xml: XML text, or "" to clear
+    def setText(self, xml):
+        if self.insertId is not None:
+            self.text.after_cancel(self.insertId)
+            self.insertId = None
+        self.lines = xml.split("\n")
+        self.inserted = 0
+        self.highlighter = XMLHighlighter(self.lines)
+        self.highlighted = bytearray(len(self.lines))
+
+        state = self.text["state"]
+        self.text["state"] = "normal"
+        self.text.delete("1.0", "end")
+        self.text["state"] = state
+        self._insertChunk()
+
+    ##### HELPER FUNCTIONS #####
+
+    # Callback: Insert the next chunk of lines, and schedule the following
+    # one if there are more
+    def _insertChunk(self):
+        self.insertId = None
+        end = min(self.inserted + INSERT_CHUNK_LINES, len(self.lines))
+        chunk = "\n".join(self.lines[self.inserted:end])
+        if self.inserted > 0:
+            chunk = "\n" + chunk
+
+        state = self.text["state"]
+        self.text["state"] = "normal"
+        self.text.insert("end-1c", chunk)
+        self.text["state"] = state
+        self.inserted = end
+
+        self._scheduleHighlight()
+        if self.inserted < len(self.lines):
+            self.insertId = self.text.after(1, self._insertChunk)
+
+    # Callback: Vertical view changed, so highlight any newly visible lines
+    def _viewChanged(self, *args):
+        if self.yscrollcommand is not None and len(args) == 2:
+            self.yscrollcommand(*args)
+        self._scheduleHighlight()
+
+    # Helper function to highlight the visible lines once Tk is idle,
+    # combining several view changes into one update
+    def _scheduleHighlight(self):
+        if self.highlightId is None:
+            self.highlightId = self.text.after_idle(self._highlightVisible)
+
+    # Callback: Apply tags to the visible lines, plus a margin, which
+    # have not already been highlighted
+    def _highlightVisible(self):
+        self.highlightId = None
+        first = int(self.text.index("@0,0").split(".")[0]) - 1
+        last = int(self.text.index(
+            f"@0,{self.text.winfo_height()}").split(".")[0]) - 1
+        first = max(0, first - HIGHLIGHT_MARGIN_LINES)
+        last = min(self.inserted - 1, last + HIGHLIGHT_MARGIN_LINES)
+
+        for i in range(first, last + 1):
+            if self.highlighted[i]:
+                continue
+            self.highlighted[i] = 1
+            for tag, start, end in self.highlighter.spansForLine(i):
+                self.text.tag_add(tag, f"{i+1}.{start}", f"{i+1}.{end}")